@@ -0,0 +1,37 @@
+import tempfile
+from pathlib import Path
+from typing import Dict, Iterator
+
+import pytest
+
+from benchmarks.suite import Phase, get_phases
+from benchmarks.synthetic import generate_project
+from pygen.utils.config import get_settings
+
+
+def pytest_addoption(parser: pytest.Parser) -> None:
+    group = parser.getgroup("suite", "benchmark suite")
+    group.addoption("--sizes", default="100", help="Comma-separated numbers of modules of the synthetic projects.")
+    group.addoption(
+        "--module-size", type=int, default=8, help="Typical maximum number of top-level symbols per module."
+    )
+    group.addoption("--repeat", type=int, default=5, help="Number of timed runs per phase. The best run is compared.")
+    group.addoption("--threshold", type=float, default=0.25, help="Fraction by which a phase may exceed its baseline.")
+
+
+def pytest_generate_tests(metafunc: pytest.Metafunc) -> None:
+    if "module_count" in metafunc.fixturenames:
+        sizes = [int(size) for size in metafunc.config.getoption("sizes").split(",") if size.strip()]
+        metafunc.parametrize("module_count", sizes, scope="module")
+
+
+@pytest.fixture(scope="module")
+def phases(module_count: int, pytestconfig: pytest.Config) -> Iterator[Dict[str, Phase]]:
+    """The phases of a command on a synthetic project of a number of modules."""
+    settings = get_settings()
+    # Synthetic projects are not Git repositories
+    git_ls_files, settings.git_ls_files = settings.git_ls_files, False
+    with tempfile.TemporaryDirectory() as tmp_dir_name:
+        module_size = pytestconfig.getoption("module_size")
+        yield get_phases(generate_project(Path(tmp_dir_name), module_count, module_size, max_size=200))
+    settings.git_ls_files = git_ls_files
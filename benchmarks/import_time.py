@@ -0,0 +1,111 @@
+"""
+Benchmark CLI startup time against a budget.
+
+Times ``import pygen.pygen`` and ``pygen --help`` in fresh interpreters, reports the slowest imports captured with
+``python -X importtime``, and checks that heavy dependencies are not imported at startup. Exits with a non-zero status
+if the help output exceeds the budget or a heavy dependency is imported. Commands that fail raise an error with their
+standard error, so a crash is never mistaken for a fast startup.
+
+Usage:
+    python -m benchmarks.import_time --budget-ms 350
+"""
+
+import subprocess  # nosec B404
+import sys
+import time
+from typing import List, Tuple
+
+import typer
+from rich import print  # noqa: A004
+from rich.table import Table
+
+# Dependencies that must only be imported by the commands that use them
+HEAVY_MODULES = ["boto3", "botocore", "git", "dotenv"]
+
+IMPORT_CODE = "import pygen.pygen"
+HELP_CODE = "import sys; sys.argv = ['pygen', '--help']; from pygen.pygen import pygen; pygen()"
+
+
+def check_result(result: "subprocess.CompletedProcess[str]") -> None:
+    """Raise an error with the standard error of a command if it failed."""
+    if result.returncode != 0:
+        command = " ".join(str(arg) for arg in result.args)
+        raise RuntimeError(f"{command!r} exited with status {result.returncode}:\n{result.stderr}")
+
+
+def time_command(args: List[str], repeat: int) -> float:
+    """Return the best wall time of a command in milliseconds over a number of runs."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = subprocess.run(  # nosec B603
+            args, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True, check=False
+        )
+        best = min(best, time.perf_counter() - start)
+        check_result(result)
+    return best * 1000
+
+
+def get_import_times(code: str) -> List[Tuple[str, int]]:
+    """
+    Run code with ``-X importtime`` and return the cumulative import time of each module.
+
+    Returns:
+        The name and cumulative import time in microseconds of each imported module.
+    """
+    result = subprocess.run(  # nosec B603
+        [sys.executable, "-X", "importtime", "-c", code], capture_output=True, text=True, check=False
+    )
+    check_result(result)
+    times = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line.split("|")
+        times.append((name.strip(), int(cumulative)))
+    return times
+
+
+def import_time(
+    budget_ms: float = typer.Option(350.0, help="Maximum wall time of 'pygen --help' in milliseconds."),
+    repeat: int = typer.Option(5, help="Number of timed runs per measurement. The best run is reported."),
+    top: int = typer.Option(10, help="Number of slowest imports to report."),
+) -> None:
+    """Time CLI startup and fail if it exceeds the budget or imports heavy dependencies."""
+    interpreter = time_command([sys.executable, "-c", "pass"], repeat)
+    import_ms = time_command([sys.executable, "-c", IMPORT_CODE], repeat)
+    help_ms = time_command([sys.executable, "-c", HELP_CODE], repeat)
+
+    table = Table(title="CLI startup")
+    table.add_column("Measurement")
+    table.add_column("Time (ms)", justify="right")
+    table.add_row("Interpreter startup", f"{interpreter:.1f}")
+    table.add_row("import pygen.pygen", f"{import_ms:.1f}")
+    table.add_row("pygen --help", f"{help_ms:.1f}")
+    print(table)
+
+    import_times = get_import_times(IMPORT_CODE)
+    slowest = Table(title=f"Slowest imports of {IMPORT_CODE!r} (cumulative)")
+    slowest.add_column("Module")
+    slowest.add_column("Time (ms)", justify="right")
+    for name, cumulative in sorted(import_times, key=lambda t: -t[1])[:top]:
+        slowest.add_row(name, f"{cumulative / 1000:.1f}")
+    print(slowest)
+
+    imported = {name for name, _ in import_times}
+    heavy = [m for m in HEAVY_MODULES if m in imported]
+    failed = False
+    if heavy:
+        print(f"[red]Heavy dependencies imported at startup: {', '.join(heavy)}[/red]")
+        failed = True
+    if help_ms > budget_ms:
+        print(f"[red]'pygen --help' took {help_ms:.1f} ms, over the budget of {budget_ms:.0f} ms[/red]")
+        failed = True
+
+    if failed:
+        raise typer.Exit(code=1)
+    print(f"[green]'pygen --help' took {help_ms:.1f} ms, within the budget of {budget_ms:.0f} ms[/green]")
+
+
+if __name__ == "__main__":
+    typer.run(import_time)
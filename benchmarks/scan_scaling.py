@@ -0,0 +1,61 @@
+"""
+Benchmark how project scanning scales with the number of worker processes.
+
+Usage:
+    python -m benchmarks.scan_scaling --modules 5000 --max-workers 8
+"""
+
+import os
+import tempfile
+import time
+from pathlib import Path
+from typing import Optional
+
+import typer
+from rich import print  # noqa: A004
+from rich.table import Table
+
+from benchmarks.synthetic import generate_project
+from pygen.utils.index import SymbolIndex
+from pygen.utils.modules import get_module_file_list
+from pygen.utils.parsing import PARSED_MODULES
+
+
+def scan_scaling(
+    modules: int = typer.Option(2000, help="Number of synthetic modules to generate."),
+    max_workers: Optional[int] = typer.Option(None, help="Maximum number of workers. Defaults to the CPU count."),
+    chunk_size: int = typer.Option(32, help="Number of files handed to a worker at a time."),
+    repeat: int = typer.Option(3, help="Number of timed runs per worker count. The best run is reported."),
+) -> None:
+    """Time a full (cold) symbol index build for 1 to N worker processes."""
+    max_workers = max_workers or os.cpu_count() or 1
+
+    with tempfile.TemporaryDirectory() as tmp_dir_name:
+        project_root = generate_project(Path(tmp_dir_name), modules)
+        file_paths = get_module_file_list(project_root)
+
+        table = Table(title=f"Cold scan of {len(file_paths)} modules")
+        table.add_column("Workers", justify="right")
+        table.add_column("Time (s)", justify="right")
+        table.add_column("Speedup", justify="right")
+        table.add_column("Efficiency", justify="right")
+
+        baseline = None
+        for workers in range(1, max_workers + 1):
+            best = float("inf")
+            for _ in range(repeat):
+                PARSED_MODULES.clear()
+                index = SymbolIndex(project_root)
+                start = time.perf_counter()
+                index.refresh(file_paths, workers=workers, chunk_size=chunk_size)
+                best = min(best, time.perf_counter() - start)
+
+            baseline = baseline or best
+            speedup = baseline / best
+            table.add_row(str(workers), f"{best:.3f}", f"{speedup:.2f}x", f"{speedup / workers:.0%}")
+
+        print(table)
+
+
+if __name__ == "__main__":
+    typer.run(scan_scaling)
@@ -0,0 +1,239 @@
+"""
+Benchmark the phases of a CLI command on synthetic projects, and check for regressions against stored baselines.
+
+For each project size, a synthetic project with long-tailed module sizes is generated and the phases of a command are
+timed: listing the modules, building the symbol index cold and loading it warm, parsing modules for their functions,
+symbol lookup, source extraction and prompt building. Finally ``pygen review function`` is run end to end against the
+fake LLM backend. Each phase reports the best of a number of runs.
+
+The results are compared with the baselines in ``benchmarks/baselines.json``, and the run fails if a phase is slower
+than its baseline by more than the threshold. Baselines depend on the machine, so record them with ``--save`` on the
+machine that checks for regressions.
+
+Usage:
+    python -m benchmarks.suite --threshold 0.25
+    python -m benchmarks.suite --sizes 100,1000,10000,50000 --save
+"""
+
+import json
+import os
+import shutil
+import subprocess  # nosec B404
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple, TypeVar
+
+import typer
+from rich import print  # noqa: A004
+from rich.table import Table
+
+from benchmarks.synthetic import generate_project
+from pygen.llm.budget import plan_prompt
+from pygen.prompts.review import get_function_review_prompt, get_module_review_prompt
+from pygen.utils.config import get_settings
+from pygen.utils.index import INDEX_DIR, load_symbol_index
+from pygen.utils.modules import extract_functions, get_function_content, get_module_content, get_module_file_list
+from pygen.utils.parsing import PARSED_MODULES
+
+BASELINES_FILE = Path(__file__).parent / "baselines.json"
+
+# Number of modules, symbols or prompts sampled by the phases that do not cover the whole project
+SAMPLE_SIZE = 200
+
+# Slowdowns smaller than this many seconds are treated as noise, whatever the threshold
+NOISE_SECONDS = 0.01
+
+T = TypeVar("T")
+
+# The phases of a command, in the order they are timed
+PHASES = [
+    "file_list",
+    "index_cold",
+    "index_warm",
+    "extract_functions",
+    "symbol_lookup",
+    "source_extraction",
+    "prompt_building",
+    "command",
+]
+
+# A phase is the function to time and the function to call before each run, outside the timing
+Phase = Tuple[Callable[[], object], Optional[Callable[[], None]]]
+
+
+def best_time(run: Callable[[], object], repeat: int, setup: Optional[Callable[[], None]] = None) -> float:
+    """
+    Return the best wall time of a function in seconds over a number of runs.
+
+    Args:
+        run: The function to time.
+        repeat: The number of timed runs.
+        setup: Called before each run, outside the timing.
+
+    Returns:
+        The best time in seconds.
+    """
+    best = float("inf")
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        run()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def sample(items: List[T], size: int = SAMPLE_SIZE) -> List[T]:
+    """Return up to ``size`` items spread evenly over a list."""
+    step = max(1, len(items) // size)
+    return items[::step][:size]
+
+
+def run_command(project_root: Path, function_name: str) -> None:
+    """Run ``pygen review function`` on a project in a fresh interpreter against the fake LLM backend."""
+    env = {**os.environ, "PYGEN_LLM_BACKEND": "fake", "PYGEN_CACHE": "0"}
+    env.pop("PYGEN_METRICS_FILE", None)
+    env.pop("PYGEN_METRICS_PROMETHEUS_FILE", None)
+    args = [sys.executable, "-m", "pygen.pygen", "review", "function", function_name, "--project-root", project_root]
+    subprocess.run(  # nosec B603
+        [str(arg) for arg in args], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, env=env, check=True
+    )
+
+
+def get_phases(project_root: Path) -> Dict[str, Phase]:
+    """
+    Prepare the phases of a command on a project for timing.
+
+    Args:
+        project_root: The root of the project.
+
+    Returns:
+        The function that runs each phase of ``PHASES``, with the function to call before each run.
+    """
+    file_paths = get_module_file_list(project_root)
+    index = load_symbol_index(project_root, file_paths)
+    modules = sample(file_paths)
+    functions = sample([(path, function.name) for path in modules for function in index.functions_in(path)])
+    # Top-level function names are unique, unlike method names, so prefer them for lookups and the command
+    names = [function.name for function in sample(index.functions)]
+    names = [name for name in names if name.startswith("synthetic_")] or names
+    if not names:
+        raise ValueError(f"No functions found in {project_root}")
+
+    def clear_index() -> None:
+        PARSED_MODULES.clear()
+        shutil.rmtree(project_root / INDEX_DIR, ignore_errors=True)
+
+    def build_prompts() -> None:
+        for path in modules:
+            plan_prompt(get_module_review_prompt(get_module_content(path)), "review module")
+        for path, name in functions:
+            plan_prompt(get_function_review_prompt(get_function_content(path, name)), "review function")
+
+    return {
+        "file_list": (lambda: get_module_file_list(project_root), None),
+        "index_cold": (lambda: load_symbol_index(project_root, file_paths), clear_index),
+        "index_warm": (lambda: load_symbol_index(project_root, file_paths), None),
+        "extract_functions": (lambda: [extract_functions(path) for path in modules], PARSED_MODULES.clear),
+        "symbol_lookup": (
+            lambda: [(index.function_lookup.find(name), index.function_lookup.fuzzy(name[:-1])) for name in names],
+            None,
+        ),
+        "source_extraction": (lambda: [get_function_content(path, name) for path, name in functions], None),
+        "prompt_building": (build_prompts, None),
+        "command": (lambda: run_command(project_root, names[len(names) // 2]), None),
+    }
+
+
+def benchmark_project(project_root: Path, repeat: int) -> Dict[str, float]:
+    """
+    Time the phases of a command on a project.
+
+    Args:
+        project_root: The root of the project.
+        repeat: The number of timed runs of each phase.
+
+    Returns:
+        The best time in seconds of each phase.
+    """
+    return {name: best_time(run, repeat, setup) for name, (run, setup) in get_phases(project_root).items()}
+
+
+def is_regression(seconds: float, baseline: Optional[float], threshold: float) -> bool:
+    """Whether a phase is slower than its baseline by more than the threshold, and by more than noise."""
+    return baseline is not None and seconds / baseline - 1 > threshold and seconds - baseline > NOISE_SECONDS
+
+
+def load_baselines(path: Path) -> Dict[str, float]:
+    """Load the baseline time in seconds of each phase and project size, keyed ``<modules>/<phase>``."""
+    if not path.exists():
+        return {}
+    results: Dict[str, float] = json.loads(path.read_text(encoding="utf-8"))["results"]
+    return results
+
+
+def save_baselines(path: Path, results: Dict[str, float]) -> None:
+    """Merge results into the baselines file, replacing the baselines of the same phases and project sizes."""
+    baselines = {**load_baselines(path), **results}
+    data = {"python": sys.version.split()[0], "machine": os.uname().machine, "results": dict(sorted(baselines.items()))}
+    path.write_text(json.dumps(data, indent=2) + "\n", encoding="utf-8")
+
+
+def suite(
+    sizes: str = typer.Option("100,1000", help="Comma-separated numbers of modules of the synthetic projects."),
+    module_size: int = typer.Option(8, help="Typical maximum number of top-level symbols per module."),
+    max_module_size: int = typer.Option(200, help="Maximum number of top-level symbols of the largest modules."),
+    repeat: int = typer.Option(5, help="Number of timed runs per phase. The best run is reported."),
+    threshold: float = typer.Option(0.25, help="Fraction by which a phase may be slower than its baseline."),
+    baselines: Path = typer.Option(BASELINES_FILE, help="JSON file of baseline times."),
+    save: bool = typer.Option(False, help="Save the results as the baselines instead of checking for regressions."),
+) -> None:
+    """Time the phases of a command on synthetic projects and fail if any is slower than its baseline."""
+    # Synthetic projects are not Git repositories
+    get_settings().git_ls_files = False
+    expected = load_baselines(baselines)
+    results: Dict[str, float] = {}
+
+    for module_count in [int(size) for size in sizes.split(",") if size.strip()]:
+        with tempfile.TemporaryDirectory() as tmp_dir_name:
+            project_root = generate_project(Path(tmp_dir_name), module_count, module_size, max_size=max_module_size)
+            for phase, seconds in benchmark_project(project_root, repeat).items():
+                results[f"{module_count}/{phase}"] = seconds
+
+    table = Table(title="Benchmark suite")
+    table.add_column("Modules", justify="right")
+    table.add_column("Phase")
+    table.add_column("Time (ms)", justify="right")
+    table.add_column("Baseline (ms)", justify="right")
+    table.add_column("Change", justify="right")
+
+    regressions = []
+    for key, seconds in results.items():
+        modules, phase = key.split("/")
+        baseline = expected.get(key)
+        change = ""
+        if baseline:
+            ratio = seconds / baseline - 1
+            regressed = is_regression(seconds, baseline, threshold)
+            colour = "red" if regressed else "green" if ratio < 0 else "white"
+            change = f"[{colour}]{ratio:+.0%}[/{colour}]"
+            if regressed:
+                regressions.append(key)
+        baseline_ms = f"{baseline * 1000:.1f}" if baseline else "-"
+        table.add_row(modules, phase, f"{seconds * 1000:.1f}", baseline_ms, change)
+    print(table)
+
+    if save:
+        save_baselines(baselines, results)
+        print(f"[green]Saved {len(results)} baselines to {baselines}[/green]")
+        return
+    if regressions:
+        print(f"[red]{len(regressions)} phases regressed by more than {threshold:.0%}: {', '.join(regressions)}[/red]")
+        raise typer.Exit(code=1)
+    print(f"[green]No phase regressed by more than {threshold:.0%}[/green]")
+
+
+if __name__ == "__main__":
+    typer.run(suite)
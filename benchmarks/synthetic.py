@@ -0,0 +1,118 @@
+"""
+Synthetic Python project generator for benchmarks.
+"""
+
+import random
+from pathlib import Path
+from typing import Optional
+
+MODULE_HEADER = '''"""
+Synthetic module {index}.
+"""
+
+import os
+from typing import Any, Dict, List, Optional
+
+'''
+
+CLASS_TEMPLATE = '''
+
+class Synthetic{index}Class{number}:
+    """A synthetic class used for benchmarking."""
+
+    def __init__(self, value: int = {number}) -> None:
+        self.value = value
+        self.items: List[int] = []
+{methods}
+'''
+
+METHOD_TEMPLATE = '''
+    def method_{number}(self, argument: Optional[int] = None) -> int:
+        """Return a value derived from the argument."""
+        total = self.value
+        for item in range(argument or {number}):
+            if item % 3 == 0:
+                total += item
+            else:
+                total -= item // 2
+        return total
+'''
+
+FUNCTION_TEMPLATE = '''
+
+def synthetic_{index}_function_{number}(values: List[int], options: Dict[str, Any]) -> int:
+    """Return the sum of the values scaled by an option."""
+
+    def scale(value: int) -> int:
+        return value * int(options.get("scale", {number}))
+
+    return sum(scale(v) for v in values) + len(os.sep)
+'''
+
+
+def generate_module(index: int, rng: random.Random, size: int) -> str:
+    """
+    Generate the source of a synthetic module.
+
+    Args:
+        index: The index of the module, used to make symbol names unique.
+        rng: The random number generator used to vary the module layout.
+        size: The approximate number of top-level symbols in the module.
+
+    Returns:
+        The source of the module.
+    """
+    parts = [MODULE_HEADER.format(index=index)]
+    for number in range(max(1, rng.randint(size // 2, size))):
+        if rng.random() < 0.4:
+            methods = "".join(METHOD_TEMPLATE.format(number=m) for m in range(rng.randint(1, 6)))
+            parts.append(CLASS_TEMPLATE.format(index=index, number=number, methods=methods))
+        else:
+            parts.append(FUNCTION_TEMPLATE.format(index=index, number=number))
+    return "".join(parts)
+
+
+def get_module_size(rng: random.Random, size: int, max_size: Optional[int]) -> int:
+    """
+    Choose the maximum number of top-level symbols of a module.
+
+    Args:
+        rng: The random number generator.
+        size: The typical maximum number of top-level symbols per module.
+        max_size: The largest maximum, or None to give every module the typical maximum.
+
+    Returns:
+        The maximum number of top-level symbols of the module.
+    """
+    if max_size is None:
+        return size
+    # Module sizes in real projects are long-tailed: most are small and a few are very large
+    return min(max_size, int(size * rng.paretovariate(1.5)))
+
+
+def generate_project(
+    root: Path, modules: int, size: int = 8, package_size: int = 50, seed: int = 0, max_size: Optional[int] = None
+) -> Path:
+    """
+    Generate a synthetic Python project.
+
+    Args:
+        root: The directory to generate the project in.
+        modules: The number of modules to generate.
+        size: The maximum number of top-level symbols per module, or the typical maximum if ``max_size`` is set.
+        package_size: The number of modules per package.
+        seed: The seed of the random number generator.
+        max_size: If set, module sizes vary with a long tail from ``size`` up to this many top-level symbols.
+
+    Returns:
+        The root of the generated project.
+    """
+    rng = random.Random(seed)  # nosec B311
+    for index in range(modules):
+        package = root / "synthetic" / f"package_{index // package_size}"
+        if not package.exists():
+            package.mkdir(parents=True)
+            (package / "__init__.py").touch()
+        module_size = get_module_size(rng, size, max_size)
+        (package / f"module_{index}.py").write_text(generate_module(index, rng, module_size))
+    return root
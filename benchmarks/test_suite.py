@@ -0,0 +1,35 @@
+"""
+Benchmark the phases of a command with pytest-benchmark, and fail the phases that regressed against the baselines.
+
+The phases and baselines are those of ``benchmarks.suite``. Each phase is timed over a number of rounds, and the best
+round is compared with the baseline of the phase for the project size.
+
+Usage:
+    pytest -c config/pytest.ini benchmarks --sizes 100,1000 --threshold 0.25
+"""
+
+from typing import Any, Dict
+
+import pytest
+
+from benchmarks.suite import BASELINES_FILE, PHASES, Phase, is_regression, load_baselines
+
+
+@pytest.mark.parametrize("phase", PHASES)
+def test_phase(
+    benchmark: Any, phases: Dict[str, Phase], module_count: int, phase: str, pytestconfig: pytest.Config
+) -> None:
+    run, setup = phases[phase]
+    benchmark.group = f"{module_count} modules"
+    benchmark.pedantic(run, setup=setup, rounds=pytestconfig.getoption("repeat"))
+    baseline = load_baselines(BASELINES_FILE).get(f"{module_count}/{phase}")
+    # Without stats, benchmarks are disabled and the phase only ran once as a test
+    if benchmark.stats is None or baseline is None:
+        return
+
+    seconds = benchmark.stats.stats.min
+    threshold = pytestconfig.getoption("threshold")
+    assert not is_regression(seconds, baseline, threshold), (
+        f"{phase} took {seconds * 1000:.1f} ms on {module_count} modules, more than {threshold:.0%} slower than its "
+        f"baseline of {baseline * 1000:.1f} ms"
+    )
@@ -16,6 +16,7 @@ from pygen.utils.modules import (
     get_function_name_and_path,
     get_module_content,
     get_module_path,
+    get_module_tokens,
 )
 
 docstring_app = typer.Typer(
@@ -41,7 +42,8 @@ def generate_docstring_module(
         raise typer.Exit()
 
     prompt = get_module_docstring_prompt(module_content)
-    prompt_llm(ctx, prompt)
+    # The index counts the whole module, including the docstring that stripping removes
+    prompt_llm(ctx, prompt, source_tokens=None if strip else get_module_tokens(module_path))
 
 
 @docstring_app.command(name="class")
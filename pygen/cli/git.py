@@ -1,13 +1,24 @@
-import tempfile
+from functools import partial
 from pathlib import Path
+from typing import Optional, Tuple
 
-import git
 import typer
 from rich import print  # noqa: A004
 
-from pygen.prompts.git import get_pr_prompt, get_git_review
-from pygen.utils.llm import prompt_llm
+from pygen.prompts.git import (
+    get_commit_message_prompt,
+    get_file_summary_prompt,
+    get_git_partial_review,
+    get_git_review,
+    get_pr_from_summaries_prompt,
+    get_pr_prompt,
+    get_pr_summary_prompt,
+)
+from pygen.utils.chunking import chunk_diff
+from pygen.utils.config import get_settings
+from pygen.utils.llm import get_command_name, get_llm_client, prewarm_llm_client, prompt_llm
 from pygen.utils.log import get_logger
+from pygen.utils.repo import open_repository
 from pygen.utils.rich import warning_panel
 
 logger = get_logger(__name__)
@@ -18,6 +29,17 @@ git_app = typer.Typer(
     no_args_is_help=True,
 )
 
+# Git commands that call the LLM and are pre-warmed as they start. The commit command pre-warms once it knows whether
+# its message is cached.
+PREWARM_COMMANDS = {"pr", "review"}
+
+
+@git_app.callback()
+def git_options(ctx: typer.Context) -> None:
+    """Pre-warm the LLM client of the Git commands that call the LLM."""
+    if get_settings().llm_prewarm > 0 and ctx.invoked_subcommand in PREWARM_COMMANDS and not ctx.resilient_parsing:
+        prewarm_llm_client(ctx, get_settings().llm_prewarm)
+
 
 @git_app.command(name="check")
 def git_check(module_name: str) -> None:
@@ -26,90 +48,203 @@ def git_check(module_name: str) -> None:
     print(warning_panel("Not yet implemented"))
 
 
+def get_staged_diff(ctx: typer.Context, repo_path: Path) -> Tuple[str, str]:
+    """
+    Get the diff of the changes staged in the index of a local repository, filtered and cut down to the token budget
+    like a branch diff.
+
+    If pre-warming is enabled, the LLM client is created in the background while the diff is read, and connections to
+    the LLM service are opened unless the message for the staged changes is already cached.
+
+    Returns:
+        The diff, and an identifier of the staged changes for the response cache, made from the hashes of the staged
+        tree and of the tree of the current commit.
+    """
+    import json
+
+    import git
+
+    from pygen.utils.diff import DiffOptions, get_diff
+
+    options = DiffOptions.from_settings()
+    try:
+        repo = git.Repo(str(repo_path), search_parent_directories=True)
+        try:
+            staged_tree = repo.git.write_tree()
+            try:
+                head_tree = repo.git.rev_parse("--verify", "--quiet", "HEAD^{tree}")
+            except git.exc.GitCommandError:
+                # Nothing has been committed yet
+                head_tree = ""
+            instructions = get_commit_message_prompt("").instructions
+            cache_id = json.dumps([instructions, staged_tree, head_tree, options.max_tokens, options.context_lines])
+            if get_settings().llm_prewarm > 0 and "llm_client" not in ctx.meta:
+                prewarm_llm_client(ctx, get_settings().llm_prewarm, cache_id)
+            diff_text = get_diff(repo, ["--cached"], options)
+        finally:
+            repo.close()
+    except git.exc.GitError as git_error:
+        typer.echo(f"Git error occurred: {git_error}")
+        raise typer.Exit()
+
+    return diff_text, cache_id
+
+
 @git_app.command(name="commit")
-def git_commit():
+def git_commit(
+    ctx: typer.Context,
+    repo_path: Path = typer.Option(Path("."), "--repo", help="Path of the repository with the staged changes."),
+) -> None:
     """Generate a commit message for the staged changes."""
     logger.info("Generating commit message")
-    print(warning_panel("Not yet implemented"))
+    diff_text, cache_id = get_staged_diff(ctx, repo_path)
+    if not diff_text:
+        typer.echo("No staged changes found.")
+        raise typer.Exit()
 
+    prompt_llm(ctx, get_commit_message_prompt(diff_text), cache_id=cache_id)
 
-def clone_repo(repo_url: str, clone_path: Path) -> git.Repo:
-    if not clone_path.exists():
-        return git.Repo.clone_from(repo_url, str(clone_path))
-    return git.Repo(str(clone_path))
 
+def get_repository_diff(repo_url: str, branch1: str, branch2: str) -> str:
+    """
+    Get the diff of the changes on a branch since its merge base with another, of a local repository or of a remote
+    one fetched without a checkout. Lockfiles, generated, vendored and binary files are left out, and the diff is cut
+    down to the token budget.
+    """
+    import git
 
-def fetch_all_branches(repo: git.Repo) -> None:
-    repo.git.fetch("--all")
+    from pygen.utils.diff import get_branch_diff
 
-
-def checkout_branch(repo: git.Repo, branch: str) -> None:
     try:
-        repo.git.checkout(branch)
-    except git.exc.GitCommandError:
-        repo.git.checkout("origin/" + branch, b=branch)
-
-
-def get_branch_diff(repo: git.Repo, branch1: str, branch2: str) -> str:
-    branch1_commit = repo.commit(branch1)
-    branch2_commit = repo.commit(branch2)
-    diff = branch1_commit.diff(branch2_commit)
-    diff_text = "\n".join([str(d) for d in diff])
-    return diff_text
+        with open_repository(repo_url, [branch1, branch2]) as (repo, (commit1, commit2)):
+            return get_branch_diff(repo, commit1, commit2)
+    except (git.exc.GitError, ValueError) as git_error:
+        typer.echo(f"Git error occurred: {git_error}")
+        raise typer.Exit()
+
+
+def summarise_repository_files(
+    ctx: typer.Context, repo_url: str, branch1: str, branch2: str
+) -> Tuple[str, str, Optional[str]]:
+    """
+    Summarise the changes to each file on a branch since its merge base with another, concurrently.
+
+    Returns:
+        The summaries of the files, for the prompt of the pull request message; the Added, Modified and Removed Files
+        sections of the message, filled in from Git; and an identifier of the prompt for the response cache, made from
+        the cache keys of the summaries, if any file was summarised.
+    """
+    import json
+
+    import git
+    from rich.progress import Progress, SpinnerColumn, TextColumn
+
+    from pygen.llm.mapreduce import fits
+    from pygen.llm.metrics import get_metrics
+    from pygen.llm.summaries import format_file_sections, get_summaries_content, get_summaries_id, summarise_files
+    from pygen.utils.diff import DiffOptions, get_merge_base, list_changes
+
+    get_metrics().command = get_command_name(ctx)
+    llm_client = get_llm_client(ctx)
+    settings = get_settings()
+    # Each file's diff is budgeted like a chunk of a diff too large to send whole
+    options = DiffOptions(settings.chunk_tokens, tuple(settings.diff_exclude), settings.diff_context_lines)
+    try:
+        with open_repository(repo_url, [branch1, branch2]) as (repo, (commit1, commit2)):
+            revisions = [get_merge_base(repo, commit1, commit2), commit2]
+            changes = list_changes(repo, revisions, options.exclude)
+            if not changes:
+                return "", "", None
+            with Progress(
+                SpinnerColumn(), TextColumn("[progress.description]{task.description}"), transient=True
+            ) as progress:
+                task = progress.add_task("Summarising changed files...")
+
+                def on_result(completed: int, total: int) -> None:
+                    progress.update(task, description=f"Summarised {completed} of {total} changed files...")
+
+                summaries = summarise_files(
+                    llm_client, repo, revisions, changes, get_file_summary_prompt, options, on_result
+                )
+    except (git.exc.GitError, ValueError) as git_error:
+        typer.echo(f"Git error occurred: {git_error}")
+        raise typer.Exit()
+
+    file_sections = format_file_sections(changes, summaries)
+    if not summaries:
+        # Only files that are not summarised changed, so the message is written from their list
+        return file_sections, file_sections, None
+    summaries_content = get_summaries_content(summaries)
+    prompt = get_pr_from_summaries_prompt(branch1, branch2, summaries_content)
+    headlines_only = not fits(prompt, llm_client.max_tokens)
+    if headlines_only:
+        logger.info("The file summaries are too large to send whole, sending the first line of each")
+        summaries_content = get_summaries_content(summaries, headlines_only=True)
+    cache_id = json.dumps([prompt.instructions, branch1, branch2, get_summaries_id(summaries, headlines_only)])
+    return summaries_content, file_sections, cache_id
 
 
 @git_app.command(name="pr")
 def git_pull_request(
     ctx: typer.Context,
-    repo_url: str,
-    branch1: str,
-    branch2: str,
+    repo_url: str = typer.Argument(..., help="Path of a local repository, or URL of a remote one."),
+    branch1: str = typer.Argument(..., help="The branch to merge into."),
+    branch2: str = typer.Argument(..., help="The branch with the changes."),
+    per_file: bool = typer.Option(
+        False,
+        "--per-file",
+        help="Summarise each changed file concurrently and write the message from the summaries, for pull requests of "
+        "many files. The Added, Modified and Removed Files sections are filled in from Git.",
+    ),
 ) -> None:
     """Generate a pull request message for the diff between two branches."""
+    from pygen.llm.mapreduce import MapReduceJob
 
-    with tempfile.TemporaryDirectory() as tmp_dir_name:
-        clone_path = Path(tmp_dir_name) / Path(repo_url).stem
-        try:
-            repo = clone_repo(repo_url, clone_path)
-            fetch_all_branches(repo)
-            checkout_branch(repo, branch1)
-            checkout_branch(repo, branch2)
-            diff_text = get_branch_diff(repo, branch1, branch2)
-            if not diff_text:
-                typer.echo("No differences found between the specified branches.")
-                raise typer.Exit()
-
-            pr_message_prompt = get_pr_prompt(branch1, branch2, diff_text)
-            prompt_llm(ctx, pr_message_prompt)
-
-        except git.exc.GitError as git_error:
-            typer.echo(f"Git error occurred: {git_error}")
+    if per_file:
+        summaries_content, file_sections, cache_id = summarise_repository_files(ctx, repo_url, branch1, branch2)
+        if not summaries_content:
+            typer.echo("No differences found between the specified branches.")
             raise typer.Exit()
+        prompt_llm(ctx, get_pr_from_summaries_prompt(branch1, branch2, summaries_content), cache_id=cache_id)
+        typer.echo(f"\n{file_sections}")
+        return
+
+    diff_text = get_repository_diff(repo_url, branch1, branch2)
+    if not diff_text:
+        typer.echo("No differences found between the specified branches.")
+        raise typer.Exit()
+
+    pr_message_prompt = get_pr_prompt(branch1, branch2, diff_text)
+    # Diffs too large for one request are summarised in chunks, and the PR message written from the summaries
+    map_reduce = MapReduceJob(
+        subject="Git diff",
+        split=partial(chunk_diff, diff_text),
+        map_prompt=partial(get_pr_summary_prompt, branch1, branch2),
+        reduce_prompt=partial(get_pr_prompt, branch1, branch2),
+    )
+    prompt_llm(ctx, pr_message_prompt, map_reduce)
+
 
 @git_app.command(name="review")
 def git_review(
     ctx: typer.Context,
-    repo_url: str,
-    branch1: str,
-    branch2: str,
+    repo_url: str = typer.Argument(..., help="Path of a local repository, or URL of a remote one."),
+    branch1: str = typer.Argument(..., help="The branch to merge into."),
+    branch2: str = typer.Argument(..., help="The branch with the changes."),
 ) -> None:
     """Review the diff between two branches."""
-
-    with tempfile.TemporaryDirectory() as tmp_dir_name:
-        clone_path = Path(tmp_dir_name) / Path(repo_url).stem
-        try:
-            repo = clone_repo(repo_url, clone_path)
-            fetch_all_branches(repo)
-            checkout_branch(repo, branch1)
-            checkout_branch(repo, branch2)
-            diff_text = get_branch_diff(repo, branch1, branch2)
-            if not diff_text:
-                typer.echo("No differences found between the specified branches.")
-                raise typer.Exit()
-
-            pr_message_prompt = get_git_review(branch1, branch2, diff_text)
-            prompt_llm(ctx, pr_message_prompt)
-
-        except git.exc.GitError as git_error:
-            typer.echo(f"Git error occurred: {git_error}")
-            raise typer.Exit()
+    from pygen.llm.mapreduce import MapReduceJob
+
+    diff_text = get_repository_diff(repo_url, branch1, branch2)
+    if not diff_text:
+        typer.echo("No differences found between the specified branches.")
+        raise typer.Exit()
+
+    pr_message_prompt = get_git_review(branch1, branch2, diff_text)
+    map_reduce = MapReduceJob(
+        subject="Git diff",
+        split=partial(chunk_diff, diff_text),
+        map_prompt=partial(get_git_partial_review, branch1, branch2),
+        reduce_prompt=partial(get_git_review, branch1, branch2),
+    )
+    prompt_llm(ctx, pr_message_prompt, map_reduce)
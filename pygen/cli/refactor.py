@@ -8,7 +8,13 @@ from pygen.prompts.refactor import get_function_refactor_prompt
 from pygen.prompts.review import get_module_refactor_prompt
 from pygen.utils.llm import prompt_llm
 from pygen.utils.log import get_logger
-from pygen.utils.modules import get_function_name_and_path, get_function_content, get_module_path, get_module_content
+from pygen.utils.modules import (
+    get_function_content,
+    get_function_name_and_path,
+    get_module_content,
+    get_module_path,
+    get_module_tokens,
+)
 from pygen.utils.rich import warning_panel
 
 logger = get_logger(__name__)
@@ -35,7 +41,7 @@ def review_module(
         raise typer.Exit()
 
     prompt = get_module_refactor_prompt(module_content)
-    prompt_llm(ctx, prompt)
+    prompt_llm(ctx, prompt, source_tokens=get_module_tokens(module_path))
 
 
 @refactor_app.command(name="class")
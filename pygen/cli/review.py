@@ -1,10 +1,17 @@
+from functools import partial
 from pathlib import Path
 from typing import Optional
 
 import typer
 from rich import print  # noqa: A004
 
-from pygen.prompts.review import get_class_review_prompt, get_function_review_prompt, get_module_review_prompt
+from pygen.prompts.review import (
+    get_class_review_prompt,
+    get_function_review_prompt,
+    get_module_partial_review_prompt,
+    get_module_review_prompt,
+)
+from pygen.utils.chunking import chunk_module
 from pygen.utils.llm import prompt_llm
 from pygen.utils.log import get_logger
 from pygen.utils.modules import (
@@ -14,6 +21,7 @@ from pygen.utils.modules import (
     get_function_name_and_path,
     get_module_content,
     get_module_path,
+    get_module_tokens,
 )
 from pygen.utils.rich import warning_panel
 
@@ -39,6 +47,8 @@ def review_module(
     project_root: Path = typer.Option(Path("."), help="Root directory of the project"),
 ) -> None:
     """Review a module and suggest improvements."""
+    from pygen.llm.mapreduce import MapReduceJob
+
     module_path = get_module_path(project_root, module_name)
 
     try:
@@ -48,7 +58,14 @@ def review_module(
         raise typer.Exit()
 
     prompt = get_module_review_prompt(module_content)
-    prompt_llm(ctx, prompt)
+    # Modules too large for one request are reviewed in chunks of whole statements, and the reviews combined
+    map_reduce = MapReduceJob(
+        subject="module",
+        split=partial(chunk_module, module_content, label=str(module_path)),
+        map_prompt=get_module_partial_review_prompt,
+        reduce_prompt=get_module_review_prompt,
+    )
+    prompt_llm(ctx, prompt, map_reduce, source_tokens=get_module_tokens(module_path))
 
 
 @review_app.command(name="class")
@@ -13,6 +13,7 @@ from pygen.utils.modules import (
     get_function_name_and_path,
     get_module_content,
     get_module_path,
+    get_module_tokens,
 )
 
 logger = get_logger(__name__)
@@ -39,7 +40,7 @@ def generate_tests_module(
         raise typer.Exit()
 
     prompt = get_module_tests_prompt(module_content)
-    prompt_llm(ctx, prompt)
+    prompt_llm(ctx, prompt, source_tokens=get_module_tokens(module_path))
 
 
 @tests_app.command(name="class")
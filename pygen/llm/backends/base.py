@@ -0,0 +1,149 @@
+"""
+The interface between the LLM client and the services that run the model.
+
+A backend sends a single request and translates the service's response into stream events. Retries, rate limiting,
+batching and response caching are left to the client, so they behave the same whichever backend is selected. Backends
+are selected by name with the ``PYGEN_LLM_BACKEND`` setting and imported on first use, so the dependencies of one
+backend are never loaded for another.
+"""
+
+from dataclasses import dataclass, field
+from typing import Iterator, Optional, Protocol
+
+from pygen.llm.stream import StopReason, StreamEvent, Usage
+from pygen.prompts.prompt import Prompt, PromptLike
+
+# Names of the available backends
+BACKENDS = ("bedrock", "openai", "fake")
+
+
+class BackendError(Exception):
+    """
+    A request to a backend failed in a way that may succeed if it is retried, such as a network error or throttling.
+
+    Attributes:
+        message: The error message.
+        throttled: Whether the service rejected the request because too many requests or tokens were sent.
+    """
+
+    def __init__(self, message: str, throttled: bool = False) -> None:
+        super().__init__(message, throttled)
+        self.message = message
+        self.throttled = throttled
+
+    def __str__(self) -> str:
+        return self.message
+
+
+@dataclass(frozen=True)
+class LLMRequest:
+    """
+    A request for a response to a prompt.
+
+    Attributes:
+        prompt: The prompt text, or the content the instructions apply to. Sent as the user message.
+        max_tokens: The output token limit.
+        prefill: The start of the assistant response for the model to continue from, if any.
+        instructions: The static instructions of the prompt, if any. Sent as the system prompt.
+    """
+
+    prompt: str
+    max_tokens: int
+    prefill: str = ""
+    instructions: Optional[str] = None
+
+    @classmethod
+    def from_prompt(cls, prompt: PromptLike, max_tokens: int, prefill: str = "") -> "LLMRequest":
+        """Create a request for a prompt, taking the instructions of a ``Prompt`` apart from its content."""
+        if isinstance(prompt, Prompt):
+            return cls(prompt.content, max_tokens, prefill, prompt.instructions)
+        return cls(prompt, max_tokens, prefill)
+
+
+@dataclass(frozen=True)
+class LLMResponse:
+    """
+    A complete response to a request.
+
+    Attributes:
+        text: The response text.
+        usage: The token usage reported by the service.
+        stop: The reason the model stopped generating.
+    """
+
+    text: str
+    usage: Usage = field(default_factory=Usage)
+    stop: Optional[StopReason] = None
+
+
+class LLMBackend(Protocol):
+    """
+    A service that runs the model.
+
+    Attributes:
+        name: The name of the backend, as selected in the settings.
+        model_id: The identifier of the model.
+        api_version: The version of the request format, which together with the model identifies responses in the
+            response cache.
+    """
+
+    name: str
+    model_id: str
+    api_version: str
+
+    def invoke(self, request: LLMRequest) -> LLMResponse:
+        """
+        Send a request and wait for the complete response.
+
+        Raises:
+            BackendError: If the request failed and may be retried.
+        """
+        ...
+
+    def stream(self, request: LLMRequest) -> Iterator[StreamEvent]:
+        """
+        Send a request and stream the response as text deltas, token usage and a final stop reason.
+
+        Raises:
+            BackendError: If the request or the stream failed and may be retried.
+        """
+        ...
+
+    def prewarm(self, connections: int) -> None:
+        """
+        Open connections to the service ahead of the first requests. Failures are ignored, as requests open their own
+        connections when needed.
+
+        Args:
+            connections: The number of connections to open, at most the size of the connection pool.
+        """
+        ...
+
+
+def create_backend(name: str) -> LLMBackend:
+    """
+    Create a backend by name, importing it on first use.
+
+    Args:
+        name: The name of the backend: ``bedrock``, ``openai`` or ``fake``.
+
+    Returns:
+        The backend.
+
+    Raises:
+        ValueError: If there is no backend with the name.
+        EnvironmentError: If the backend is not configured, e.g. credentials are missing.
+    """
+    if name == "bedrock":
+        from pygen.llm.backends.bedrock import BedrockBackend
+
+        return BedrockBackend()
+    if name == "openai":
+        from pygen.llm.backends.openai import OpenAIBackend
+
+        return OpenAIBackend()
+    if name == "fake":
+        from pygen.llm.backends.fake import FakeBackend
+
+        return FakeBackend()
+    raise ValueError(f"Unknown LLM backend '{name}'. Choose one of: {', '.join(BACKENDS)}.")
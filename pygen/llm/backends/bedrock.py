@@ -0,0 +1,201 @@
+"""
+The AWS Bedrock backend, which runs Anthropic models through the Bedrock runtime API.
+"""
+
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING, Any, Dict, Iterator, List, Literal, cast
+
+import boto3
+from botocore.config import Config
+from botocore.exceptions import BotoCoreError, ClientError
+
+from pygen.llm.backends.base import BackendError, LLMRequest, LLMResponse
+from pygen.llm.stream import StopReason, StreamEvent, TextDelta, Usage
+from pygen.utils.config import get_settings, load_env
+from pygen.utils.log import get_logger
+from pygen.utils.tokens import estimate_tokens
+
+if TYPE_CHECKING:
+    from botocore.config import _RetryDict
+
+logger = get_logger(__name__)
+
+ANTHROPIC_VERSION = "bedrock-2023-05-31"
+
+# Smallest system prompt the model caches. Shorter instructions, which are all but those of the pull request prompts,
+# are sent without a cache breakpoint.
+MIN_CACHEABLE_TOKENS = 1024
+
+# Error codes that mean the service is throttling requests, compared in lower case as event streams use camel case
+THROTTLING_ERROR_CODES = {
+    "throttlingexception",
+    "throttling",
+    "toomanyrequestsexception",
+    "servicequotaexceededexception",
+    "modelnotreadyexception",
+}
+
+
+def is_throttling_error(error: BaseException) -> bool:
+    """Whether an error is the service throttling requests, including throttling reported mid-stream."""
+    if not isinstance(error, ClientError):
+        return False
+    code = error.response.get("Error", {}).get("Code", "")
+    return str(code).lower() in THROTTLING_ERROR_CODES
+
+
+class BedrockBackend:
+    """A backend that invokes an Anthropic model on AWS Bedrock with credentials from the environment."""
+
+    name = "bedrock"
+    api_version = ANTHROPIC_VERSION
+
+    def __init__(self) -> None:
+        # Load environment variables from .env file
+        load_env()
+        self.aws_access_key_id = os.getenv("AWS_ACCESS_KEY_ID")
+        self.aws_secret_access_key = os.getenv("AWS_SECRET_ACCESS_KEY")
+
+        if not self.aws_access_key_id or not self.aws_secret_access_key:
+            raise EnvironmentError(
+                "AWS credentials not found. Please add AWS_ACCESS_KEY_ID and AWS_SECRET_ACCESS_KEY to your "
+                "environment variables or a .env file in the project root."
+            )
+
+        settings = get_settings()
+        retries: "_RetryDict" = {
+            "mode": cast(Literal["legacy", "standard", "adaptive"], settings.llm_retry_mode),
+            "total_max_attempts": settings.llm_max_attempts,
+        }
+        # self.model_name = "claude-3-opus"
+        self.model_name = "claude-3-5-sonnet"
+        self.region_name = "us-east-1"
+        self.model_id = f"anthropic.{self.model_name}-20240620-v1:0"
+        self.prompt_cache = settings.prompt_cache
+        # A single client is shared by all threads, so its connection pool must fit the batch concurrency. The client
+        # retries little itself, as the LLM client retries with its own backoff and rate limiter.
+        self.brt = boto3.client(
+            service_name="bedrock-runtime",
+            aws_access_key_id=self.aws_access_key_id,
+            aws_secret_access_key=self.aws_secret_access_key,
+            region_name=self.region_name,
+            config=Config(
+                max_pool_connections=settings.llm_pool_connections,
+                connect_timeout=settings.llm_connect_timeout,
+                read_timeout=settings.llm_read_timeout,
+                tcp_keepalive=settings.llm_tcp_keepalive,
+                retries=retries,
+            ),
+        )
+
+    def prewarm(self, connections: int) -> None:
+        """
+        Open connections to the service concurrently, so the first requests do not wait for the TCP and TLS
+        handshakes.
+
+        Each connection is opened by a request with an empty body, which the service rejects without running the model.
+        The rejection is expected, as any response leaves an open connection in the client's pool.
+
+        Args:
+            connections: The number of connections to open.
+        """
+
+        def connect(_: int) -> None:
+            try:
+                self.brt.invoke_model(
+                    body=b"{}", modelId=self.model_id, accept="application/json", contentType="application/json"
+                )
+            except ClientError:
+                pass
+            except BotoCoreError as error:
+                logger.debug(f"Could not pre-warm a connection to Bedrock: {error}")
+
+        connections = min(connections, get_settings().llm_pool_connections)
+        if connections < 1:
+            return
+        with ThreadPoolExecutor(max_workers=connections, thread_name_prefix="pygen-prewarm") as executor:
+            list(executor.map(connect, range(connections)))
+
+    def build_system(self, instructions: str) -> List[Dict[str, Any]]:
+        """
+        Build the system prompt for static instructions, marking it for prompt caching if it is large enough.
+
+        Args:
+            instructions: The instructions.
+
+        Returns:
+            The system prompt content blocks.
+        """
+        block: Dict[str, Any] = {"type": "text", "text": instructions}
+        if self.prompt_cache and estimate_tokens(instructions) >= MIN_CACHEABLE_TOKENS:
+            block["cache_control"] = {"type": "ephemeral"}
+        return [block]
+
+    def build_body(self, request: LLMRequest) -> str:
+        """
+        Build the JSON request body of a request.
+
+        The instructions of the request are sent as the system prompt and only its content as the user message, so
+        requests that share instructions can read them from the prompt cache.
+
+        Args:
+            request: The request.
+
+        Returns:
+            The request body.
+        """
+        body: Dict[str, Any] = {"anthropic_version": ANTHROPIC_VERSION, "max_tokens": request.max_tokens}
+        if request.instructions is not None:
+            body["system"] = self.build_system(request.instructions)
+        messages = [{"role": "user", "content": request.prompt}]
+        if request.prefill:
+            messages.append({"role": "assistant", "content": request.prefill})
+        body["messages"] = messages
+        return json.dumps(body)
+
+    def invoke(self, request: LLMRequest) -> LLMResponse:
+        try:
+            response = self.brt.invoke_model(
+                body=self.build_body(request),
+                modelId=self.model_id,
+                accept="application/json",
+                contentType="application/json",
+            )
+            response_body: Dict[str, Any] = json.loads(response.get("body").read())
+        except (BotoCoreError, ClientError) as error:
+            raise BackendError(str(error), is_throttling_error(error)) from error
+
+        usage = Usage.from_response(response_body.get("usage", {}))
+        stop = StopReason(response_body.get("stop_reason"), response_body.get("stop_sequence"))
+        content = response_body.get("content")
+
+        if content and isinstance(content, list) and len(content) > 0:
+            text = content[0].get("text")
+            if text and isinstance(text, str):
+                return LLMResponse(text, usage, stop)
+            else:
+                raise RuntimeError("Invalid response format: 'text' field is missing or not a string.")
+        else:
+            raise RuntimeError("Invalid response format: 'content' field is missing or not a list.")
+
+    def stream(self, request: LLMRequest) -> Iterator[StreamEvent]:
+        try:
+            response = self.brt.invoke_model_with_response_stream(body=self.build_body(request), modelId=self.model_id)
+
+            for event in response.get("body"):
+                chunk = json.loads(event["chunk"]["bytes"])
+
+                if chunk["type"] == "content_block_delta" and chunk["delta"]["type"] == "text_delta":
+                    yield TextDelta(chunk["delta"]["text"])
+
+                elif chunk["type"] == "message_start":
+                    yield Usage.from_response(chunk["message"].get("usage", {}))
+
+                elif chunk["type"] == "message_delta":
+                    yield Usage(output_tokens=chunk.get("usage", {}).get("output_tokens"))
+                    yield StopReason(chunk["delta"]["stop_reason"], chunk["delta"].get("stop_sequence"))
+
+        except (BotoCoreError, ClientError) as error:
+            raise BackendError(str(error), is_throttling_error(error)) from error
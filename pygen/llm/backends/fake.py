@@ -0,0 +1,343 @@
+"""
+A fake LLM server for measuring pygen's request pipeline offline.
+
+The server speaks the OpenAI-compatible chat completions API and replays canned responses, with a configurable delay
+before the first token, a token rate, and injected errors: server errors, throttling, and streams that are cut off part
+way through. The ``fake`` backend starts a server in the background and sends requests to it over HTTP, so concurrency,
+retries and throughput can be measured without an account with a model provider.
+
+The server can also be run on its own and used with the ``openai`` backend:
+
+    python -m pygen.llm.backends.fake --port 8000 --latency-ms 500 --tokens-per-second 50
+"""
+
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import typer
+
+from pygen.llm.backends.openai import OpenAIBackend
+from pygen.utils.config import get_settings
+from pygen.utils.log import get_logger
+from pygen.utils.tokens import count_tokens
+
+logger = get_logger(__name__)
+
+# Pieces of a response streamed as one token each: a word with the whitespace that follows it
+TOKEN_PATTERN = re.compile(r"\S+\s*|\s+")
+
+DEFAULT_RESPONSE = """This is a canned response from the pygen fake LLM server.
+
+```python
+def example(value: int) -> int:
+    \"\"\"Return the value doubled.\"\"\"
+    return value * 2
+```
+
+The server replays canned responses with simulated latency, throughput and errors, so the pipeline can be measured
+without calling a real model.
+"""
+
+
+def load_responses(path: Optional[Path]) -> List[str]:
+    """
+    Load canned responses from a text file, or from every text file in a directory.
+
+    Args:
+        path: The file or directory. The default response is used if it is None.
+
+    Returns:
+        The responses.
+    """
+    if path is None:
+        return [DEFAULT_RESPONSE]
+    files = sorted(p for p in path.iterdir() if p.is_file()) if path.is_dir() else [path]
+    responses = [file.read_text(encoding="utf-8") for file in files]
+    return [response for response in responses if response] or [DEFAULT_RESPONSE]
+
+
+class FakeServer(ThreadingHTTPServer):
+    """
+    An OpenAI-compatible chat completions server that replays canned responses.
+
+    The response to a request is chosen by a hash of its messages, so a prompt always gets the same response. Errors
+    are injected at random with the given rates.
+
+    Attributes:
+        responses: The canned responses.
+        latency: Seconds to wait before the first token.
+        tokens_per_second: Rate at which tokens are sent. Zero sends them as fast as possible.
+        error_rate: Fraction of requests that fail with a server error.
+        throttle_rate: Fraction of requests that are rejected as throttled.
+        drop_rate: Fraction of streamed responses that are cut off part way through.
+    """
+
+    daemon_threads = True
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        responses: Sequence[str] = (DEFAULT_RESPONSE,),
+        latency: float = 0.0,
+        tokens_per_second: float = 0.0,
+        error_rate: float = 0.0,
+        throttle_rate: float = 0.0,
+        drop_rate: float = 0.0,
+        seed: Optional[int] = None,
+    ) -> None:
+        super().__init__((host, port), FakeRequestHandler)
+        self.responses = list(responses)
+        self.latency = latency
+        self.tokens_per_second = tokens_per_second
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.drop_rate = drop_rate
+        self._random = random.Random(seed)  # nosec B311
+        self._random_lock = threading.Lock()
+
+    @property
+    def base_url(self) -> str:
+        """The base URL of the API, for an OpenAI-compatible client."""
+        host = self.server_address[0]
+        if isinstance(host, bytes):
+            host = host.decode("ascii")
+        return f"http://{host}:{self.server_port}/v1"
+
+    def chance(self, rate: float) -> bool:
+        """Return True with the given probability."""
+        with self._random_lock:
+            return rate > 0 and self._random.random() < rate
+
+    def choose_response(self, messages: List[Dict[str, Any]]) -> str:
+        """Choose the canned response to a request by a hash of its messages."""
+        digest = hashlib.sha256(json.dumps(messages, sort_keys=True).encode("utf-8")).digest()
+        return self.responses[int.from_bytes(digest[:8], "big") % len(self.responses)]
+
+    def start(self) -> threading.Thread:
+        """Serve requests on a daemon thread."""
+        thread = threading.Thread(target=self.serve_forever, name="pygen-fake-llm", daemon=True)
+        thread.start()
+        return thread
+
+
+class FakeRequestHandler(BaseHTTPRequestHandler):
+    """Handles chat completion requests to a ``FakeServer``."""
+
+    server: FakeServer
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format: str, *args: Any) -> None:  # noqa: A002
+        logger.debug(f"Fake LLM server: {format % args}")
+
+    def send_json(self, status: int, body: Dict[str, Any]) -> None:
+        """Send a complete JSON response."""
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def send_chunk(self, data: bytes) -> None:
+        """Send one chunk of a response with chunked transfer encoding."""
+        self.wfile.write(f"{len(data):x}\r\n".encode("ascii") + data + b"\r\n")
+        self.wfile.flush()
+
+    def send_event(self, body: Any) -> None:
+        """Send a server-sent event."""
+        data = body if isinstance(body, str) else json.dumps(body)
+        self.send_chunk(f"data: {data}\n\n".encode("utf-8"))
+
+    def read_request(self) -> Optional[Dict[str, Any]]:
+        """
+        Read the JSON body of a chat completion request, answering invalid requests with a 400 error.
+
+        Returns:
+            The request, or None if it was invalid.
+        """
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            if length < 0:
+                raise ValueError(f"negative Content-Length {length}")
+        except ValueError as error:
+            # The end of the body is unknown, so the connection cannot be reused
+            self.close_connection = True
+            self.send_json(400, {"error": {"message": f"Invalid Content-Length: {error}"}})
+            return None
+        try:
+            request = json.loads(self.rfile.read(length))
+            messages = request["messages"]
+            if not isinstance(messages, list) or not messages:
+                raise ValueError("messages must be a non-empty list")
+            if not all(isinstance(message, dict) for message in messages):
+                raise ValueError("each message must be an object")
+        except (ValueError, KeyError, TypeError) as error:
+            self.send_json(400, {"error": {"message": f"Invalid request: {error}"}})
+            return None
+        return dict(request)
+
+    def inject_error(self) -> bool:
+        """Answer the request with a throttling or server error at the server's rates, returning whether it did."""
+        server = self.server
+        if server.chance(server.throttle_rate):
+            self.send_json(429, {"error": {"message": "Too many requests (injected)", "type": "rate_limit_error"}})
+            return True
+        if server.chance(server.error_rate):
+            self.send_json(500, {"error": {"message": "Internal server error (injected)", "type": "server_error"}})
+            return True
+        return False
+
+    def choose_tokens(self, request: Dict[str, Any]) -> Tuple[List[str], str]:
+        """
+        Choose the response to a request, limited to its maximum number of tokens.
+
+        Returns:
+            The tokens of the response, and the reason it finished: ``stop``, or ``length`` if it was cut short.
+        """
+        messages = request["messages"]
+        # A prefilled assistant message continues the response to the messages before it
+        prefill = messages[-1].get("content", "") if messages[-1].get("role") == "assistant" else ""
+        text = self.server.choose_response(messages[:-1] if prefill else messages)
+        if prefill and text.startswith(prefill.rstrip()):
+            # Continue a prefilled response from where it left off
+            text = text[len(prefill.rstrip()) :]
+        all_tokens = TOKEN_PATTERN.findall(text)
+        tokens = all_tokens[: request.get("max_tokens") or None]
+        return tokens, "length" if len(tokens) < len(all_tokens) else "stop"
+
+    def do_POST(self) -> None:  # noqa: N802
+        if not self.path.rstrip("/").endswith("/chat/completions"):
+            self.send_json(404, {"error": {"message": f"Unknown path {self.path}"}})
+            return
+        request = self.read_request()
+        if request is None or self.inject_error():
+            return
+
+        tokens, finish_reason = self.choose_tokens(request)
+        time.sleep(self.server.latency)
+        if request.get("stream"):
+            self.stream_response(request, tokens, finish_reason)
+        else:
+            self.complete_response(request, tokens, finish_reason)
+
+    def complete_response(self, request: Dict[str, Any], tokens: List[str], finish_reason: str) -> None:
+        """Send the whole response at once, after the time it would take to generate."""
+        if self.server.tokens_per_second > 0:
+            time.sleep(len(tokens) / self.server.tokens_per_second)
+        message = {"role": "assistant", "content": "".join(tokens)}
+        choice = {"index": 0, "message": message, "finish_reason": finish_reason}
+        self.send_json(200, {"object": "chat.completion", "model": request.get("model"), "choices": [choice]})
+
+    def stream_response(self, request: Dict[str, Any], tokens: List[str], finish_reason: str) -> None:
+        """Stream the response as server-sent events at the server's token rate, cutting it off at its drop rate."""
+        server = self.server
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+
+        drop_at = len(tokens) // 2 if server.chance(server.drop_rate) else None
+        delay = 1 / server.tokens_per_second if server.tokens_per_second > 0 else 0
+        for index, token in enumerate(tokens):
+            if index == drop_at:
+                # End the connection without finishing the response, as a failing network would
+                self.close_connection = True
+                return
+            self.send_event({"object": "chat.completion.chunk", "choices": [{"index": 0, "delta": {"content": token}}]})
+            if delay:
+                time.sleep(delay)
+
+        self.send_event(
+            {"object": "chat.completion.chunk", "choices": [{"index": 0, "delta": {}, "finish_reason": finish_reason}]}
+        )
+        if (request.get("stream_options") or {}).get("include_usage"):
+            prompt_tokens = sum(count_tokens(str(message.get("content", ""))) for message in request["messages"])
+            usage = {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": len(tokens),
+                "total_tokens": prompt_tokens + len(tokens),
+            }
+            self.send_event({"object": "chat.completion.chunk", "choices": [], "usage": usage})
+        self.send_event("[DONE]")
+        self.send_chunk(b"")
+
+
+def create_server(host: str = "127.0.0.1", port: int = 0) -> FakeServer:
+    """Create a fake server configured by the ``PYGEN_FAKE_*`` settings."""
+    settings = get_settings()
+    return FakeServer(
+        host,
+        port,
+        load_responses(settings.fake_responses),
+        latency=settings.fake_latency_ms / 1000,
+        tokens_per_second=settings.fake_tokens_per_second,
+        error_rate=settings.fake_error_rate,
+        throttle_rate=settings.fake_throttle_rate,
+        drop_rate=settings.fake_drop_rate,
+    )
+
+
+_SERVER: Optional[FakeServer] = None
+_SERVER_LOCK = threading.Lock()
+
+
+def get_fake_server() -> FakeServer:
+    """Get the process-wide fake server, starting it on a free local port on first use."""
+    global _SERVER
+    with _SERVER_LOCK:
+        if _SERVER is None:
+            _SERVER = create_server()
+            _SERVER.start()
+            logger.debug(f"Started fake LLM server at {_SERVER.base_url}")
+        return _SERVER
+
+
+class FakeBackend(OpenAIBackend):
+    """A backend that sends requests over HTTP to a fake server running in the background of this process."""
+
+    name = "fake"
+
+    def __init__(self) -> None:
+        super().__init__(get_fake_server().base_url, "fake")
+
+
+def serve(
+    host: str = typer.Option("127.0.0.1", help="Address to listen on."),
+    port: int = typer.Option(8000, help="Port to listen on."),
+    responses: Optional[Path] = typer.Option(None, help="Text file, or directory of text files, of canned responses."),
+    latency_ms: float = typer.Option(0.0, help="Milliseconds to wait before the first token."),
+    tokens_per_second: float = typer.Option(0.0, help="Rate at which tokens are sent. Zero is unlimited."),
+    error_rate: float = typer.Option(0.0, help="Fraction of requests that fail with a server error."),
+    throttle_rate: float = typer.Option(0.0, help="Fraction of requests that are rejected as throttled."),
+    drop_rate: float = typer.Option(0.0, help="Fraction of streamed responses that are cut off part way through."),
+) -> None:
+    """Run a fake OpenAI-compatible LLM server until interrupted."""
+    server = FakeServer(
+        host,
+        port,
+        load_responses(responses),
+        latency_ms / 1000,
+        tokens_per_second,
+        error_rate,
+        throttle_rate,
+        drop_rate,
+    )
+    typer.echo(f"Serving a fake LLM at {server.base_url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    typer.run(serve)
@@ -0,0 +1,280 @@
+"""
+A backend for servers with an OpenAI-compatible chat completions API, such as a local llama.cpp or vLLM server.
+
+Requests are sent with the standard library's HTTP client, so no further dependencies are needed. Keep-alive
+connections are shared by all threads through a pool, and streamed responses are read as server-sent events.
+"""
+
+import http.client
+import json
+import os
+import socket
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+from pygen.llm.backends.base import BackendError, LLMRequest, LLMResponse
+from pygen.llm.stream import StopReason, StreamEvent, TextDelta, Usage
+from pygen.utils.config import get_settings, load_env
+from pygen.utils.log import get_logger
+
+logger = get_logger(__name__)
+
+API_VERSION = "openai-chat-completions"
+
+# HTTP status codes that mean the server is throttling requests
+THROTTLING_STATUSES = {429}
+
+# HTTP status codes of failures that may succeed if the request is retried
+RETRYABLE_STATUSES = {408, 409, 429, 500, 502, 503, 504}
+
+
+def parse_usage(usage: Optional[Dict[str, Any]]) -> Usage:
+    """Convert the ``usage`` object of a chat completion into token usage."""
+    if not usage:
+        return Usage()
+    cached = (usage.get("prompt_tokens_details") or {}).get("cached_tokens")
+    input_tokens = usage.get("prompt_tokens")
+    if input_tokens is not None and cached:
+        input_tokens -= cached
+    return Usage(input_tokens, usage.get("completion_tokens"), cached)
+
+
+def parse_chunk(chunk: Dict[str, Any]) -> Iterator[StreamEvent]:
+    """Convert a chunk of a streamed chat completion into stream events."""
+    if chunk.get("usage"):
+        yield parse_usage(chunk["usage"])
+    for choice in chunk.get("choices") or []:
+        text = (choice.get("delta") or {}).get("content")
+        if text:
+            yield TextDelta(text)
+        if choice.get("finish_reason"):
+            yield StopReason(choice["finish_reason"])
+
+
+class PooledConnection:
+    """
+    Sets the socket options of a pooled connection each time it connects.
+
+    The connect timeout applies only while connecting; afterwards the read timeout applies while waiting for a response.
+    """
+
+    sock: socket.socket
+    read_timeout: float
+    keepalive: bool
+
+    def connect(self) -> None:
+        super().connect()  # type: ignore[misc]
+        self.sock.settimeout(self.read_timeout)
+        if self.keepalive:
+            self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+
+
+class PooledHTTPConnection(PooledConnection, http.client.HTTPConnection):
+    """An HTTP connection for the connection pool."""
+
+
+class PooledHTTPSConnection(PooledConnection, http.client.HTTPSConnection):
+    """An HTTPS connection for the connection pool."""
+
+
+class OpenAIBackend:
+    """
+    A backend that calls the chat completions endpoint of an OpenAI-compatible server.
+
+    The server is configured with ``PYGEN_OPENAI_BASE_URL`` and ``PYGEN_OPENAI_MODEL``, and an API key is sent if
+    ``OPENAI_API_KEY`` is set.
+    """
+
+    name = "openai"
+    api_version = API_VERSION
+
+    def __init__(self, base_url: Optional[str] = None, model_id: Optional[str] = None) -> None:
+        load_env()
+        settings = get_settings()
+        self.base_url = (base_url or settings.openai_base_url).rstrip("/")
+        self.model_id = model_id or settings.openai_model
+        self.api_key = os.getenv("OPENAI_API_KEY")
+
+        url = urlsplit(self.base_url)
+        if url.scheme not in ("http", "https") or not url.hostname:
+            raise EnvironmentError(f"Invalid OpenAI-compatible base URL '{self.base_url}'. Set PYGEN_OPENAI_BASE_URL.")
+        self.scheme = url.scheme
+        self.host = url.hostname
+        self.port = url.port
+        self.path = f"{url.path}/chat/completions"
+
+        self.pool_size = settings.llm_pool_connections
+        self.connect_timeout = settings.llm_connect_timeout
+        self.read_timeout = settings.llm_read_timeout
+        self.keepalive = settings.llm_tcp_keepalive
+        # Idle keep-alive connections, most recently used last
+        self._idle: List[http.client.HTTPConnection] = []
+        self._idle_lock = threading.Lock()
+
+    def open_connection(self) -> http.client.HTTPConnection:
+        """Create a connection to the server. It connects when it is first used."""
+        connection_class = PooledHTTPSConnection if self.scheme == "https" else PooledHTTPConnection
+        connection = connection_class(self.host, self.port, timeout=self.connect_timeout)
+        connection.read_timeout = self.read_timeout
+        connection.keepalive = self.keepalive
+        return connection
+
+    def acquire_connection(self) -> Tuple[http.client.HTTPConnection, bool]:
+        """
+        Take an idle connection from the pool, or create one if the pool is empty.
+
+        Returns:
+            The connection, and whether it was reused from the pool.
+        """
+        with self._idle_lock:
+            if self._idle:
+                return self._idle.pop(), True
+        return self.open_connection(), False
+
+    def release_connection(self, connection: http.client.HTTPConnection, reusable: bool = True) -> None:
+        """
+        Return a connection to the pool, or close it if it cannot be reused or the pool is full.
+
+        Args:
+            connection: The connection.
+            reusable: Whether the last response was read to the end, so another request can be sent on the connection.
+        """
+        if reusable and connection.sock is not None:
+            with self._idle_lock:
+                if len(self._idle) < self.pool_size:
+                    self._idle.append(connection)
+                    return
+        connection.close()
+
+    def prewarm(self, connections: int) -> None:
+        """
+        Open connections to the server concurrently and add them to the pool, so the first requests do not wait for
+        the TCP and TLS handshakes.
+
+        Args:
+            connections: The number of connections to open.
+        """
+
+        def connect(_: int) -> Optional[http.client.HTTPConnection]:
+            connection = self.open_connection()
+            try:
+                connection.connect()
+            except OSError as error:
+                logger.debug(f"Could not pre-warm a connection to {self.base_url}: {error}")
+                return None
+            return connection
+
+        connections = min(connections, self.pool_size)
+        if connections < 1:
+            return
+        with ThreadPoolExecutor(max_workers=connections, thread_name_prefix="pygen-prewarm") as executor:
+            for connection in executor.map(connect, range(connections)):
+                if connection is not None:
+                    self.release_connection(connection)
+
+    def build_body(self, request: LLMRequest, stream: bool) -> str:
+        """
+        Build the JSON request body of a request.
+
+        Args:
+            request: The request.
+            stream: Whether to ask for a streamed response.
+
+        Returns:
+            The request body.
+        """
+        messages: List[Dict[str, str]] = []
+        if request.instructions is not None:
+            messages.append({"role": "system", "content": request.instructions})
+        messages.append({"role": "user", "content": request.prompt})
+        if request.prefill:
+            messages.append({"role": "assistant", "content": request.prefill})
+
+        body: Dict[str, Any] = {"model": self.model_id, "messages": messages, "max_tokens": request.max_tokens}
+        if stream:
+            body["stream"] = True
+            body["stream_options"] = {"include_usage": True}
+        return json.dumps(body)
+
+    def send(self, request: LLMRequest, stream: bool) -> Tuple[http.client.HTTPConnection, http.client.HTTPResponse]:
+        """
+        Send a request and return the response once its status is known.
+
+        A request that fails on a connection taken from the pool is sent once more on a new connection, as the server
+        may have closed the idle connection in the meantime.
+
+        Returns:
+            The connection, to be released once the response has been read, and the response.
+
+        Raises:
+            BackendError: If the request failed and may be retried.
+            RuntimeError: If the server rejected the request.
+        """
+        headers = {"Content-Type": "application/json", "Accept": "text/event-stream" if stream else "application/json"}
+        if self.api_key:
+            headers["Authorization"] = f"Bearer {self.api_key}"
+        body = self.build_body(request, stream).encode("utf-8")
+
+        while True:
+            connection, reused = self.acquire_connection()
+            try:
+                connection.request("POST", self.path, body=body, headers=headers)
+                response = connection.getresponse()
+                break
+            except (OSError, http.client.HTTPException) as error:
+                connection.close()
+                if not reused:
+                    raise BackendError(f"Request to {self.base_url} failed: {error}") from error
+                logger.debug(f"Pooled connection to {self.base_url} was closed, retrying on a new one: {error}")
+
+        if response.status != 200:
+            detail = response.read().decode("utf-8", errors="replace")[:500]
+            self.release_connection(connection, not response.will_close)
+            message = f"{self.base_url} returned HTTP {response.status}: {detail}"
+            if response.status in RETRYABLE_STATUSES:
+                raise BackendError(message, response.status in THROTTLING_STATUSES)
+            raise RuntimeError(message)
+        return connection, response
+
+    def invoke(self, request: LLMRequest) -> LLMResponse:
+        connection, response = self.send(request, stream=False)
+        try:
+            response_body: Dict[str, Any] = json.loads(response.read())
+        except (OSError, http.client.HTTPException) as error:
+            connection.close()
+            raise BackendError(f"Reading the response from {self.base_url} failed: {error}") from error
+        self.release_connection(connection, not response.will_close)
+
+        choices = response_body.get("choices")
+        if not choices or not isinstance(choices, list):
+            raise RuntimeError("Invalid response format: 'choices' field is missing or not a list.")
+        text = (choices[0].get("message") or {}).get("content")
+        if not isinstance(text, str):
+            raise RuntimeError("Invalid response format: 'content' field is missing or not a string.")
+        return LLMResponse(text, parse_usage(response_body.get("usage")), StopReason(choices[0].get("finish_reason")))
+
+    def stream(self, request: LLMRequest) -> Iterator[StreamEvent]:
+        connection, response = self.send(request, stream=True)
+        done = False
+        try:
+            for line in response:
+                if not line.startswith(b"data:"):
+                    continue
+                data = line[5:].strip()
+                if data == b"[DONE]":
+                    # Read the end of the body, so the connection can be reused
+                    response.read()
+                    done = True
+                    break
+
+                yield from parse_chunk(json.loads(data))
+        except (OSError, http.client.HTTPException, ValueError) as error:
+            raise BackendError(f"Stream from {self.base_url} failed: {error}") from error
+        finally:
+            # A connection left part way through a response cannot be reused
+            self.release_connection(connection, done and not response.will_close)
+
+        if not done:
+            raise BackendError(f"Stream from {self.base_url} ended before the response was complete")
@@ -0,0 +1,117 @@
+"""
+Token budgets for LLM requests.
+
+Each prompt is budgeted before it is sent: its input tokens are estimated offline and an output token limit is chosen
+for the command that produced it. Prompts that cannot fit in the model's context window together with a useful amount
+of output are rejected without a network round trip.
+"""
+
+from dataclasses import dataclass
+from typing import Dict, Optional
+
+from pygen.prompts.prompt import Prompt, PromptLike, get_prompt_text
+from pygen.utils.tokens import estimate_tokens
+
+# Context window of the model, shared by the prompt and the response
+CONTEXT_WINDOW = 200000
+
+# Maximum number of output tokens the model can generate in one response
+MAX_OUTPUT_TOKENS = 4096
+
+# Smallest output token limit worth sending a request for
+MIN_OUTPUT_TOKENS = 256
+
+# Allowance for the heading that introduces the source code in the content of a prompt, such as ``Module Code:``
+FRAMING_TOKENS = 16
+
+# Output token limits by command path, below the root command. The longest matching prefix applies.
+OUTPUT_TOKENS: Dict[str, int] = {
+    "": MAX_OUTPUT_TOKENS,
+    "explain": 2048,
+    "generate docstring": 1024,
+    "generate tests": 4096,
+    "git commit": 512,
+    "git pr": 1536,
+    "git review": 4096,
+    "refactor": 4096,
+    "review": 4096,
+}
+
+
+class PromptTooLargeError(ValueError):
+    """Raised when a prompt cannot fit in the context window together with the minimum output."""
+
+    def __init__(self, command: str, input_tokens: int, context_window: int) -> None:
+        super().__init__(command, input_tokens, context_window)
+        self.command = command
+        self.input_tokens = input_tokens
+        self.context_window = context_window
+
+    def __str__(self) -> str:
+        return (
+            f"The prompt for '{self.command or 'pygen'}' is too large: about {self.input_tokens} tokens, but at most "
+            f"{self.context_window - MIN_OUTPUT_TOKENS} fit in the model's context window. Try a smaller module, class "
+            "or function."
+        )
+
+
+@dataclass(frozen=True)
+class TokenBudget:
+    """
+    The token budget of a request.
+
+    Attributes:
+        command: The command path of the request, below the root command.
+        input_tokens: The estimated number of prompt tokens.
+        max_tokens: The output token limit to request.
+        context_window: The context window of the model.
+    """
+
+    command: str
+    input_tokens: int
+    max_tokens: int
+    context_window: int = CONTEXT_WINDOW
+
+    @property
+    def total_tokens(self) -> int:
+        """The largest number of tokens the request can use."""
+        return self.input_tokens + self.max_tokens
+
+
+def get_output_tokens(command: str) -> int:
+    """Return the output token limit of a command path, from the longest matching entry of ``OUTPUT_TOKENS``."""
+    words = command.split()
+    for length in range(len(words), -1, -1):
+        limit = OUTPUT_TOKENS.get(" ".join(words[:length]))
+        if limit is not None:
+            return min(limit, MAX_OUTPUT_TOKENS)
+    return MAX_OUTPUT_TOKENS
+
+
+def plan_prompt(
+    prompt: PromptLike, command: str = "", context_window: int = CONTEXT_WINDOW, source_tokens: Optional[int] = None
+) -> TokenBudget:
+    """
+    Budget a prompt for a command, shrinking the output limit if needed to fit the context window.
+
+    Args:
+        prompt: The prompt.
+        command: The command path of the request, below the root command, e.g. ``generate docstring module``.
+        context_window: The context window of the model.
+        source_tokens: The estimated number of tokens in the source code the prompt is built around, if known, such as
+            the count the symbol index keeps for a module. Only the instructions are then estimated.
+
+    Returns:
+        The token budget of the request.
+
+    Raises:
+        PromptTooLargeError: If the prompt leaves less than ``MIN_OUTPUT_TOKENS`` of the context window for output.
+    """
+    if isinstance(prompt, Prompt) and source_tokens is not None:
+        input_tokens = estimate_tokens(prompt.instructions) + source_tokens + FRAMING_TOKENS
+    else:
+        input_tokens = estimate_tokens(get_prompt_text(prompt))
+    available = context_window - input_tokens
+    if available < MIN_OUTPUT_TOKENS:
+        raise PromptTooLargeError(command, input_tokens, context_window)
+    return TokenBudget(command, input_tokens, min(get_output_tokens(command), available), context_window)
@@ -0,0 +1,195 @@
+"""
+Content-addressed on-disk cache of LLM responses.
+
+Responses are stored in a SQLite database keyed by a hash of everything that determines them: the model id, the
+Anthropic API version, the token limit and the exact prompt. The cache is bounded in size by evicting the least
+recently used responses, and entries may optionally expire after a time to live.
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Optional
+
+from pygen.utils.config import get_settings
+from pygen.utils.log import get_logger
+
+logger = get_logger(__name__)
+
+CACHE_FILE = "responses.sqlite"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key TEXT PRIMARY KEY,
+    text TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    created_at REAL NOT NULL,
+    accessed_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS responses_accessed_at ON responses (accessed_at);
+"""
+
+
+def get_default_cache_dir() -> Path:
+    """Return the user cache directory for PyGen, honouring ``XDG_CACHE_HOME``."""
+    return Path(os.getenv("XDG_CACHE_HOME") or Path.home() / ".cache") / "pygen"
+
+
+def response_key(model_id: str, api_version: str, max_tokens: int, prompt: str) -> str:
+    """Return the cache key of a request, the SHA-256 hex digest of its model, API version, token limit and prompt."""
+    payload = json.dumps([model_id, api_version, max_tokens, prompt], ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """
+    SQLite-backed cache of LLM responses with LRU eviction and an optional TTL.
+
+    Database errors are logged and treated as cache misses, so a broken or locked cache never stops a request. A cache
+    whose directory cannot be created is disabled for the rest of the process.
+    """
+
+    def __init__(self, path: Path, max_bytes: int, ttl: Optional[float] = None) -> None:
+        self.path = path
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._connection: Optional[sqlite3.Connection] = None
+        self.disabled = False
+
+    @property
+    def connection(self) -> sqlite3.Connection:
+        """The database connection, opened and initialised on first use."""
+        if self._connection is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            connection = sqlite3.connect(self.path, timeout=5.0, check_same_thread=False, isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            connection.executescript(SCHEMA)
+            self._connection = connection
+        return self._connection
+
+    def disable(self, error: OSError) -> None:
+        """Stop using the cache after its directory or database file could not be opened."""
+        logger.warning(f"Response cache disabled, as {self.path} could not be opened: {error}")
+        self.disabled = True
+
+    def get(self, key: str) -> Optional[str]:
+        """
+        Look up a response, marking it as recently used.
+
+        Args:
+            key: The cache key of the request.
+
+        Returns:
+            The cached response text, or None if there is no unexpired entry.
+        """
+        if self.disabled:
+            return None
+        now = time.time()
+        try:
+            with self._lock:
+                row = self.connection.execute("SELECT text, created_at FROM responses WHERE key = ?", (key,)).fetchone()
+                if row is None:
+                    return None
+                text, created_at = row
+                if self.ttl is not None and now - created_at > self.ttl:
+                    self.connection.execute("DELETE FROM responses WHERE key = ?", (key,))
+                    return None
+                self.connection.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (now, key))
+                return str(text)
+        except sqlite3.Error as e:
+            logger.debug(f"Response cache lookup failed: {e}")
+        except OSError as e:
+            self.disable(e)
+        return None
+
+    def put(self, key: str, text: str) -> None:
+        """
+        Store a response, then evict the least recently used responses until the cache fits its size limit.
+
+        Args:
+            key: The cache key of the request.
+            text: The response text.
+        """
+        size = len(text.encode("utf-8"))
+        if self.disabled or size > self.max_bytes:
+            return
+
+        now = time.time()
+        try:
+            with self._lock:
+                connection = self.connection
+                connection.execute("BEGIN IMMEDIATE")
+                try:
+                    connection.execute(
+                        "INSERT OR REPLACE INTO responses (key, text, size, created_at, accessed_at) "
+                        "VALUES (?, ?, ?, ?, ?)",
+                        (key, text, size, now, now),
+                    )
+                    self._evict(connection)
+                    connection.execute("COMMIT")
+                except BaseException:
+                    connection.execute("ROLLBACK")
+                    raise
+        except sqlite3.Error as e:
+            logger.debug(f"Response cache store failed: {e}")
+        except OSError as e:
+            self.disable(e)
+
+    def _evict(self, connection: sqlite3.Connection) -> None:
+        """Delete expired responses, then the least recently used ones until the total size fits the limit."""
+        if self.ttl is not None:
+            connection.execute("DELETE FROM responses WHERE created_at < ?", (time.time() - self.ttl,))
+
+        (total,) = connection.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()
+        excess = total - self.max_bytes
+        if excess <= 0:
+            return
+
+        keys = []
+        for key, size in connection.execute("SELECT key, size FROM responses ORDER BY accessed_at"):
+            keys.append((key,))
+            excess -= size
+            if excess <= 0:
+                break
+        connection.executemany("DELETE FROM responses WHERE key = ?", keys)
+        logger.debug(f"Evicted {len(keys)} responses from the response cache")
+
+    def clear(self) -> None:
+        """Delete all cached responses."""
+        if self.disabled:
+            return
+        try:
+            with self._lock:
+                self.connection.execute("DELETE FROM responses")
+        except sqlite3.Error as e:
+            logger.debug(f"Response cache clear failed: {e}")
+        except OSError as e:
+            self.disable(e)
+
+    def close(self) -> None:
+        """Close the database connection."""
+        with self._lock:
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
+
+
+_RESPONSE_CACHE: Optional[ResponseCache] = None
+
+
+def get_response_cache() -> Optional[ResponseCache]:
+    """Get the process-wide response cache, or None if caching is disabled in the settings."""
+    global _RESPONSE_CACHE
+    settings = get_settings()
+    if not settings.cache:
+        return None
+    if _RESPONSE_CACHE is None:
+        cache_dir = settings.cache_dir or get_default_cache_dir()
+        _RESPONSE_CACHE = ResponseCache(cache_dir / CACHE_FILE, settings.cache_max_bytes, settings.cache_ttl)
+    return _RESPONSE_CACHE
@@ -1,108 +1,353 @@
-import json
 import logging
-import os
 import time
-from typing import Any, Dict
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from typing import Dict, Generator, Iterable, Iterator, List, Optional, Sequence, Set
 
-import boto3
-from botocore.exceptions import BotoCoreError, ClientError
-from dotenv import load_dotenv
+from pygen.llm.backends.base import BackendError, LLMBackend, LLMRequest, create_backend
+from pygen.llm.budget import MAX_OUTPUT_TOKENS
+from pygen.llm.cache import response_key
+from pygen.llm.limits import backoff_delay, get_rate_limiter, is_throttling_error
+from pygen.llm.metrics import RequestMetrics, get_metrics
+from pygen.llm.stream import Sink, StreamEvent, TerminalSink, TextDelta, TextSink, Usage, pipe
+from pygen.prompts.prompt import PromptLike, get_prompt_text
+from pygen.utils.config import get_settings
+from pygen.utils.tokens import estimate_tokens
 
-# Load environment variables from .env file
-load_dotenv()
+
+@dataclass
+class BatchResult:
+    """
+    The outcome of one prompt in a batch.
+
+    Attributes:
+        index: The position of the prompt in the batch.
+        prompt: The prompt.
+        text: The response text, if the request succeeded.
+        error: The error raised by the request, if it failed.
+    """
+
+    index: int
+    prompt: PromptLike
+    text: Optional[str] = None
+    error: Optional[BaseException] = None
+
+    @property
+    def ok(self) -> bool:
+        """Whether the request succeeded."""
+        return self.error is None
 
 
 class LLMClient:
 
-    def __init__(self) -> None:
+    def __init__(self, backend: Optional[LLMBackend] = None) -> None:
         self.logger = logging.getLogger(self.__class__.__name__)
-        self.aws_access_key_id = os.getenv("AWS_ACCESS_KEY_ID")
-        self.aws_secret_access_key = os.getenv("AWS_SECRET_ACCESS_KEY")
-
-        if not self.aws_access_key_id or not self.aws_secret_access_key:
-            raise EnvironmentError(
-                "AWS credentials not found. Please add AWS_ACCESS_KEY_ID and AWS_SECRET_ACCESS_KEY to your "
-                "environment variables or a .env file in the project root."
-            )
-
-        # self.model_name = "claude-3-opus"
-        self.model_name = "claude-3-5-sonnet"
-        self.max_tokens = 200000
-        self.region_name = "us-east-1"
-        self.model_id = f"anthropic.{self.model_name}-20240620-v1:0"
-        self.brt = boto3.client(
-            service_name="bedrock-runtime",
-            aws_access_key_id=self.aws_access_key_id,
-            aws_secret_access_key=self.aws_secret_access_key,
-            region_name=self.region_name,
+        settings = get_settings()
+        # The backend runs the model. It is chosen by the settings unless one is given.
+        self.backend = backend or create_backend(settings.llm_backend)
+        self.model_id = self.backend.model_id
+        # Default output token limit. The context window is budgeted separately for each prompt.
+        self.max_tokens = MAX_OUTPUT_TOKENS
+        self.max_concurrency = settings.llm_concurrency
+        self.limiter = get_rate_limiter()
+
+    def prewarm(self, connections: Optional[int] = None) -> None:
+        """
+        Opens connections to the LLM service ahead of the first requests, so they do not wait for the handshakes.
+        Args:
+            connections (Optional[int]): The number of connections to open. Defaults to the batch concurrency.
+        """
+        connections = connections or self.max_concurrency
+        started = time.monotonic()
+        self.backend.prewarm(connections)
+        self.logger.debug(f"Pre-warmed {connections} connections in {time.monotonic() - started:.2f}s")
+
+    def invoke_model(self, prompt: PromptLike, retries: int = 5, base_delay: float = 1) -> None:
+        print(self.generate(prompt, retries, base_delay))
+
+    def log_usage(self, usage: Usage, level: int = logging.INFO) -> None:
+        """
+        Logs the token usage of a response, including the input tokens read from and written to the prompt cache.
+        Args:
+            usage (Usage): The token usage.
+            level (int): The logging level.
+        """
+        self.logger.log(
+            level,
+            f"Input tokens: {usage.input_tokens}, cache read: {usage.cache_read_input_tokens}, "
+            f"cache write: {usage.cache_creation_input_tokens}, output tokens: {usage.output_tokens}",
         )
 
-    def invoke_model(self, prompt: str, retries: int = 5, base_delay: int = 1) -> None:
-        for attempt in range(retries):
-            try:
-                body: str = json.dumps(
-                    {
-                        "max_tokens": self.max_tokens,
-                        "messages": [{"role": "user", "content": prompt}],
-                        "anthropic_version": "bedrock-2023-05-31",
-                    }
-                )
-
-                response = self.brt.invoke_model(
-                    body=body, modelId=self.model_id, accept="application/json", contentType="application/json"
-                )
-                response_body: Dict[str, Any] = json.loads(response.get("body").read())
-                content = response_body.get("content")
-
-                if content and isinstance(content, list) and len(content) > 0:
-                    text = content[0].get("text")
-                    if text and isinstance(text, str):
-                        print(text)
-                    else:
-                        raise RuntimeError("Invalid response format: 'text' field is missing or not a string.")
-                else:
-                    raise RuntimeError("Invalid response format: 'content' field is missing or not a list.")
+    def start_metrics(self, kind: str) -> RequestMetrics:
+        """
+        Starts the metrics of a request to this client's model.
+        Args:
+            kind (str): ``stream`` or ``invoke``.
+        Returns:
+            RequestMetrics: The metrics, to be recorded with ``record_metrics`` when the request ends.
+        """
+        return get_metrics().start(self.backend.name, self.model_id, kind)
 
+    def record_metrics(self, metrics: RequestMetrics) -> None:
+        """
+        Records the metrics of a request that has ended.
+        Args:
+            metrics (RequestMetrics): The metrics.
+        """
+        metrics.finish()
+        get_metrics().record(metrics)
+        self.logger.debug(f"Request metrics: {metrics.to_dict()}")
+
+    def acquire(self, metrics: RequestMetrics, tokens: int) -> None:
+        """
+        Waits for the rate limiter to allow an attempt, adding the wait to the request's queued time.
+        Args:
+            metrics (RequestMetrics): The metrics of the request.
+            tokens (int): The estimated input tokens of the attempt.
+        """
+        started = time.monotonic()
+        self.limiter.acquire(tokens)
+        metrics.queued += time.monotonic() - started
+
+    def handle_error(self, error: BackendError, attempt: int, retries: int, base_delay: float) -> None:
+        """
+        Handles a failed attempt: adapts the rate limiter to throttling, and waits with full jitter before a retry.
+        Args:
+            error (BackendError): The error raised by the attempt.
+            attempt (int): The zero-based number of the failed attempt.
+            retries (int): The maximum number of attempts.
+            base_delay (float): The cap of the first retry delay in seconds, doubled after each attempt.
+        Raises:
+            RuntimeError: If this was the last attempt.
+        """
+        if is_throttling_error(error):
+            self.limiter.on_throttle()
+        self.logger.warning(f"Attempt {attempt + 1} failed with error: {error}")
+        if attempt >= retries - 1:
+            self.logger.error("Max retries reached, giving up.")
+            raise RuntimeError("Failed to invoke model after multiple retries") from error
+
+        wait_time = backoff_delay(attempt, base_delay)
+        self.logger.info(f"Waiting {wait_time:.2f} seconds before retry...")
+        time.sleep(wait_time)
+
+    def generate(
+        self, prompt: PromptLike, retries: int = 5, base_delay: float = 1, max_tokens: Optional[int] = None
+    ) -> str:
+        """
+        Invokes the model with a prompt and returns the response text, retrying on backend errors.
+        Args:
+            prompt (PromptLike): The prompt.
+            retries (int): The maximum number of attempts.
+            base_delay (float): The cap of the first retry delay in seconds, doubled after each attempt.
+            max_tokens (Optional[int]): The output token limit. Defaults to the client's limit.
+        Returns:
+            str: The response text.
+        """
+        metrics = self.start_metrics("invoke")
+        try:
+            for attempt in range(retries):
+                metrics.retries = attempt
+                self.acquire(metrics, estimate_tokens(get_prompt_text(prompt)))
+                try:
+                    response = self.backend.invoke(LLMRequest.from_prompt(prompt, max_tokens or self.max_tokens))
+                except BackendError as error:
+                    metrics.throttled += is_throttling_error(error)
+                    self.handle_error(error, attempt, retries, base_delay)
+                    continue
+
+                metrics.add_usage(response.usage)
+                self.limiter.on_success()
+                self.limiter.record(response.usage.output_tokens or 0)
+                self.log_usage(response.usage, logging.DEBUG)
+                return response.text
+
+            raise RuntimeError("Failed to invoke model: no attempts were made")
+        except Exception as error:
+            metrics.error = str(error)
+            raise
+        finally:
+            self.record_metrics(metrics)
+
+    def invoke_batch(
+        self,
+        prompts: Iterable[PromptLike],
+        max_concurrency: Optional[int] = None,
+        retries: int = 5,
+        base_delay: float = 1,
+        max_tokens: Optional[int] = None,
+    ) -> Iterator[BatchResult]:
+        """
+        Invokes the model with many prompts concurrently, yielding each result as soon as it completes.
+
+        Requests run on a bounded thread pool that shares this client and its connection pool. At most
+        ``max_concurrency`` prompts are in flight at a time, and prompts are only taken from the iterable as slots free
+        up. A failing request does not affect the others: its error is returned in its result rather than raised.
+        Args:
+            prompts (Iterable[PromptLike]): The prompts.
+            max_concurrency (Optional[int]): The maximum number of concurrent requests. Defaults to the configured
+                LLM concurrency.
+            retries (int): The maximum number of attempts per prompt.
+            base_delay (float): The cap of the first retry delay in seconds, doubled after each attempt.
+            max_tokens (Optional[int]): The output token limit of each request. Defaults to the client's limit.
+        Yields:
+            BatchResult: The result of each prompt, in completion order.
+        """
+        max_concurrency = max(1, max_concurrency or self.max_concurrency)
+        prompt_iter = enumerate(prompts)
+
+        with ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="pygen-llm") as executor:
+            pending: Dict[Future[str], BatchResult] = {}
+
+            def submit_next() -> bool:
+                item = next(prompt_iter, None)
+                if item is None:
+                    return False
+                index, prompt = item
+                future = executor.submit(self.generate, prompt, retries, base_delay, max_tokens)
+                pending[future] = BatchResult(index, prompt)
+                return True
+
+            while len(pending) < max_concurrency and submit_next():
+                pass
+
+            while pending:
+                done: Set[Future[str]]
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    result = pending.pop(future)
+                    try:
+                        result.text = future.result()
+                    except Exception as error:
+                        self.logger.warning(f"Batch request {result.index} failed: {error}")
+                        result.error = error
+                    submit_next()
+                    yield result
+
+    def cache_key(self, prompt: PromptLike, max_tokens: Optional[int] = None) -> str:
+        """
+        Returns the response cache key of a prompt for this client's model and settings.
+        Args:
+            prompt (PromptLike): The prompt, keyed by its whole text.
+            max_tokens (Optional[int]): The output token limit. Defaults to the client's limit.
+        Returns:
+            str: The cache key.
+        """
+        prompt_text = get_prompt_text(prompt)
+        return response_key(self.model_id, self.backend.api_version, max_tokens or self.max_tokens, prompt_text)
+
+    def stream_events(
+        self, prompt: PromptLike, retries: int = 5, base_delay: float = 1, max_tokens: Optional[int] = None
+    ) -> Iterator[StreamEvent]:
+        """
+        Streams the response for a prompt as typed events, retrying on backend errors.
+
+        If the stream fails after text has been received, the retry sends that text back as the start of the assistant
+        response, so the model continues where it left off and no text is repeated.
+        Args:
+            prompt (PromptLike): The prompt.
+            retries (int): The maximum number of attempts.
+            base_delay (float): The cap of the first retry delay in seconds, doubled after each attempt.
+            max_tokens (Optional[int]): The output token limit. Defaults to the client's limit.
+        Yields:
+            StreamEvent: The text deltas, token usage and stop reason of the response.
+        """
+        received: List[str] = []
+        metrics = self.start_metrics("stream")
+
+        try:
+            for attempt in range(retries):
+                # The API rejects a prefill that ends in whitespace, so it is stripped and not repeated by the
+                # continuation
+                prefill = "".join(received).rstrip()
+                metrics.retries = attempt
+
+                self.acquire(metrics, estimate_tokens(get_prompt_text(prompt)) + estimate_tokens(prefill))
+                try:
+                    request = LLMRequest.from_prompt(prompt, max_tokens or self.max_tokens, prefill)
+                    usage = yield from self.stream_attempt(request, received, metrics)
+                except BackendError as error:
+                    metrics.throttled += is_throttling_error(error)
+                    if received:
+                        self.logger.debug(f"Stream failed after {sum(len(t) for t in received)} characters, resuming")
+                    try:
+                        self.handle_error(error, attempt, retries, base_delay)
+                    except RuntimeError:
+                        raise RuntimeError("Failed to stream prompt") from error
+                    continue
+
+                self.limiter.on_success()
+                self.limiter.record(usage.output_tokens or 0)
                 return
 
-            except (BotoCoreError, ClientError) as error:
-                self.logger.warning(f"Attempt {attempt + 1} failed with error: {error}")
-                if attempt < retries - 1:  # i.e., not last attempt
-                    wait_time = base_delay * (2**attempt)
-                    self.logger.info(f"Waiting {wait_time} seconds before retry...")
-                    time.sleep(wait_time)
-                else:
-                    self.logger.error("Max retries reached, giving up.")
-                    raise RuntimeError("Failed to invoke model after multiple retries")
+            raise RuntimeError("Failed to stream prompt: no attempts were made")
+        except Exception as error:
+            metrics.error = str(error)
+            raise
+        finally:
+            self.record_metrics(metrics)
 
-    def invoke_model_with_response_stream(self, prompt: str) -> None:
+    def stream_attempt(
+        self, request: LLMRequest, received: List[str], metrics: RequestMetrics
+    ) -> Generator[StreamEvent, None, Usage]:
         """
-        Streams the response for a text prompt.
+        Streams one attempt at a request, adding the text it receives to the text received by earlier attempts.
         Args:
-            prompt (str): The prompt text.
+            request (LLMRequest): The request, prefilled with the text received so far, stripped of trailing whitespace.
+            received (List[str]): The text received so far, extended with the text of this attempt.
+            metrics (RequestMetrics): The metrics of the request, to which the attempt's token usage is added.
+        Yields:
+            StreamEvent: The text deltas, token usage and stop reason of the attempt.
+        Returns:
+            Usage: The token usage of the attempt.
+        Raises:
+            BackendError: If the attempt failed and may be retried.
         """
+        skip_whitespace = len(request.prefill) < sum(len(text) for text in received)
+        usage = Usage()
         try:
-            body = json.dumps(
-                {
-                    "anthropic_version": "bedrock-2023-05-31",
-                    "max_tokens": self.max_tokens,
-                    "messages": [{"role": "user", "content": prompt}],
-                }
-            )
-
-            response = self.brt.invoke_model_with_response_stream(body=body, modelId=self.model_id)
-
-            for event in response.get("body"):
-                chunk = json.loads(event["chunk"]["bytes"])
-
-                if chunk["type"] == "content_block_delta" and chunk["delta"]["type"] == "text_delta":
-                    print(chunk["delta"]["text"], end="")
-
-                elif chunk["type"] == "message_delta":
-                    self.logger.info(f"\nStop reason: {chunk['delta']['stop_reason']}")
-                    self.logger.info(f"Stop sequence: {chunk['delta']['stop_sequence']}")
-                    self.logger.info(f"Output tokens: {chunk['usage']['output_tokens']}")
-
-        except (BotoCoreError, ClientError) as error:
-            self.logger.error(f"Error occurred: {error}")
-            raise RuntimeError("Failed to stream prompt")
+            for event in self.backend.stream(request):
+                if isinstance(event, TextDelta):
+                    text = event.text
+                    if skip_whitespace:
+                        text = text.lstrip()
+                        skip_whitespace = not text
+                    if text:
+                        metrics.on_first_token()
+                        received.append(text)
+                        yield TextDelta(text)
+                    continue
+
+                if isinstance(event, Usage):
+                    usage = usage.merge(event)
+                yield event
+        except BackendError:
+            metrics.add_usage(usage)
+            raise
+
+        metrics.add_usage(usage)
+        return usage
+
+    def invoke_model_with_response_stream(
+        self, prompt: PromptLike, sinks: Optional[Sequence[Sink]] = None, max_tokens: Optional[int] = None
+    ) -> str:
+        """
+        Streams the response for a prompt to sinks.
+        Args:
+            prompt (PromptLike): The prompt.
+            sinks (Optional[Sequence[Sink]]): The sinks to write the response to. Defaults to the terminal.
+            max_tokens (Optional[int]): The output token limit. Defaults to the client's limit.
+        Returns:
+            str: The full response text.
+        """
+        collector = TextSink()
+        pipe(
+            self.stream_events(prompt, max_tokens=max_tokens),
+            [*(sinks if sinks is not None else [TerminalSink()]), collector],
+        )
+
+        if collector.stop is not None:
+            self.logger.info(f"\nStop reason: {collector.stop.reason}")
+            self.logger.info(f"Stop sequence: {collector.stop.stop_sequence}")
+        self.log_usage(collector.usage)
+        return collector.text
@@ -0,0 +1,168 @@
+"""
+Client-side rate limiting and retry backoff for LLM requests.
+
+All requests in a process share one adaptive rate limiter with a token bucket for requests per minute and another for
+tokens per minute. When the service throttles a request the limiter halves its rates, and it then recovers them
+gradually as requests succeed. Retries wait for a random delay up to an exponentially growing cap ("full jitter"), so
+concurrent requests that fail together do not retry together.
+"""
+
+import random
+import threading
+import time
+from typing import Optional
+
+from pygen.llm.backends.base import BackendError
+from pygen.utils.config import get_settings
+from pygen.utils.log import get_logger
+
+logger = get_logger(__name__)
+
+# Maximum delay before a retry, in seconds
+MAX_RETRY_DELAY = 60.0
+
+# Fraction of the configured rates below which throttling does not reduce the limiter further
+MIN_RATE_SCALE = 0.1
+
+# Fraction of the configured rates restored by each successful request after throttling
+RATE_RECOVERY_STEP = 0.05
+
+
+def backoff_delay(attempt: int, base_delay: float, max_delay: float = MAX_RETRY_DELAY) -> float:
+    """Return a full-jitter backoff delay in seconds: uniform between zero and ``base_delay * 2**attempt``, capped."""
+    return random.uniform(0, min(max_delay, base_delay * 2**attempt))  # nosec B311
+
+
+def is_throttling_error(error: BaseException) -> bool:
+    """Whether an error is the service throttling requests, including throttling reported mid-stream."""
+    return isinstance(error, BackendError) and error.throttled
+
+
+class TokenBucket:
+    """
+    A token bucket refilled at a steady rate up to a burst capacity.
+
+    Reservations are taken immediately and may overdraw the bucket, in which case the caller waits for the deficit to
+    refill. This keeps waiting callers in the order they arrived. The bucket is not thread-safe on its own.
+    """
+
+    def __init__(self, rate_per_minute: float, burst_seconds: float = 10.0) -> None:
+        self.max_rate = rate_per_minute / 60
+        self.rate = self.max_rate
+        self.capacity = max(1.0, self.max_rate * burst_seconds)
+        self.level = self.capacity
+        self.updated = time.monotonic()
+
+    def refill(self) -> None:
+        """Add the tokens accrued since the last update."""
+        now = time.monotonic()
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def reserve(self, amount: float) -> float:
+        """
+        Take tokens from the bucket.
+
+        Args:
+            amount: The number of tokens to take.
+
+        Returns:
+            The number of seconds to wait until the reservation is covered.
+        """
+        self.refill()
+        self.level -= amount
+        return max(0.0, -self.level / self.rate)
+
+    def debit(self, amount: float) -> None:
+        """Take tokens without waiting, for usage that is only known after the fact."""
+        self.refill()
+        self.level -= amount
+
+    def scale(self, factor: float) -> None:
+        """Set the refill rate to a fraction of the maximum rate."""
+        self.refill()
+        self.rate = self.max_rate * factor
+
+
+class AdaptiveRateLimiter:
+    """
+    A thread-safe limiter of requests per minute and tokens per minute that adapts to throttling.
+
+    Throttling halves the rates, down to a tenth of the configured rates. Each successful request then restores a
+    twentieth of the configured rates until they are fully restored. A rate of zero disables that limit.
+    """
+
+    def __init__(self, requests_per_minute: float, tokens_per_minute: float) -> None:
+        self.requests = TokenBucket(requests_per_minute) if requests_per_minute > 0 else None
+        self.tokens = TokenBucket(tokens_per_minute) if tokens_per_minute > 0 else None
+        self.scale = 1.0
+        self._lock = threading.Lock()
+
+    def describe(self) -> str:
+        """Describe the current state of the limiter for logging."""
+        parts = [f"scale {self.scale:.2f}"]
+        for name, bucket in (("requests", self.requests), ("tokens", self.tokens)):
+            if bucket is not None:
+                parts.append(f"{name} {bucket.level:.0f}/{bucket.capacity:.0f} at {bucket.rate * 60:.0f}/min")
+        return ", ".join(parts)
+
+    def acquire(self, tokens: int) -> None:
+        """
+        Wait until a request with the given number of input tokens may be sent.
+
+        Args:
+            tokens: The estimated number of input tokens of the request.
+        """
+        with self._lock:
+            wait = 0.0
+            if self.requests is not None:
+                wait = max(wait, self.requests.reserve(1))
+            if self.tokens is not None:
+                wait = max(wait, self.tokens.reserve(tokens))
+            state = self.describe()
+
+        if wait > 0:
+            logger.debug(f"Rate limiter waiting {wait:.2f}s: {state}")
+            time.sleep(wait)
+
+    def record(self, tokens: int) -> None:
+        """Charge tokens that were only known once the response arrived, such as output tokens."""
+        if self.tokens is None or tokens <= 0:
+            return
+        with self._lock:
+            self.tokens.debit(tokens)
+
+    def on_throttle(self) -> None:
+        """Halve the rates after the service throttled a request."""
+        with self._lock:
+            self.scale = max(MIN_RATE_SCALE, self.scale / 2)
+            self._apply_scale()
+            logger.debug(f"Rate limiter throttled: {self.describe()}")
+
+    def on_success(self) -> None:
+        """Gradually restore the rates after a request succeeded."""
+        with self._lock:
+            if self.scale >= 1.0:
+                return
+            self.scale = min(1.0, self.scale + RATE_RECOVERY_STEP)
+            self._apply_scale()
+            logger.debug(f"Rate limiter recovering: {self.describe()}")
+
+    def _apply_scale(self) -> None:
+        for bucket in (self.requests, self.tokens):
+            if bucket is not None:
+                bucket.scale(self.scale)
+
+
+_RATE_LIMITER: Optional[AdaptiveRateLimiter] = None
+_RATE_LIMITER_LOCK = threading.Lock()
+
+
+def get_rate_limiter() -> AdaptiveRateLimiter:
+    """Get the process-wide rate limiter shared by all LLM requests, created from the settings on first use."""
+    global _RATE_LIMITER
+    with _RATE_LIMITER_LOCK:
+        if _RATE_LIMITER is None:
+            settings = get_settings()
+            _RATE_LIMITER = AdaptiveRateLimiter(settings.llm_requests_per_minute, settings.llm_tokens_per_minute)
+        return _RATE_LIMITER
@@ -0,0 +1,161 @@
+"""
+Map-reduce over prompts too large for the model's context window.
+
+The input is split into chunks sized from the token budget, and each chunk is summarised or reviewed concurrently (the
+map step). The partial results are then merged into one response by a final request (the reduce step), which is
+streamed like any other response. If the partial results are themselves too large for one request, they are merged in
+groups first, as many times as needed.
+"""
+
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Callable, List, Optional, Sequence
+
+from pygen.llm.budget import CONTEXT_WINDOW
+from pygen.prompts.chunks import get_part_content, get_partial_results_content
+from pygen.prompts.prompt import PromptLike, get_prompt_text
+from pygen.utils.chunking import Chunk, make_chunk, pack_chunks
+from pygen.utils.config import get_settings
+from pygen.utils.log import get_logger
+from pygen.utils.tokens import estimate_tokens
+
+if TYPE_CHECKING:
+    from pygen.llm.client import LLMClient
+    from pygen.llm.stream import Sink
+
+logger = get_logger(__name__)
+
+# Output token limit of each map request
+MAP_OUTPUT_TOKENS = 1024
+
+
+@dataclass(frozen=True)
+class MapReduceJob:
+    """
+    A prompt that can be answered by map-reduce when it is too large to send whole.
+
+    Attributes:
+        subject: What the input is, e.g. ``Git diff``, used to describe the partial results to the model.
+        split: Splits the input into chunks of at most the given number of tokens.
+        map_prompt: Builds the prompt for one chunk from its text.
+        reduce_prompt: Builds the final prompt from the combined partial results.
+    """
+
+    subject: str
+    split: Callable[[int], List[Chunk]]
+    map_prompt: Callable[[str], PromptLike]
+    reduce_prompt: Callable[[str], PromptLike]
+
+
+def get_chunk_tokens(job: MapReduceJob, context_window: int = CONTEXT_WINDOW) -> int:
+    """
+    Return the token budget of a chunk: what the map prompt leaves of the context window, capped by the settings.
+
+    Smaller chunks than the context window allows are used by default, as more of them are processed concurrently and
+    each is covered in more detail.
+    """
+    overhead = estimate_tokens(get_prompt_text(job.map_prompt("")))
+    return max(1, min(get_settings().chunk_tokens, context_window - overhead - MAP_OUTPUT_TOKENS))
+
+
+def fits(prompt: PromptLike, max_tokens: int, context_window: int = CONTEXT_WINDOW) -> bool:
+    """Whether a prompt fits the context window together with the given output token limit."""
+    return estimate_tokens(get_prompt_text(prompt)) + max_tokens <= context_window
+
+
+def map_chunks(
+    llm_client: "LLMClient",
+    prompt: Callable[[str], PromptLike],
+    chunks: Sequence[Chunk],
+    max_tokens: int,
+    on_result: Optional[Callable[[int, int], None]] = None,
+) -> List[Chunk]:
+    """
+    Send a prompt for every chunk concurrently and return the responses, in the order of the chunks.
+
+    Args:
+        llm_client: The LLM client.
+        prompt: Builds the prompt for a chunk from its text.
+        chunks: The chunks.
+        max_tokens: The output token limit of each request.
+        on_result: Called with the number of completed requests and the total after each request completes.
+
+    Returns:
+        The responses, labelled with the labels of their chunks. A failed request is reported in its response.
+
+    Raises:
+        RuntimeError: If every request failed.
+    """
+    results: List[Optional[Chunk]] = [None] * len(chunks)
+    failures = 0
+    batch = llm_client.invoke_batch((prompt(chunk.text) for chunk in chunks), max_tokens=max_tokens)
+    for completed, result in enumerate(batch, start=1):
+        label = chunks[result.index].label
+        if result.ok and result.text is not None:
+            results[result.index] = make_chunk(label, result.text)
+        else:
+            failures += 1
+            logger.warning(f"Could not process part {result.index + 1} ({label}): {result.error}")
+            results[result.index] = make_chunk(label, f"This part could not be processed: {result.error}")
+        if on_result is not None:
+            on_result(completed, len(chunks))
+
+    if chunks and failures == len(chunks):
+        raise RuntimeError(f"All {len(chunks)} parts failed to process")
+    return [result for result in results if result is not None]
+
+
+def number_parts(results: Sequence[Chunk]) -> List[Chunk]:
+    """Head each partial result with its part number and label, for the reduce prompt."""
+    return [
+        make_chunk(result.label, get_part_content(number, len(results), result.label, result.text))
+        for number, result in enumerate(results, start=1)
+    ]
+
+
+def map_reduce(
+    llm_client: "LLMClient",
+    job: MapReduceJob,
+    sinks: Optional[Sequence["Sink"]] = None,
+    max_tokens: Optional[int] = None,
+    context_window: int = CONTEXT_WINDOW,
+    on_result: Optional[Callable[[int, int], None]] = None,
+) -> str:
+    """
+    Answer a map-reduce job, streaming the final response to sinks.
+
+    Args:
+        llm_client: The LLM client.
+        job: The job.
+        sinks: The sinks to write the final response to. Defaults to the terminal.
+        max_tokens: The output token limit of the final response. Defaults to the client's limit.
+        context_window: The context window of the model.
+        on_result: Called with the number of completed map requests and the total after each one completes.
+
+    Returns:
+        The final response text.
+    """
+    max_tokens = max_tokens or llm_client.max_tokens
+    chunk_tokens = get_chunk_tokens(job, context_window)
+    chunks = job.split(chunk_tokens)
+    logger.info(f"Split the {job.subject} into {len(chunks)} parts of at most ~{chunk_tokens} tokens")
+    parts = number_parts(map_chunks(llm_client, job.map_prompt, chunks, MAP_OUTPUT_TOKENS, on_result))
+
+    # Merge the partial results in groups until they fit in a single request
+    prompt = job.reduce_prompt(get_partial_results_content(job.subject, [part.text for part in parts]))
+    while not fits(prompt, max_tokens, context_window):
+        overhead = estimate_tokens(get_prompt_text(job.reduce_prompt(get_partial_results_content(job.subject, []))))
+        groups = pack_chunks(parts, max(1, context_window - overhead - max_tokens))
+        if len(groups) == len(parts):
+            break
+        logger.info(f"Merging {len(parts)} partial results in {len(groups)} groups")
+        prompts = [get_partial_results_content(job.subject, [group.text]) for group in groups]
+        merged = map_chunks(
+            llm_client,
+            job.reduce_prompt,
+            [Chunk(group.label, text, group.tokens) for group, text in zip(groups, prompts)],
+            max_tokens,
+        )
+        parts = number_parts(merged)
+        prompt = job.reduce_prompt(get_partial_results_content(job.subject, [part.text for part in parts]))
+
+    return llm_client.invoke_model_with_response_stream(prompt, sinks, max_tokens)
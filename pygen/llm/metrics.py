@@ -0,0 +1,380 @@
+"""
+Latency and throughput metrics of LLM requests.
+
+The LLM client records the time to first token, latency, time queued by the rate limiter, token usage and retries of
+every request, and commands record the requests answered from the response cache. At the end of a command the requests
+are summarised, and can be exported as JSON lines (one line per request and a summary line for the command) and as a
+Prometheus textfile for the node exporter's textfile collector, so regressions and capacity can be tracked across runs.
+"""
+
+import json
+import math
+import os
+import re
+import tempfile
+import threading
+import time
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from pygen.llm.stream import Usage
+from pygen.utils.config import get_settings
+from pygen.utils.log import get_logger
+
+logger = get_logger(__name__)
+
+# Prometheus metrics written for each command: name, type, help text and the attribute of the command summary
+PROMETHEUS_METRICS: Tuple[Tuple[str, str, str, str], ...] = (
+    ("pygen_llm_requests", "gauge", "LLM requests made by the last run of the command.", "requests"),
+    ("pygen_llm_request_failures", "gauge", "LLM requests that failed after all retries.", "failures"),
+    ("pygen_llm_retries", "gauge", "Retried attempts of LLM requests.", "retries"),
+    ("pygen_llm_throttled", "gauge", "Attempts of LLM requests throttled by the service.", "throttled"),
+    ("pygen_llm_response_cache_hits", "gauge", "Requests answered from the response cache.", "cache_hits"),
+    ("pygen_llm_input_tokens", "gauge", "Input tokens not read from or written to the prompt cache.", "input_tokens"),
+    ("pygen_llm_output_tokens", "gauge", "Output tokens.", "output_tokens"),
+    (
+        "pygen_llm_cache_read_input_tokens",
+        "gauge",
+        "Input tokens read from the prompt cache.",
+        "cache_read_input_tokens",
+    ),
+    (
+        "pygen_llm_cache_creation_input_tokens",
+        "gauge",
+        "Input tokens written to the prompt cache.",
+        "cache_creation_input_tokens",
+    ),
+    ("pygen_llm_latency_p50_seconds", "gauge", "Median latency of LLM requests.", "latency_p50"),
+    ("pygen_llm_latency_p95_seconds", "gauge", "95th percentile latency of LLM requests.", "latency_p95"),
+    ("pygen_llm_latency_max_seconds", "gauge", "Maximum latency of LLM requests.", "latency_max"),
+    (
+        "pygen_llm_time_to_first_token_p50_seconds",
+        "gauge",
+        "Median time to the first token of streamed responses.",
+        "time_to_first_token_p50",
+    ),
+    (
+        "pygen_llm_time_to_first_token_p95_seconds",
+        "gauge",
+        "95th percentile time to the first token of streamed responses.",
+        "time_to_first_token_p95",
+    ),
+    ("pygen_llm_queued_seconds", "gauge", "Total time requests waited for the rate limiter.", "queued"),
+    ("pygen_llm_output_tokens_per_second", "gauge", "Output tokens per second while generating.", "tokens_per_second"),
+    ("pygen_command_duration_seconds", "gauge", "Duration of the last run of the command.", "duration"),
+    ("pygen_command_last_run_timestamp_seconds", "gauge", "Unix time the last run of the command started.", "started"),
+)
+
+# The command label of a Prometheus sample
+COMMAND_LABEL_PATTERN = re.compile(r'\{command="((?:[^"\\]|\\.)*)"\}')
+
+
+@dataclass
+class RequestMetrics:
+    """
+    Metrics of one LLM request, including all of its retries.
+
+    Attributes:
+        command: The command that made the request.
+        backend: The name of the backend.
+        model: The identifier of the model.
+        kind: ``stream`` or ``invoke`` for requests sent to the model, or ``cache`` for a response cache hit.
+        started: Unix time the request started.
+        latency: Seconds from the start of the request until the response was complete or the request failed.
+        time_to_first_token: Seconds from the start of a streamed request until the first text arrived.
+        queued: Seconds the request waited for the rate limiter.
+        input_tokens: Input tokens not read from or written to the prompt cache, over all attempts.
+        output_tokens: Output tokens, over all attempts.
+        cache_read_input_tokens: Input tokens read from the prompt cache, over all attempts.
+        cache_creation_input_tokens: Input tokens written to the prompt cache, over all attempts.
+        retries: The number of attempts after the first.
+        throttled: The number of attempts throttled by the service.
+        error: Why the request failed, if it did.
+    """
+
+    command: str
+    backend: str
+    model: str
+    kind: str
+    started: float = field(default_factory=time.time)
+    latency: float = 0.0
+    time_to_first_token: Optional[float] = None
+    queued: float = 0.0
+    input_tokens: int = 0
+    output_tokens: int = 0
+    cache_read_input_tokens: int = 0
+    cache_creation_input_tokens: int = 0
+    retries: int = 0
+    throttled: int = 0
+    error: Optional[str] = None
+    clock: float = field(default_factory=time.monotonic, repr=False)
+
+    def elapsed(self) -> float:
+        """Return the seconds since the request started."""
+        return time.monotonic() - self.clock
+
+    def on_first_token(self) -> None:
+        """Record the arrival of the first text of a streamed response."""
+        if self.time_to_first_token is None:
+            self.time_to_first_token = self.elapsed()
+
+    def add_usage(self, usage: Usage) -> None:
+        """Add the token usage of an attempt."""
+        self.input_tokens += usage.input_tokens or 0
+        self.output_tokens += usage.output_tokens or 0
+        self.cache_read_input_tokens += usage.cache_read_input_tokens or 0
+        self.cache_creation_input_tokens += usage.cache_creation_input_tokens or 0
+
+    def finish(self) -> None:
+        """Record the end of the request."""
+        self.latency = self.elapsed()
+
+    @property
+    def generation_time(self) -> float:
+        """Seconds spent generating the response: after the first token if it was streamed."""
+        return self.latency - (self.time_to_first_token or 0.0)
+
+    @property
+    def tokens_per_second(self) -> Optional[float]:
+        """The output token rate while generating, if any tokens were generated."""
+        if not self.output_tokens or self.generation_time <= 0:
+            return None
+        return self.output_tokens / self.generation_time
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Return the metrics as a JSON-serialisable dictionary."""
+        data = asdict(self)
+        del data["clock"]
+        data["tokens_per_second"] = self.tokens_per_second
+        return data
+
+
+def percentile(values: Sequence[float], fraction: float) -> Optional[float]:
+    """Return the nearest-rank percentile of values, or None if there are none."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(fraction * len(ordered)) - 1)]
+
+
+@dataclass(frozen=True)
+class CommandMetrics:
+    """
+    Metrics of the LLM requests of one command.
+
+    Attributes:
+        command: The command.
+        started: Unix time the command started.
+        duration: Seconds from the start of the command until the metrics were summarised.
+        requests: The number of requests, including response cache hits.
+        failures: The number of requests that failed after all retries.
+        retries: The number of retried attempts.
+        throttled: The number of attempts throttled by the service.
+        cache_hits: The number of requests answered from the response cache.
+        input_tokens: Input tokens not read from or written to the prompt cache.
+        output_tokens: Output tokens.
+        cache_read_input_tokens: Input tokens read from the prompt cache.
+        cache_creation_input_tokens: Input tokens written to the prompt cache.
+        queued: Total seconds requests waited for the rate limiter.
+        latency_p50: Median latency of the requests sent to the model.
+        latency_p95: 95th percentile latency of the requests sent to the model.
+        latency_max: Maximum latency of the requests sent to the model.
+        time_to_first_token_p50: Median time to the first token of streamed responses.
+        time_to_first_token_p95: 95th percentile time to the first token of streamed responses.
+        tokens_per_second: Output tokens per second of generation, over all requests.
+    """
+
+    command: str
+    started: float
+    duration: float
+    requests: int = 0
+    failures: int = 0
+    retries: int = 0
+    throttled: int = 0
+    cache_hits: int = 0
+    input_tokens: int = 0
+    output_tokens: int = 0
+    cache_read_input_tokens: int = 0
+    cache_creation_input_tokens: int = 0
+    queued: float = 0.0
+    latency_p50: Optional[float] = None
+    latency_p95: Optional[float] = None
+    latency_max: Optional[float] = None
+    time_to_first_token_p50: Optional[float] = None
+    time_to_first_token_p95: Optional[float] = None
+    tokens_per_second: Optional[float] = None
+
+    @classmethod
+    def from_requests(
+        cls, command: str, started: float, duration: float, requests: Sequence[RequestMetrics]
+    ) -> "CommandMetrics":
+        """Summarise the metrics of a command's requests."""
+        sent = [request for request in requests if request.kind != "cache"]
+        latencies = [request.latency for request in sent]
+        first_tokens = [request.time_to_first_token for request in sent if request.time_to_first_token is not None]
+        generation_time = sum(request.generation_time for request in sent if request.output_tokens)
+        output_tokens = sum(request.output_tokens for request in sent)
+        return cls(
+            command=command,
+            started=started,
+            duration=duration,
+            requests=len(requests),
+            failures=sum(1 for request in requests if request.error is not None),
+            retries=sum(request.retries for request in sent),
+            throttled=sum(request.throttled for request in sent),
+            cache_hits=len(requests) - len(sent),
+            input_tokens=sum(request.input_tokens for request in sent),
+            output_tokens=output_tokens,
+            cache_read_input_tokens=sum(request.cache_read_input_tokens for request in sent),
+            cache_creation_input_tokens=sum(request.cache_creation_input_tokens for request in sent),
+            queued=sum(request.queued for request in sent),
+            latency_p50=percentile(latencies, 0.5),
+            latency_p95=percentile(latencies, 0.95),
+            latency_max=max(latencies, default=None),
+            time_to_first_token_p50=percentile(first_tokens, 0.5),
+            time_to_first_token_p95=percentile(first_tokens, 0.95),
+            tokens_per_second=output_tokens / generation_time if generation_time > 0 else None,
+        )
+
+    def describe(self) -> str:
+        """Return a one-line description for the log."""
+        parts = [f"{self.requests} LLM requests", f"{self.cache_hits} cached", f"{self.retries} retries"]
+        if self.latency_p50 is not None:
+            parts.append(f"latency p50 {self.latency_p50:.2f}s p95 {self.latency_p95:.2f}s")
+        if self.time_to_first_token_p50 is not None:
+            parts.append(f"first token p50 {self.time_to_first_token_p50:.2f}s")
+        if self.tokens_per_second is not None:
+            parts.append(f"{self.tokens_per_second:.1f} tokens/s")
+        parts.append(f"{self.input_tokens} input and {self.output_tokens} output tokens")
+        return ", ".join(parts)
+
+
+class MetricsRecorder:
+    """
+    Collects the metrics of the LLM requests made by a command. Requests may be recorded from any thread.
+
+    Attributes:
+        command: The command the requests are recorded for.
+        started: Unix time the command started.
+    """
+
+    def __init__(self, command: str = "") -> None:
+        self.command = command
+        self.started = time.time()
+        self._clock = time.monotonic()
+        self._requests: List[RequestMetrics] = []
+        self._lock = threading.Lock()
+
+    def start(self, backend: str, model: str, kind: str) -> RequestMetrics:
+        """Start the metrics of a request of the current command. They are recorded once ``record`` is called."""
+        return RequestMetrics(self.command, backend, model, kind)
+
+    def record(self, request: RequestMetrics) -> None:
+        """Record the metrics of a finished request."""
+        with self._lock:
+            self._requests.append(request)
+
+    def record_cache_hit(self, backend: str, model: str) -> None:
+        """Record a request answered from the response cache."""
+        request = self.start(backend, model, "cache")
+        request.finish()
+        self.record(request)
+
+    @property
+    def requests(self) -> List[RequestMetrics]:
+        """The metrics of the recorded requests."""
+        with self._lock:
+            return list(self._requests)
+
+    def summarise(self) -> CommandMetrics:
+        """Summarise the recorded requests."""
+        return CommandMetrics.from_requests(self.command, self.started, time.monotonic() - self._clock, self.requests)
+
+    def export_jsonl(self, path: Path) -> None:
+        """
+        Append the metrics of every request, and the summary of the command, to a JSON lines file.
+
+        Args:
+            path: The file, which is created with its directory if it does not exist.
+        """
+        summary = self.summarise()
+        lines = [json.dumps({"type": "request", **request.to_dict()}) for request in self.requests]
+        lines.append(json.dumps({"type": "command", **asdict(summary)}))
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with path.open("a", encoding="utf-8") as file:
+            file.write("\n".join(lines) + "\n")
+
+    def export_prometheus(self, path: Path) -> None:
+        """
+        Write the summary of the command to a Prometheus textfile, keeping the samples of other commands in it.
+
+        The file is replaced atomically, so the textfile collector never reads it half written.
+
+        Args:
+            path: The file, which is created with its directory if it does not exist.
+        """
+        summary = self.summarise()
+        command = summary.command.replace("\\", "\\\\").replace('"', '\\"')
+        samples: Dict[str, List[str]] = {name: [] for name, _, _, _ in PROMETHEUS_METRICS}
+        if path.exists():
+            for line in path.read_text(encoding="utf-8").splitlines():
+                match = COMMAND_LABEL_PATTERN.search(line)
+                name = line.split("{", 1)[0]
+                if not line.startswith("#") and match and match.group(1) != command and name in samples:
+                    samples[name].append(line)
+
+        for name, _, _, attribute in PROMETHEUS_METRICS:
+            value = getattr(summary, attribute)
+            if value is not None:
+                samples[name].append(f'{name}{{command="{command}"}} {value}')
+
+        lines: List[str] = []
+        for name, metric_type, description, _ in PROMETHEUS_METRICS:
+            if samples[name]:
+                lines += [f"# HELP {name} {description}", f"# TYPE {name} {metric_type}", *sorted(samples[name])]
+
+        path.parent.mkdir(parents=True, exist_ok=True)
+        descriptor, temporary = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+        try:
+            with os.fdopen(descriptor, "w", encoding="utf-8") as file:
+                file.write("\n".join(lines) + "\n")
+            os.replace(temporary, path)
+        except BaseException:
+            Path(temporary).unlink(missing_ok=True)
+            raise
+
+
+_METRICS: Optional[MetricsRecorder] = None
+_METRICS_LOCK = threading.Lock()
+
+
+def get_metrics() -> MetricsRecorder:
+    """Get the process-wide metrics recorder."""
+    global _METRICS
+    with _METRICS_LOCK:
+        if _METRICS is None:
+            _METRICS = MetricsRecorder()
+        return _METRICS
+
+
+def export_metrics() -> None:
+    """
+    Log the summary of the requests made by the command, and export their metrics to the files in the settings.
+
+    Nothing is logged or written if the command made no LLM requests. Errors writing the files are logged, so they
+    never fail the command.
+    """
+    metrics = get_metrics()
+    if not metrics.requests:
+        return
+
+    logger.info(metrics.summarise().describe())
+    settings = get_settings()
+    try:
+        if settings.metrics_file is not None:
+            metrics.export_jsonl(settings.metrics_file)
+        if settings.metrics_prometheus_file is not None:
+            metrics.export_prometheus(settings.metrics_prometheus_file)
+    except OSError as error:
+        logger.warning(f"Could not export the LLM request metrics: {error}")
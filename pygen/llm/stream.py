@@ -0,0 +1,266 @@
+"""
+Streaming pipeline for LLM responses.
+
+A response is a stream of typed events: text deltas, token usage and the stop reason. Events are dispatched to sinks,
+which write the text to the terminal or a file, store the response in the cache or extract code from it. Terminal and
+file output is buffered and flushed when the buffer reaches a size limit or a time interval has passed.
+"""
+
+import re
+import sys
+import time
+from dataclasses import dataclass, fields, replace
+from pathlib import Path
+from typing import IO, TYPE_CHECKING, Any, Dict, Iterable, Iterator, List, Optional, Sequence, Union
+
+from pygen.utils.config import get_settings
+
+if TYPE_CHECKING:
+    from pygen.llm.cache import ResponseCache
+
+# Size of the chunks a cached response is replayed in
+REPLAY_CHUNK_SIZE = 256
+
+# Stop reasons of a response the model finished by itself, from the Anthropic and OpenAI-compatible APIs, as opposed to
+# one cut off by the token limit
+FINISHED_STOP_REASONS = frozenset({"end_turn", "stop_sequence", "stop"})
+
+CODE_BLOCK_PATTERN = re.compile(r"```([\w+-]*)[^\n]*\n(.*?)(?:```|\Z)", re.DOTALL)
+
+
+@dataclass(frozen=True)
+class TextDelta:
+    """A piece of response text."""
+
+    text: str
+
+
+@dataclass(frozen=True)
+class Usage:
+    """
+    Token usage reported by the model. Counts that were not reported are None.
+
+    Attributes:
+        input_tokens: The number of input tokens that were not read from or written to the prompt cache.
+        output_tokens: The number of output tokens.
+        cache_read_input_tokens: The number of input tokens read from the prompt cache.
+        cache_creation_input_tokens: The number of input tokens written to the prompt cache.
+    """
+
+    input_tokens: Optional[int] = None
+    output_tokens: Optional[int] = None
+    cache_read_input_tokens: Optional[int] = None
+    cache_creation_input_tokens: Optional[int] = None
+
+    @classmethod
+    def from_response(cls, usage: Dict[str, Any]) -> "Usage":
+        """Create the usage from the ``usage`` object of a response or stream event."""
+        return cls(**{field.name: usage.get(field.name) for field in fields(cls)})
+
+    def merge(self, usage: "Usage") -> "Usage":
+        """Return this usage updated with the counts reported in another."""
+        reported = {field.name: getattr(usage, field.name) for field in fields(usage)}
+        return replace(self, **{name: count for name, count in reported.items() if count is not None})
+
+
+@dataclass(frozen=True)
+class StopReason:
+    """The reason the model stopped generating, which ends a complete response."""
+
+    reason: Optional[str]
+    stop_sequence: Optional[str] = None
+
+    @property
+    def finished(self) -> bool:
+        """Whether the model finished the response by itself, rather than being cut off."""
+        return self.reason in FINISHED_STOP_REASONS
+
+
+StreamEvent = Union[TextDelta, Usage, StopReason]
+
+
+class Sink:
+    """A consumer of stream events. Subclasses override the handlers of the events they are interested in."""
+
+    def write(self, event: StreamEvent) -> None:
+        """Dispatch an event to its handler."""
+        if isinstance(event, TextDelta):
+            self.on_text(event.text)
+        elif isinstance(event, Usage):
+            self.on_usage(event)
+        elif isinstance(event, StopReason):
+            self.on_stop(event)
+
+    def on_text(self, text: str) -> None:
+        """Handle a piece of response text."""
+
+    def on_usage(self, usage: Usage) -> None:
+        """Handle token usage."""
+
+    def on_stop(self, stop: StopReason) -> None:
+        """Handle the end of a complete response."""
+
+    def close(self) -> None:
+        """Release the sink's resources once the stream has ended, whether or not it completed."""
+
+
+class BufferedTextSink(Sink):
+    """
+    A sink that writes response text to a text stream through a buffer.
+
+    The buffer is flushed when it reaches ``flush_bytes`` characters, when ``flush_interval`` seconds have passed since
+    the last flush, at the end of the response and when the sink is closed.
+    """
+
+    def __init__(
+        self, stream: IO[str], flush_bytes: Optional[int] = None, flush_interval: Optional[float] = None
+    ) -> None:
+        settings = get_settings()
+        self.stream = stream
+        self.flush_bytes = flush_bytes or settings.stream_flush_bytes
+        self.flush_interval = flush_interval if flush_interval is not None else settings.stream_flush_ms / 1000
+        self._buffer: List[str] = []
+        self._buffered = 0
+        self._last_flush = time.monotonic()
+
+    def on_text(self, text: str) -> None:
+        self._buffer.append(text)
+        self._buffered += len(text)
+        if self._buffered >= self.flush_bytes or time.monotonic() - self._last_flush >= self.flush_interval:
+            self.flush()
+
+    def on_stop(self, stop: StopReason) -> None:
+        self.flush()
+
+    def get_stream(self) -> IO[str]:
+        """Return the stream to write to."""
+        return self.stream
+
+    def flush(self) -> None:
+        """Write the buffered text to the stream."""
+        stream = self.get_stream()
+        if self._buffer:
+            stream.write("".join(self._buffer))
+            self._buffer.clear()
+            self._buffered = 0
+        stream.flush()
+        self._last_flush = time.monotonic()
+
+    def close(self) -> None:
+        self.flush()
+
+
+class TerminalSink(BufferedTextSink):
+    """
+    A sink that writes response text to standard output.
+
+    Standard output is looked up on every flush, so that output redirected by a progress display is honoured.
+    """
+
+    def __init__(self, flush_bytes: Optional[int] = None, flush_interval: Optional[float] = None) -> None:
+        super().__init__(sys.stdout, flush_bytes, flush_interval)
+
+    def get_stream(self) -> IO[str]:
+        return sys.stdout
+
+
+class FileSink(BufferedTextSink):
+    """A sink that writes response text to a file, which is closed with the sink."""
+
+    def __init__(self, path: Path, flush_bytes: Optional[int] = None, flush_interval: Optional[float] = None) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.path = path
+        super().__init__(path.open("w", encoding="utf-8"), flush_bytes, flush_interval)
+
+    def close(self) -> None:
+        if not self.stream.closed:
+            super().close()
+            self.stream.close()
+
+
+class TextSink(Sink):
+    """A sink that collects the response text and records whether the response completed."""
+
+    def __init__(self) -> None:
+        self.parts: List[str] = []
+        self.stop: Optional[StopReason] = None
+        self.usage = Usage()
+
+    @property
+    def text(self) -> str:
+        """The response text received so far."""
+        return "".join(self.parts)
+
+    @property
+    def complete(self) -> bool:
+        """Whether the response ended with a stop reason."""
+        return self.stop is not None
+
+    def on_text(self, text: str) -> None:
+        self.parts.append(text)
+
+    def on_usage(self, usage: Usage) -> None:
+        self.usage = self.usage.merge(usage)
+
+    def on_stop(self, stop: StopReason) -> None:
+        self.stop = stop
+
+
+class CacheSink(TextSink):
+    """A sink that stores the response in the response cache when the model finishes it, but not when it is cut off."""
+
+    def __init__(self, cache: "ResponseCache", key: str) -> None:
+        super().__init__()
+        self.cache = cache
+        self.key = key
+
+    def on_stop(self, stop: StopReason) -> None:
+        super().on_stop(stop)
+        if self.parts and stop.finished:
+            self.cache.put(self.key, self.text)
+
+
+class CodeExtractorSink(TextSink):
+    """A sink that extracts the fenced code blocks of the response, optionally keeping only one language."""
+
+    def __init__(self, language: Optional[str] = "python") -> None:
+        super().__init__()
+        self.language = language
+
+    @property
+    def blocks(self) -> List[str]:
+        """The code blocks of the response text received so far, including an unterminated final block."""
+        return [
+            code
+            for language, code in CODE_BLOCK_PATTERN.findall(self.text)
+            if self.language is None or language in ("", self.language)
+        ]
+
+    @property
+    def code(self) -> str:
+        """The code blocks of the response joined into a single source."""
+        return "\n".join(block.rstrip("\n") + "\n" for block in self.blocks)
+
+
+def replay_events(text: str, chunk_size: int = REPLAY_CHUNK_SIZE) -> Iterator[StreamEvent]:
+    """Turn a cached response back into a stream of events, so it goes through the same sinks as a live response."""
+    for start in range(0, len(text), chunk_size):
+        yield TextDelta(text[start : start + chunk_size])
+    yield StopReason("cached")
+
+
+def pipe(events: Iterable[StreamEvent], sinks: Sequence[Sink]) -> None:
+    """
+    Dispatch a stream of events to sinks, closing every sink when the stream ends or fails.
+
+    Args:
+        events: The stream events.
+        sinks: The sinks to write the events to, in order.
+    """
+    try:
+        for event in events:
+            for sink in sinks:
+                sink.write(event)
+    finally:
+        for sink in sinks:
+            sink.close()
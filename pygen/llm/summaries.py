@@ -0,0 +1,255 @@
+"""
+Per-file summaries of a diff, from which the message of a large pull request is written.
+
+The patch of each changed file is summarised by its own request, and the requests run concurrently on the LLM client's
+batch pool. Summaries are kept in the response cache under a key made from the blob hashes of the file before and after
+the change, rather than from the prompt, so a file's summary is reused whenever the same change to it is diffed again,
+even from another branch, and the patches of cached files are not read at all.
+"""
+
+import json
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from pygen.llm.cache import get_response_cache
+from pygen.llm.metrics import get_metrics
+from pygen.utils.diff import DiffOptions, FileChange, budget_diff, iter_file_diffs
+from pygen.utils.log import get_logger
+
+if TYPE_CHECKING:
+    import git
+
+    from pygen.llm.client import LLMClient
+    from pygen.prompts.prompt import Prompt
+
+logger = get_logger(__name__)
+
+# Output token limit of each file summary request
+FILE_SUMMARY_TOKENS = 384
+
+# Headings of the file sections of a pull request message, by the status of the files they list
+FILE_SECTIONS = {
+    "Added Files": ("added", "copied"),
+    "Modified Files": ("modified", "renamed"),
+    "Removed Files": ("removed",),
+}
+
+
+@dataclass(frozen=True)
+class FileSummary:
+    """
+    The summary of the changes to one file.
+
+    Attributes:
+        change: The change to the file.
+        text: The summary, or why the file was not summarised.
+        cached: Whether the summary was read from the response cache.
+        key: The response cache key of the summary, if it was read from or written to the cache.
+    """
+
+    change: FileChange
+    text: str
+    cached: bool = False
+    key: Optional[str] = None
+
+    @property
+    def headline(self) -> str:
+        """The first line of the summary, a single sentence summarising the change."""
+        lines = [line.strip().lstrip("-*#").strip() for line in self.text.splitlines()]
+        return next((line for line in lines if line), "")
+
+
+def summary_key(llm_client: "LLMClient", instructions: str, change: FileChange, options: DiffOptions) -> str:
+    """
+    Return the response cache key of the summary of a file, made from its paths and blob hashes rather than its patch.
+
+    The instructions and diff options are part of the key, as they change the summary of the same blobs.
+    """
+    change_key = [change.old_path, change.path, change.status, change.old_blob, change.new_blob]
+    payload = json.dumps([instructions, options.max_tokens, options.context_lines, change_key])
+    return llm_client.cache_key(payload, FILE_SUMMARY_TOKENS)
+
+
+def read_cached_summaries(
+    llm_client: "LLMClient", instructions: str, changes: Sequence[FileChange], options: DiffOptions
+) -> Tuple[Dict[str, FileSummary], Dict[str, str], List[FileChange]]:
+    """
+    Read the summaries of the changed files from the response cache.
+
+    Returns:
+        The cached summaries, and those of removed files, by path; the cache keys of the summaries of the other files,
+        by path; and the changes whose summaries are not cached.
+    """
+    cache = get_response_cache()
+    summaries: Dict[str, FileSummary] = {}
+    keys: Dict[str, str] = {}
+    missing: List[FileChange] = []
+    for change in changes:
+        if change.skipped is not None:
+            continue
+        if change.status == "removed":
+            # There is nothing to summarise about a removed file beyond its removal
+            summaries[change.path] = FileSummary(change, "The file was removed.")
+            continue
+        keys[change.path] = summary_key(llm_client, instructions, change, options)
+        cached = cache.get(keys[change.path]) if cache is not None else None
+        if cached is not None:
+            summaries[change.path] = FileSummary(change, cached, cached=True, key=keys[change.path])
+            get_metrics().record_cache_hit(llm_client.backend.name, llm_client.model_id)
+        else:
+            missing.append(change)
+    return summaries, keys, missing
+
+
+def request_summaries(
+    llm_client: "LLMClient",
+    repo: "git.Repo",
+    revisions: Sequence[str],
+    changes: Sequence[FileChange],
+    keys: Dict[str, str],
+    prompt: Callable[[str, str, str], "Prompt"],
+    options: DiffOptions,
+    on_result: Optional[Callable[[int, int], None]] = None,
+) -> Dict[str, FileSummary]:
+    """
+    Summarise the changes to files by concurrent requests, streaming their patches from Git as the requests are sent,
+    and cache the summaries.
+
+    Returns:
+        The summaries by path. Files found to be binary or generated from their patch are not sent, and a failed
+        request is reported in its summary.
+
+    Raises:
+        RuntimeError: If every request failed.
+    """
+    cache = get_response_cache()
+    summaries: Dict[str, FileSummary] = {}
+    # Files skipped by their patch are not sent, so requests are matched to files as they are sent
+    submitted: List[FileChange] = []
+    # Files whose patches are not read yet are counted as if they will be sent, so the total is reached
+    unread = len(changes)
+
+    def prompts() -> Iterator["Prompt"]:
+        nonlocal unread
+        for file_diff in iter_file_diffs(repo, revisions, changes, options.context_lines):
+            unread -= 1
+            if file_diff.change.skipped is not None:
+                reason = file_diff.change.skipped
+                summaries[file_diff.change.path] = FileSummary(file_diff.change, f"Not summarised ({reason}).")
+                continue
+            submitted.append(file_diff.change)
+            patch = budget_diff([file_diff], max_tokens=options.max_tokens)
+            yield prompt(file_diff.change.path, file_diff.change.status, patch)
+
+    failures = 0
+    for completed, result in enumerate(llm_client.invoke_batch(prompts(), max_tokens=FILE_SUMMARY_TOKENS), start=1):
+        change = submitted[result.index]
+        if result.ok and result.text is not None:
+            summaries[change.path] = FileSummary(change, result.text, key=keys[change.path])
+            if cache is not None:
+                cache.put(keys[change.path], result.text)
+        else:
+            failures += 1
+            logger.warning(f"Could not summarise {change.path}: {result.error}")
+            summaries[change.path] = FileSummary(change, f"Could not be summarised: {result.error}")
+        if on_result is not None:
+            on_result(completed, len(submitted) + unread)
+
+    if submitted and failures == len(submitted):
+        raise RuntimeError(f"All {len(submitted)} file summaries failed")
+    return summaries
+
+
+def summarise_files(
+    llm_client: "LLMClient",
+    repo: "git.Repo",
+    revisions: Sequence[str],
+    changes: Sequence[FileChange],
+    prompt: Callable[[str, str, str], "Prompt"],
+    options: DiffOptions,
+    on_result: Optional[Callable[[int, int], None]] = None,
+) -> List[FileSummary]:
+    """
+    Summarise the changes to each file concurrently, reading cached summaries instead where they exist.
+
+    Args:
+        llm_client: The LLM client.
+        repo: The repository.
+        revisions: The arguments of ``git diff`` that select what is compared.
+        changes: The changed files, as returned by ``list_changes``. Skipped and removed files are not summarised.
+        prompt: Builds the prompt for a file from its path, status and patch.
+        options: The options of the diff of each file. Its token budget applies to each file separately.
+        on_result: Called with the number of summarised files and the number of files to summarise after each request
+            completes. Files found to be binary or generated are not counted.
+
+    Returns:
+        The summaries of the files that are not skipped by path, in the order of the changes. A failed request is
+        reported in its summary.
+
+    Raises:
+        RuntimeError: If every request failed.
+    """
+    instructions = prompt("", "", "").instructions
+    summaries, keys, missing = read_cached_summaries(llm_client, instructions, changes, options)
+    logger.info(f"Summarising {len(missing)} changed files, {len(summaries)} summaries are cached")
+    if missing:
+        summaries.update(request_summaries(llm_client, repo, revisions, missing, keys, prompt, options, on_result))
+    return [summaries[change.path] for change in changes if change.path in summaries]
+
+
+def get_summaries_content(summaries: Sequence[FileSummary], headlines_only: bool = False) -> str:
+    """
+    Join the summaries of the changed files for the prompt of the pull request message.
+
+    Args:
+        summaries: The summaries.
+        headlines_only: Whether to include only the first line of each summary, for pull requests too large for the
+            full summaries.
+
+    Returns:
+        The summaries, each headed by the path and status of its file.
+    """
+    parts = []
+    for summary in summaries:
+        text = summary.headline if headlines_only else summary.text.strip()
+        parts.append(f"File '{summary.change.path}' ({summary.change.status}):\n{text}\n")
+    return "\n".join(parts)
+
+
+def get_summaries_id(summaries: Sequence[FileSummary], headlines_only: bool = False) -> str:
+    """
+    Identify the content ``get_summaries_content`` joins from the summaries, for the response cache.
+
+    Summaries are identified by their cache keys rather than their text. Summaries without a key, of removed, skipped
+    or failed files, are identified by their text, which is short.
+    """
+    files = [[s.change.path, s.change.status, s.key or s.text] for s in summaries]
+    return json.dumps([headlines_only, files])
+
+
+def format_file_sections(changes: Sequence[FileChange], summaries: Sequence[FileSummary]) -> str:
+    """
+    Write the Added Files, Modified Files and Removed Files sections of a pull request message from Git's list of
+    changes, describing each file by the headline of its summary.
+
+    Args:
+        changes: All the changed files, including skipped files.
+        summaries: The summaries of the files.
+
+    Returns:
+        The sections.
+    """
+    headlines = {summary.change.path: summary.headline for summary in summaries}
+    sections = []
+    for heading, statuses in FILE_SECTIONS.items():
+        lines = [f"{heading}:"]
+        for change in changes:
+            if change.status not in statuses:
+                continue
+            path = change.path if change.old_path == change.path else f"{change.old_path} -> {change.path}"
+            headline = f"Not summarised ({change.skipped})." if change.skipped else headlines.get(change.path)
+            lines.append(f"- {path}: {headline}" if headline and change.status != "removed" else f"- {path}")
+        if len(lines) == 1:
+            lines.append("- None")
+        sections.append("\n".join(lines))
+    return "\n\n".join(sections) + "\n"
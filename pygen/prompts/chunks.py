@@ -0,0 +1,17 @@
+from typing import Sequence
+
+
+def get_part_content(number: int, total: int, label: str, result: str) -> str:
+    return f"""Part {number} of {total} ({label}):
+
+{result}
+"""
+
+
+def get_partial_results_content(subject: str, parts: Sequence[str]) -> str:
+    parts_content = "\n".join(parts)
+    return f"""The {subject} is too large to include in full, so it was split into parts and each part was processed
+separately. The results for each part follow, in order. Combine them into a single response that covers the whole
+{subject}, as if you had seen it all at once, removing any repetition between the parts.
+
+{parts_content}"""
@@ -1,10 +1,9 @@
-def get_module_docstring_prompt(module_content: str) -> str:
-    return f"""You are a professional and experienced software engineer. Write a Python module docstring following PEP
-257 standards and Google-style format for the code provided below.
+from pygen.prompts.prompt import Prompt
 
-Module Code:
 
-{module_content}
+def get_module_docstring_prompt(module_content: str) -> Prompt:
+    instructions = """You are a professional and experienced software engineer. Write a Python module docstring
+following PEP 257 standards and Google-style format for the code provided below.
 
 The docstring should:
 1. Start with triple double quotes on the first line and then a single-line summary in the imperative mood on the next
@@ -22,15 +21,12 @@ or methods.
 2. Ensure the docstring lines do not exceed 120 characters.
 4. Only output the docstring without any additional information or comments.
 """
+    return Prompt(instructions, f"Module Code:\n\n{module_content}\n")
 
 
-def get_class_docstring_prompt(class_content: str) -> str:
-    return f"""You are a professional and experienced software engineer. Write a Python class docstring following PEP
-257 standards and Google-style format for the code provided below.
-
-Class Code:
-
-{class_content}
+def get_class_docstring_prompt(class_content: str) -> Prompt:
+    instructions = """You are a professional and experienced software engineer. Write a Python class docstring following
+PEP 257 standards and Google-style format for the code provided below.
 
 The docstring should:
 1. Start with triple double quotes on the first line and then a single-line summary in the imperative mood on the next
@@ -45,15 +41,12 @@ Formatting rules:
 2. Ensure the docstring lines do not exceed 120 characters.
 3. Only output the docstring without any additional information or comments.
 """
+    return Prompt(instructions, f"Class Code:\n\n{class_content}\n")
 
 
-def get_function_docstring_prompt(function_content: str) -> str:
-    return f"""You are a professional and experienced software engineer. Write a Python function docstring following PEP
-257 standards and Google-style format for the code provided below.
-
-Function Code:
-
-{function_content}
+def get_function_docstring_prompt(function_content: str) -> Prompt:
+    instructions = """You are a professional and experienced software engineer. Write a Python function docstring
+following PEP 257 standards and Google-style format for the code provided below.
 
 The docstring should:
 1. Start with triple double quotes on the first line and then a single-line summary in the imperative mood on the next
@@ -69,3 +62,4 @@ Formatting rules:
 2. Ensure the docstring lines do not exceed 120 characters.
 4. Only output the docstring without any additional information or comments.
 """
+    return Prompt(instructions, f"Function Code:\n\n{function_content}\n")
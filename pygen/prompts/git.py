@@ -1,6 +1,9 @@
-def get_pr_prompt(branch1: str, branch2: str, diff_content: str) -> str:
-    return f"""You are a professional and experienced software engineer. Write a comprehensive Git pull request
-message for the following diff between branches '{branch1}' and '{branch2}'. Follow a rigorous and structured format
+from pygen.prompts.prompt import Prompt
+
+
+def get_pr_prompt(branch1: str, branch2: str, diff_content: str) -> Prompt:
+    instructions = """You are a professional and experienced software engineer. Write a comprehensive Git pull
+request message for the Git diff between two branches provided below. Follow a rigorous and structured format
 including:
 
 Title: [Feature/Fix/Chore/Refactor/Performance/Style/Test/Docs/Security/Hotfix] Provide a concise and descriptive
@@ -115,19 +118,15 @@ Notes to Reviewer: Include important points for the reviewers to consider.
     Example: Please pay close attention to the changes in module B, as they might affect existing functionalities.
     Example: Verify the performance improvements by running code on a suitable test dataset.
     Example: Check the compatibility of the refactored code with older versions of the dependent libraries.
-
-Here is the Git diff between branches '{branch1}' and '{branch2}':
-
-{diff_content}
 """
+    return Prompt(
+        instructions, f"Here is the Git diff between branches '{branch1}' and '{branch2}':\n\n{diff_content}\n"
+    )
 
-def get_git_review(branch1: str, branch2: str, diff_content: str) -> str:
-    return f"""You are a professional and experienced software engineer. Review the changes introduced in the Git diff
-between branches '{branch1}' and '{branch2}', ensuring they adhere to software engineering best practices.
 
-Git Diff:
-
-{diff_content}
+def get_git_review(branch1: str, branch2: str, diff_content: str) -> Prompt:
+    instructions = """You are a professional and experienced software engineer. Review the changes introduced in the
+Git diff between two branches provided below, ensuring they adhere to software engineering best practices.
 
 Your message should cover the following key areas:
 1. Summary: Provide a clear and concise summary of the changes introduced in this diff.
@@ -154,3 +153,74 @@ relevant test coverage.
 Provide detailed feedback on each point, referencing specific parts of the Git diff where necessary, and discuss the
 overall strengths and weaknesses of the changes.
 """
+    return Prompt(instructions, f"Git Diff between branches '{branch1}' and '{branch2}':\n\n{diff_content}\n")
+
+
+def get_pr_summary_prompt(branch1: str, branch2: str, diff_content: str) -> Prompt:
+    instructions = """You are a professional and experienced software engineer. The Git diff between two branches
+is too large to read at once, so it has been split into parts. Summarise the part provided below, so that a pull
+request message can be written from the summaries of all the parts.
+
+Your summary should cover:
+1. Files: List every file in this part, stating whether it was added, modified or removed, with a one-line summary of
+the change to each file.
+2. Purpose: Describe what the changes in this part do and why, as far as the diff shows.
+3. Notable Details: Mention any changes to public interfaces, dependencies, tests, documentation, or any potential
+breaking changes, bugs or limitations.
+
+Be concise and factual, and only describe what is in this part of the diff.
+"""
+    return Prompt(instructions, f"Git Diff Part between branches '{branch1}' and '{branch2}':\n\n{diff_content}\n")
+
+
+def get_git_partial_review(branch1: str, branch2: str, diff_content: str) -> Prompt:
+    instructions = """You are a professional and experienced software engineer. The Git diff between two branches
+is too large to review at once, so it has been split into parts. Review the part provided below, ensuring the changes
+adhere to software engineering best practices, so that a review of the whole diff can be written from the reviews of
+all the parts.
+
+Your review should briefly summarise the changes in this part, then report your findings on code quality, design,
+design patterns, documentation, error handling, dependencies, performance and scalability, security, and testing.
+Reference the specific files and code your findings refer to. Only report findings supported by this part of the diff,
+as code outside it is reviewed separately.
+"""
+    return Prompt(instructions, f"Git Diff Part between branches '{branch1}' and '{branch2}':\n\n{diff_content}\n")
+
+
+def get_file_summary_prompt(path: str, status: str, diff_content: str) -> Prompt:
+    instructions = """You are a professional and experienced software engineer. Summarise the changes to one file of a
+Git diff provided below, so that a pull request message can be written from the summaries of all the changed files.
+
+Start with a single sentence summarising the change to the file, without naming the file, suitable for a list of the
+changed files in a pull request message. Follow it with at most 5 short bullet points describing the notable details:
+the purpose of the change, changes to public interfaces or behaviour, new dependencies, tests, documentation, and any
+potential breaking changes, bugs or limitations.
+
+Be concise and factual, and only describe what the diff shows.
+"""
+    return Prompt(instructions, f"Git Diff of file '{path}' ({status}):\n\n{diff_content}\n")
+
+
+def get_pr_from_summaries_prompt(branch1: str, branch2: str, summaries_content: str) -> Prompt:
+    instructions = f"""{get_pr_prompt(branch1, branch2, "").instructions}
+Instead of the Git diff, you are given a summary of the changes to each file, as the diff is too large to read at once.
+Do not write the Added Files, Modified Files and Removed Files sections: they are filled in from Git separately.
+"""
+    return Prompt(
+        instructions,
+        f"Summaries of the changed files between branches '{branch1}' and '{branch2}':\n\n{summaries_content}\n",
+    )
+
+
+def get_commit_message_prompt(diff_content: str) -> Prompt:
+    instructions = """You are a professional and experienced software engineer. Write a Git commit message for the
+staged changes in the Git diff provided below.
+
+The message should start with a subject line of no more than 72 characters that summarises the change in the imperative
+mood, e.g. "Add retries to the HTTP client", without a trailing full stop. Follow it with a blank line and a body,
+wrapped at 72 characters, that explains what was changed and why, as far as the diff shows. Use bullet points for
+changes to several distinct areas. Leave out the body for a small, self-explanatory change.
+
+Only output the commit message, without any other text or formatting around it.
+"""
+    return Prompt(instructions, f"Staged Git Diff:\n\n{diff_content}\n")
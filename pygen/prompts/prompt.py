@@ -0,0 +1,41 @@
+"""
+Prompts made of static instructions and the content they apply to.
+"""
+
+from dataclasses import dataclass
+from typing import Union
+
+
+@dataclass(frozen=True)
+class Prompt:
+    """
+    A prompt made of static instructions followed by the content they apply to, such as a module or a diff.
+
+    The LLM client sends the instructions as a separate system prompt, so requests that share instructions and only
+    differ in their content can reuse the model's cache of the instructions. A prompt is not a string: code that needs
+    its whole text asks for it with ``get_prompt_text``, so the instructions are never lost by string operations.
+
+    Attributes:
+        instructions: The instructions, which are the same for every request of a kind.
+        content: The content the instructions apply to.
+    """
+
+    instructions: str
+    content: str
+
+    @property
+    def text(self) -> str:
+        """The whole prompt text: the instructions followed by the content."""
+        return f"{self.instructions}\n{self.content}"
+
+    def __str__(self) -> str:
+        return self.text
+
+
+# A prompt given either as plain text, sent as a single user message, or as instructions and content
+PromptLike = Union[str, Prompt]
+
+
+def get_prompt_text(prompt: PromptLike) -> str:
+    """Return the whole text of a prompt."""
+    return prompt.text if isinstance(prompt, Prompt) else prompt
@@ -1,10 +1,9 @@
-def get_function_refactor_prompt(function_content: str) -> str:
-    return f"""You are a professional and experienced software engineer. Refactor the Python function provided below to
-improve its design and implementation, ensuring it adheres to software engineering best practices.
+from pygen.prompts.prompt import Prompt
 
-Function Code:
 
-{function_content}
+def get_function_refactor_prompt(function_content: str) -> Prompt:
+    instructions = """You are a professional and experienced software engineer. Refactor the Python function provided
+below to improve its design and implementation, ensuring it adheres to software engineering best practices.
 
 Your refactoring should address the following key areas:
 1. Code Quality: Improve the readability, consistency, and maintainability of the code, ensuring adherence to PEP 8
@@ -27,3 +26,4 @@ Formatting rules:
 3. Ensure all lines, including the docstring, do not exceed 120 characters.
 4. Only output the refactored code without any additional information or comments.
 """
+    return Prompt(instructions, f"Function Code:\n\n{function_content}\n")
@@ -1,10 +1,9 @@
-def get_module_refactor_prompt(module_content: str) -> str:
-    return f"""You are a professional and experienced software engineer. Refactor the Python module provided below to
-improve its design and implementation, ensuring it adheres to software engineering best practices.
+from pygen.prompts.prompt import Prompt
 
-Module Code:
 
-{module_content}
+def get_module_refactor_prompt(module_content: str) -> Prompt:
+    instructions = """You are a professional and experienced software engineer. Refactor the Python module provided
+below to improve its design and implementation, ensuring it adheres to software engineering best practices.
 
 Your review should address the following key areas:
 1. Code Quality: Improve the readability, consistency, and maintainability of the code, ensuring adherence to PEP 8
@@ -27,15 +26,12 @@ Formatting rules:
 3. Ensure all lines, including the docstring, do not exceed 120 characters.
 4. Only output the refactored code without any additional information or comments.
 """
+    return Prompt(instructions, f"Module Code:\n\n{module_content}\n")
 
 
-def get_module_review_prompt(module_content: str) -> str:
-    return f"""You are a professional and experienced software engineer. Review the design and implementation of the
-Python module provided below, ensuring it adheres to software engineering best practices.
-
-Module Code:
-
-{module_content}
+def get_module_review_prompt(module_content: str) -> Prompt:
+    instructions = """You are a professional and experienced software engineer. Review the design and implementation of
+the Python module provided below, ensuring it adheres to software engineering best practices.
 
 Your review should cover the following key areas:
 1. Code Quality: Assess the overall quality of the code, including readability, consistency, maintainability,
@@ -57,15 +53,12 @@ issues.
 Provide detailed feedback on each point, referencing specific parts of the module where necessary, and discuss the
 overall strengths and weaknesses of the implementation.
 """
+    return Prompt(instructions, f"Module Code:\n\n{module_content}\n")
 
 
-def get_class_review_prompt(class_content: str) -> str:
-    return f"""You are a professional and experienced software engineer. Review the design and implementation of the
-Python class provided below, ensuring it adheres to software engineering best practices.
-
-Class Code:
-
-{class_content}
+def get_class_review_prompt(class_content: str) -> Prompt:
+    instructions = """You are a professional and experienced software engineer. Review the design and implementation of
+the Python class provided below, ensuring it adheres to software engineering best practices.
 
 Your review should cover the following key areas:
 1. Code Quality: Assess the overall quality of the code, including readability, consistency, maintainability,
@@ -87,15 +80,12 @@ issues.
 Provide detailed feedback on each point, referencing specific parts of the class where necessary, and discuss the
 overall strengths and weaknesses of the implementation.
 """
+    return Prompt(instructions, f"Class Code:\n\n{class_content}\n")
 
 
-def get_function_review_prompt(function_content: str) -> str:
-    return f"""You are a professional and experienced software engineer. Review the design and implementation of the
-Python function provided below, ensuring it adheres to software engineering best practices.
-
-Function Code:
-
-{function_content}
+def get_function_review_prompt(function_content: str) -> Prompt:
+    instructions = """You are a professional and experienced software engineer. Review the design and implementation of
+the Python function provided below, ensuring it adheres to software engineering best practices.
 
 Your review should cover the following key areas:
 1. Code Quality: Assess the overall quality of the code, including readability, consistency, maintainability,
@@ -117,3 +107,18 @@ security issues.
 Provide detailed feedback on each point, referencing specific parts of the function where necessary, and discuss the
 overall strengths and weaknesses of the implementation.
 """
+    return Prompt(instructions, f"Function Code:\n\n{function_content}\n")
+
+
+def get_module_partial_review_prompt(module_content: str) -> Prompt:
+    instructions = """You are a professional and experienced software engineer. The Python module provided below is too
+large to review at once, so it has been split into parts. Review the part provided below, ensuring it adheres to
+software engineering best practices, so that a review of the whole module can be written from the reviews of all the
+parts.
+
+Your review should briefly summarise what this part of the module does, then report your findings on code quality,
+design principles, design patterns, documentation, error handling, dependencies, performance and scalability, and
+security. Reference the specific classes, functions and lines your findings refer to. Only report findings supported by
+this part of the module, as code outside it is reviewed separately.
+"""
+    return Prompt(instructions, f"Module Code Part:\n\n{module_content}\n")
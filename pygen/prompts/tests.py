@@ -1,10 +1,9 @@
-def get_module_tests_prompt(module_content: str) -> str:
-    return f"""You are a professional and experienced software engineer. Write a comprehensive set of pytest unit tests
-for the Python module provided below, ensuring full coverage.
+from pygen.prompts.prompt import Prompt
 
-Module Code:
 
-{module_content}
+def get_module_tests_prompt(module_content: str) -> Prompt:
+    instructions = """You are a professional and experienced software engineer. Write a comprehensive set of pytest unit
+tests for the Python module provided below, ensuring full coverage.
 
 The tests should:
 1. Include comprehensive tests for all functions and classes.
@@ -23,15 +22,12 @@ Formatting rules:
 3. Ensure test functions are named in a descriptive and clear manner, prefixed with 'test_'.
 4. Only output the pytest test code without any additional information or comments.
 """
+    return Prompt(instructions, f"Module Code:\n\n{module_content}\n")
 
 
-def get_class_tests_prompt(class_content: str) -> str:
-    return f"""You are a professional and experienced software engineer. Write a comprehensive set of pytest unit tests
-for the Python class provided below, ensuring full coverage.
-
-Class Code:
-
-{class_content}
+def get_class_tests_prompt(class_content: str) -> Prompt:
+    instructions = """You are a professional and experienced software engineer. Write a comprehensive set of pytest unit
+tests for the Python class provided below, ensuring full coverage.
 
 The tests should:
 1. Include comprehensive tests for all methods in the class.
@@ -50,15 +46,12 @@ Formatting rules:
 3. Ensure test functions are named in a descriptive and clear manner, prefixed with 'test_'.
 4. Only output the pytest test code without any additional information or comments.
 """
+    return Prompt(instructions, f"Class Code:\n\n{class_content}\n")
 
 
-def get_function_tests_prompt(function_content: str) -> str:
-    return f"""You are a professional and experienced software engineer. Write a comprehensive set of pytest unit tests
-for the Python function provided below, ensuring full coverage.
-
-Function Code:
-
-{function_content}
+def get_function_tests_prompt(function_content: str) -> Prompt:
+    instructions = """You are a professional and experienced software engineer. Write a comprehensive set of pytest unit
+tests for the Python function provided below, ensuring full coverage.
 
 The tests should:
 1. Include comprehensive tests for all possible scenarios.
@@ -77,3 +70,4 @@ Formatting rules:
 3. Ensure test functions are named in a descriptive and clear manner, prefixed with 'test_'.
 4. Only output the pytest test code without any additional information or comments.
 """
+    return Prompt(instructions, f"Function Code:\n\n{function_content}\n")
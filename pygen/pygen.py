@@ -1,7 +1,7 @@
 import logging
+from typing import Optional
 
 import typer
-from rich import print  # noqa: A004
 
 from pygen.cli.explain import explain_app
 from pygen.cli.generate import generate_app
@@ -9,9 +9,10 @@ from pygen.cli.git import git_app
 from pygen.cli.refactor import refactor_app
 from pygen.cli.resolve import resolve_app
 from pygen.cli.review import review_app
-from pygen.llm.client import LLMClient
+from pygen.utils.config import get_settings
+from pygen.utils.llm import prewarm_llm_client
 from pygen.utils.log import LogLevel, get_logger, get_rich_handler
-from pygen.utils.rich import PYDEV, error_panel
+from pygen.utils.rich import PYDEV
 
 __author__ = "Chris Jackett"
 __credits__ = [
@@ -43,31 +44,44 @@ pygen.add_typer(review_app, name="review")
 
 logger = get_logger(__name__)
 
+# Command groups whose commands call the LLM. The git group pre-warms its own commands, as only some of them do.
+LLM_COMMANDS = {"generate", "refactor", "review"}
+
 
 @pygen.callback()
 def global_options(
     ctx: typer.Context,
     level: LogLevel = typer.Option(LogLevel.INFO, help="Logging level."),
     show: bool = typer.Option(False, help="Show the prompt being sent to the LLM."),
+    workers: Optional[int] = typer.Option(
+        None, min=1, help="Number of worker processes used to scan the project. Defaults to the number of CPU cores."
+    ),
+    cache: Optional[bool] = typer.Option(
+        None, "--cache/--no-cache", help="Replay cached LLM responses for identical requests. Enabled by default."
+    ),
+    prewarm: Optional[int] = typer.Option(
+        None,
+        min=0,
+        help="Number of connections to the LLM service to open while the project is scanned. Zero disables it.",
+    ),
 ) -> None:
     """
     Global options for Marimba CLI.
     """
     get_rich_handler().setLevel(logging.getLevelName(level.value))
+
+    if workers is not None:
+        get_settings().workers = workers
+    if cache is not None:
+        get_settings().cache = cache
+    if prewarm is not None:
+        get_settings().llm_prewarm = prewarm
     logger.info(f"Initialised {PYDEV} CLI v{__version__}")
 
-    try:
-        llm_client = LLMClient()
-        ctx.meta["llm_client"] = llm_client
-        ctx.meta["show"] = show
-    except EnvironmentError as e:
-        logger.error(e)
-        print(error_panel(str(e)))
-        raise typer.Exit()
-    except Exception as e:
-        logger.error(e)
-        print(error_panel(f"Could not Initialise the LLM client: {e}"))
-        raise typer.Exit()
+    # The LLM client is created on first use by the commands that need it, or in the background if pre-warming
+    ctx.meta["show"] = show
+    if get_settings().llm_prewarm > 0 and ctx.invoked_subcommand in LLM_COMMANDS and not ctx.resilient_parsing:
+        prewarm_llm_client(ctx, get_settings().llm_prewarm)
 
 
 # Subcommands for convert
@@ -0,0 +1,259 @@
+"""
+Splitting of diffs and modules into chunks that fit a token budget.
+
+Text is split along its natural boundaries, coarsest first: a diff by file and then by hunk, and a module by top-level
+statement and then by the statements of an oversized class. Only a piece that is still too large on its own is split
+by lines. The pieces are then packed in order into as few chunks as fit the budget.
+"""
+
+import ast
+import re
+from dataclasses import dataclass
+from typing import List, Optional, Sequence
+
+from pygen.utils.tokens import estimate_tokens
+
+# Start of the section of one file in a Git patch
+DIFF_FILE_PATTERN = re.compile(r"^diff --git a/(.*?) b/(.*)$", re.MULTILINE)
+
+# Start of a hunk in a unified diff
+HUNK_PATTERN = re.compile(r"^@@ ", re.MULTILINE)
+
+# A label ending in a line range, as given by ``split_lines``
+LINES_LABEL_PATTERN = re.compile(r"^(.*) lines? (\d+)(?:-(\d+))?$")
+
+# Number of characters a line too long for any chunk is cut at, per token of budget
+CHARS_PER_TOKEN = 2
+
+
+@dataclass(frozen=True)
+class Chunk:
+    """
+    A piece of a larger text that fits a token budget.
+
+    Attributes:
+        label: A short description of where the chunk comes from, e.g. a file path or a line range.
+        text: The text of the chunk.
+        tokens: The estimated number of tokens of the text.
+    """
+
+    label: str
+    text: str
+    tokens: int
+
+
+def make_chunk(label: str, text: str) -> Chunk:
+    """Create a chunk, estimating its tokens."""
+    return Chunk(label, text, estimate_tokens(text))
+
+
+def split_lines(label: str, text: str, max_tokens: int, first_line: int = 1) -> List[Chunk]:
+    """
+    Split a text into chunks of whole lines, as a last resort for a piece with no finer structure.
+
+    Args:
+        label: The label of the text. Chunks are labelled with their line range.
+        text: The text.
+        max_tokens: The token budget of a chunk.
+        first_line: The line number of the first line of the text, for the labels.
+
+    Returns:
+        The chunks, in order.
+    """
+    chunks: List[Chunk] = []
+    lines: List[str] = []
+    tokens = 0
+    first = first_line
+
+    for number, line in enumerate(text.splitlines(keepends=True), start=first_line):
+        line_tokens = estimate_tokens(line)
+        if lines and tokens + line_tokens > max_tokens:
+            chunks.append(Chunk(f"{label} lines {first}-{number - 1}", "".join(lines), tokens))
+            lines, tokens, first = [], 0, number
+        if line_tokens > max_tokens:
+            # A single line that cannot fit is cut, so minified or generated text cannot stall the split
+            width = max_tokens * CHARS_PER_TOKEN
+            for start in range(0, len(line), width):
+                chunks.append(make_chunk(f"{label} line {number}", line[start : start + width]))
+            first = number + 1
+            continue
+        lines.append(line)
+        tokens += line_tokens
+    if lines:
+        chunks.append(Chunk(f"{label} lines {first}-{first + len(lines) - 1}", "".join(lines), tokens))
+    return chunks
+
+
+def join_labels(first: str, last: str) -> str:
+    """Return the label of consecutive pieces, merging their line ranges if they come from the same source."""
+    first_match = LINES_LABEL_PATTERN.match(first)
+    last_match = LINES_LABEL_PATTERN.match(last)
+    if first_match and last_match and first_match.group(1) == last_match.group(1):
+        end = last_match.group(3) or last_match.group(2)
+        return f"{first_match.group(1)} lines {first_match.group(2)}-{end}"
+    return f"{first} to {last}"
+
+
+def pack_chunks(pieces: Sequence[Chunk], max_tokens: int, separator: str = "\n") -> List[Chunk]:
+    """
+    Pack consecutive pieces into as few chunks as fit the budget, keeping their order.
+
+    Args:
+        pieces: The pieces, each of which fits the budget on its own.
+        max_tokens: The token budget of a chunk.
+        separator: The text placed between pieces packed into the same chunk.
+
+    Returns:
+        The packed chunks, labelled with the labels of their pieces.
+    """
+    separator_tokens = estimate_tokens(separator)
+    chunks: List[Chunk] = []
+    group: List[Chunk] = []
+    tokens = 0
+
+    def flush() -> None:
+        if group:
+            label = group[0].label if len(group) == 1 else join_labels(group[0].label, group[-1].label)
+            chunks.append(Chunk(label, separator.join(piece.text for piece in group), tokens))
+
+    for piece in pieces:
+        added = piece.tokens + (separator_tokens if group else 0)
+        if group and tokens + added > max_tokens:
+            flush()
+            group, tokens, added = [], 0, piece.tokens
+        group.append(piece)
+        tokens += added
+    flush()
+    return chunks
+
+
+def split_diff_files(diff_text: str) -> List[Chunk]:
+    """
+    Split a Git patch into the sections of each file, labelled with the file path.
+
+    Text that does not start with a ``diff --git`` header, such as a diff in another format, is kept as one section.
+    """
+    starts = [match.start() for match in DIFF_FILE_PATTERN.finditer(diff_text)]
+    if not starts or starts[0] > 0:
+        starts.insert(0, 0)
+    sections = []
+    for start, end in zip(starts, starts[1:] + [len(diff_text)]):
+        text = diff_text[start:end]
+        match = DIFF_FILE_PATTERN.match(text)
+        sections.append(make_chunk(match.group(2) if match else "diff", text))
+    return sections
+
+
+def split_hunks(section: Chunk, max_tokens: int) -> List[Chunk]:
+    """
+    Split the diff of one file into pieces of whole hunks, each starting with the file header.
+
+    Args:
+        section: The diff of a file, as returned by ``split_diff_files``.
+        max_tokens: The token budget of a piece.
+
+    Returns:
+        The pieces, in order. Hunks too large on their own are split by lines.
+    """
+    starts = [match.start() for match in HUNK_PATTERN.finditer(section.text)]
+    if not starts:
+        return split_lines(section.label, section.text, max_tokens)
+
+    header = section.text[: starts[0]]
+    budget = max(1, max_tokens - estimate_tokens(header))
+    pieces: List[Chunk] = []
+    for number, (start, end) in enumerate(zip(starts, starts[1:] + [len(section.text)]), start=1):
+        piece = make_chunk(f"{section.label} hunk {number}", section.text[start:end])
+        pieces.extend([piece] if piece.tokens <= budget else split_lines(piece.label, piece.text, budget))
+    return [make_chunk(chunk.label, header + chunk.text) for chunk in pack_chunks(pieces, budget, separator="")]
+
+
+def chunk_diff(diff_text: str, max_tokens: int) -> List[Chunk]:
+    """
+    Split a Git patch into chunks that fit a token budget, along file and hunk boundaries.
+
+    Args:
+        diff_text: The patch.
+        max_tokens: The token budget of a chunk.
+
+    Returns:
+        The chunks, in order. Small files share a chunk, and large files are split by hunk.
+    """
+    pieces: List[Chunk] = []
+    for section in split_diff_files(diff_text):
+        if section.tokens <= max_tokens:
+            pieces.append(section)
+        else:
+            pieces.extend(split_hunks(section, max_tokens))
+    return pack_chunks(pieces, max_tokens, separator="")
+
+
+def get_statement_start(node: ast.stmt) -> int:
+    """Return the first line of a statement, including the decorators of a class or function."""
+    decorators: List[ast.expr] = getattr(node, "decorator_list", [])
+    return min([node.lineno] + [decorator.lineno for decorator in decorators])
+
+
+def split_statements(
+    label: str, lines: List[str], body: List[ast.stmt], first: int, last: int, max_tokens: int
+) -> List[Chunk]:
+    """
+    Split a range of source lines into pieces of whole statements.
+
+    Comments and blank lines before a statement belong to it. A class too large on its own is split into its
+    statements, each piece starting with the class header, and any other statement too large on its own is split by
+    lines.
+
+    Args:
+        label: The label of the source.
+        lines: The lines of the source.
+        body: The statements within the range.
+        first: The first line of the range, numbered from one.
+        last: The last line of the range.
+        max_tokens: The token budget of a piece.
+
+    Returns:
+        The pieces, in order.
+    """
+    pieces: List[Chunk] = []
+    starts = [first] + [get_statement_start(node) for node in body[1:]]
+    ends = [start - 1 for start in starts[1:]] + [last]
+
+    for node, start, end in zip(body, starts, ends):
+        piece = make_chunk(f"{label} lines {start}-{end}", "".join(lines[start - 1 : end]))
+        if piece.tokens <= max_tokens:
+            pieces.append(piece)
+        elif isinstance(node, ast.ClassDef):
+            # The class header runs from the first line of the class to the line before its first statement
+            body_start = get_statement_start(node.body[0])
+            header = "".join(lines[start - 1 : body_start - 1])
+            budget = max(1, max_tokens - estimate_tokens(header))
+            members = split_statements(label, lines, node.body, body_start, end, budget)
+            pieces.extend(make_chunk(chunk.label, header + chunk.text) for chunk in pack_chunks(members, budget, ""))
+        else:
+            pieces.extend(split_lines(label, piece.text, max_tokens, start))
+    return pieces
+
+
+def chunk_module(source: str, max_tokens: int, label: str = "module") -> List[Chunk]:
+    """
+    Split the source of a Python module into chunks that fit a token budget, along statement boundaries.
+
+    Args:
+        source: The module source.
+        max_tokens: The token budget of a chunk.
+        label: The label of the module, e.g. its path. Chunks are labelled with their line range within it.
+
+    Returns:
+        The chunks, in order. A module that cannot be parsed is split by lines.
+    """
+    try:
+        tree: Optional[ast.Module] = ast.parse(source)
+    except SyntaxError:
+        tree = None
+    lines = source.splitlines(keepends=True)
+    if tree is None or not tree.body:
+        return pack_chunks(split_lines(label, source, max_tokens), max_tokens, separator="")
+
+    pieces = split_statements(label, lines, tree.body, 1, len(lines), max_tokens)
+    return pack_chunks(pieces, max_tokens, separator="")
@@ -0,0 +1,244 @@
+"""
+Runtime settings for PyGen.
+
+Settings are read once from ``PYGEN_*`` environment variables (including those in a .env file) and may be overridden
+by the global CLI options.
+"""
+
+import os
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import List, Optional
+
+_ENV_LOADED = False
+
+
+def load_env() -> None:
+    """Load environment variables from a .env file, once per process. python-dotenv is imported on first use."""
+    global _ENV_LOADED
+    if not _ENV_LOADED:
+        from dotenv import load_dotenv
+
+        load_dotenv()
+        _ENV_LOADED = True
+
+
+def _env_bool(name: str, default: bool) -> bool:
+    """Read a boolean environment variable, falling back to the default if it is unset."""
+    value = os.getenv(name)
+    if not value:
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+
+def _env_float(name: str, default: float) -> float:
+    """Read a float environment variable, falling back to the default if it is unset or invalid."""
+    value = os.getenv(name)
+    if not value:
+        return default
+    try:
+        return float(value)
+    except ValueError:
+        return default
+
+
+def _env_int(name: str, default: Optional[int]) -> Optional[int]:
+    """Read an integer environment variable, falling back to the default if it is unset or invalid."""
+    value = os.getenv(name)
+    if not value:
+        return default
+    try:
+        return int(value)
+    except ValueError:
+        return default
+
+
+@dataclass
+class Settings:
+    """
+    Runtime settings for PyGen.
+
+    Attributes:
+        workers: Number of worker processes used to scan a project. Defaults to the number of CPU cores.
+        scan_chunk_size: Number of files handed to a scan worker at a time.
+        git_ls_files: Whether to list a project's modules with ``git ls-files`` when it is inside a Git work tree.
+        git_filter: Partial clone filter used to fetch remote repositories, e.g. ``blob:none`` to download file
+            contents only when a diff reads them. An empty filter fetches everything.
+        git_depth: Number of commits of history to fetch from remote repositories with a shallow fetch, which is
+            deepened until the merge base is found. The full history is fetched, with the filter, if unset.
+        diff_tokens: Token budget of the diffs sent to the model. The highest ranked hunks that fit are kept. Zero keeps
+            every hunk.
+        diff_exclude: Further paths to leave out of diffs, in .gitignore syntax, besides lockfiles, generated and
+            vendored files.
+        diff_context_lines: Number of lines of context around each change in a diff.
+        git_cache: Whether to keep the repositories fetched from remotes in a mirror cache, so later runs only fetch
+            new commits.
+        git_cache_dir: Directory of the mirror cache. Defaults to ``pygen/repos`` in the user cache directory.
+        git_cache_max_bytes: Maximum total size of the mirrors, beyond which the least recently used are evicted.
+        git_cache_max_age: Number of seconds after which a mirror that has not been used is evicted. Mirrors are only
+            evicted for size if unset.
+        llm_backend: The service that runs the model: ``bedrock`` for AWS Bedrock, ``openai`` for an OpenAI-compatible
+            server, or ``fake`` for a built-in fake server that replays canned responses.
+        openai_base_url: Base URL of the OpenAI-compatible API, e.g. of a local llama.cpp or vLLM server.
+        openai_model: Name of the model to request from the OpenAI-compatible server.
+        fake_responses: Text file, or directory of text files, of responses replayed by the fake server.
+        fake_latency_ms: Number of milliseconds the fake server waits before the first token of a response.
+        fake_tokens_per_second: Rate at which the fake server sends tokens. Zero sends them as fast as possible.
+        fake_error_rate: Fraction of requests to the fake server that fail with a server error.
+        fake_throttle_rate: Fraction of requests to the fake server that are rejected as throttled.
+        fake_drop_rate: Fraction of streamed responses of the fake server that are cut off part way through.
+        llm_concurrency: Maximum number of concurrent LLM requests made by batch workflows.
+        llm_pool_size: Maximum number of connections kept open to the LLM service. Defaults to the larger of 10 and
+            ``llm_concurrency``.
+        llm_connect_timeout: Number of seconds to wait for a connection to the LLM service.
+        llm_read_timeout: Number of seconds to wait for the LLM service to send data, before a response or between the
+            parts of a streamed response.
+        llm_tcp_keepalive: Whether to send TCP keep-alive probes on connections to the LLM service, so idle
+            connections are not dropped by the network during long responses.
+        llm_retry_mode: The botocore retry mode of the Bedrock client: ``legacy``, ``standard`` or ``adaptive``.
+        llm_max_attempts: Maximum number of attempts the Bedrock client makes for each request, within each of
+            PyGen's own retries.
+        llm_prewarm: Number of connections to the LLM service to open in the background when an LLM command starts,
+            while the project is scanned. Zero disables pre-warming.
+        llm_requests_per_minute: Maximum rate of LLM requests, shared by all requests in the process. Zero disables
+            the limit.
+        llm_tokens_per_minute: Maximum rate of LLM input and output tokens, shared by all requests in the process.
+            Zero disables the limit.
+        cache: Whether to cache LLM responses on disk and replay them for identical requests.
+        cache_dir: Directory of the response cache. Defaults to ``pygen`` in the user cache directory.
+        cache_max_bytes: Maximum total size of the cached responses, beyond which the least recently used are evicted.
+        cache_ttl: Number of seconds after which a cached response expires. Responses never expire if unset.
+        stream_flush_bytes: Number of buffered characters of streamed output that triggers a flush.
+        stream_flush_ms: Number of milliseconds after which buffered streamed output is flushed.
+        prompt_cache: Whether to mark the static instructions of prompts for caching by the model, so repeated
+            requests with the same instructions are faster and cheaper. Only instructions long enough for the model to
+            cache are marked, which in practice are those of ``pygen git pr``.
+        chunk_tokens: Maximum number of tokens in each chunk of a prompt too large for the model's context window,
+            which is split into chunks that are processed separately and then combined.
+        metrics_file: JSON lines file that the latency, token and retry metrics of each command's LLM requests are
+            appended to. Metrics are not exported if unset.
+        metrics_prometheus_file: Prometheus textfile that a summary of the metrics of each command's last run is
+            written to. Metrics are not exported if unset.
+    """
+
+    workers: Optional[int] = None
+    scan_chunk_size: int = 32
+    git_ls_files: bool = True
+    git_filter: str = "blob:none"
+    git_depth: Optional[int] = None
+    diff_tokens: int = 32000
+    diff_exclude: List[str] = field(default_factory=list)
+    diff_context_lines: int = 3
+    git_cache: bool = True
+    git_cache_dir: Optional[Path] = None
+    git_cache_max_bytes: int = 4 * 1024 * 1024 * 1024
+    git_cache_max_age: Optional[int] = 30 * 24 * 60 * 60
+    llm_backend: str = "bedrock"
+    openai_base_url: str = "http://localhost:8080/v1"
+    openai_model: str = "default"
+    fake_responses: Optional[Path] = None
+    fake_latency_ms: float = 0.0
+    fake_tokens_per_second: float = 0.0
+    fake_error_rate: float = 0.0
+    fake_throttle_rate: float = 0.0
+    fake_drop_rate: float = 0.0
+    llm_concurrency: int = 8
+    llm_pool_size: Optional[int] = None
+    llm_connect_timeout: float = 10.0
+    llm_read_timeout: float = 300.0
+    llm_tcp_keepalive: bool = True
+    llm_retry_mode: str = "adaptive"
+    llm_max_attempts: int = 2
+    llm_prewarm: int = 0
+    llm_requests_per_minute: int = 50
+    llm_tokens_per_minute: int = 400000
+    cache: bool = True
+    cache_dir: Optional[Path] = None
+    cache_max_bytes: int = 64 * 1024 * 1024
+    cache_ttl: Optional[int] = None
+    stream_flush_bytes: int = 4096
+    stream_flush_ms: int = 50
+    prompt_cache: bool = True
+    chunk_tokens: int = 24000
+    metrics_file: Optional[Path] = None
+    metrics_prometheus_file: Optional[Path] = None
+
+    @property
+    def llm_pool_connections(self) -> int:
+        """The number of connections kept open to the LLM service."""
+        return self.llm_pool_size or max(10, self.llm_concurrency)
+
+    @classmethod
+    def from_env(cls) -> "Settings":
+        """Create settings from ``PYGEN_*`` environment variables."""
+        load_env()
+        defaults = cls()
+        return cls(
+            workers=_env_int("PYGEN_WORKERS", defaults.workers),
+            scan_chunk_size=_env_int("PYGEN_SCAN_CHUNK_SIZE", defaults.scan_chunk_size) or defaults.scan_chunk_size,
+            git_ls_files=_env_bool("PYGEN_GIT_LS_FILES", defaults.git_ls_files),
+            git_filter=os.getenv("PYGEN_GIT_FILTER", defaults.git_filter).strip(),
+            git_depth=_env_int("PYGEN_GIT_DEPTH", defaults.git_depth) or None,
+            diff_tokens=_env_int("PYGEN_DIFF_TOKENS", defaults.diff_tokens) or 0,
+            diff_exclude=[
+                pattern.strip() for pattern in os.getenv("PYGEN_DIFF_EXCLUDE", "").split(",") if pattern.strip()
+            ],
+            diff_context_lines=_env_int("PYGEN_DIFF_CONTEXT_LINES", defaults.diff_context_lines)
+            or defaults.diff_context_lines,
+            git_cache=_env_bool("PYGEN_GIT_CACHE", defaults.git_cache),
+            git_cache_dir=(
+                Path(os.environ["PYGEN_GIT_CACHE_DIR"]) if os.getenv("PYGEN_GIT_CACHE_DIR") else defaults.git_cache_dir
+            ),
+            git_cache_max_bytes=_env_int("PYGEN_GIT_CACHE_MAX_BYTES", defaults.git_cache_max_bytes)
+            or defaults.git_cache_max_bytes,
+            git_cache_max_age=_env_int("PYGEN_GIT_CACHE_MAX_AGE", defaults.git_cache_max_age) or None,
+            llm_backend=(os.getenv("PYGEN_LLM_BACKEND") or defaults.llm_backend).strip().lower(),
+            openai_base_url=os.getenv("PYGEN_OPENAI_BASE_URL") or defaults.openai_base_url,
+            openai_model=os.getenv("PYGEN_OPENAI_MODEL") or defaults.openai_model,
+            fake_responses=(
+                Path(os.environ["PYGEN_FAKE_RESPONSES"])
+                if os.getenv("PYGEN_FAKE_RESPONSES")
+                else defaults.fake_responses
+            ),
+            fake_latency_ms=_env_float("PYGEN_FAKE_LATENCY_MS", defaults.fake_latency_ms),
+            fake_tokens_per_second=_env_float("PYGEN_FAKE_TOKENS_PER_SECOND", defaults.fake_tokens_per_second),
+            fake_error_rate=_env_float("PYGEN_FAKE_ERROR_RATE", defaults.fake_error_rate),
+            fake_throttle_rate=_env_float("PYGEN_FAKE_THROTTLE_RATE", defaults.fake_throttle_rate),
+            fake_drop_rate=_env_float("PYGEN_FAKE_DROP_RATE", defaults.fake_drop_rate),
+            llm_concurrency=_env_int("PYGEN_LLM_CONCURRENCY", defaults.llm_concurrency) or defaults.llm_concurrency,
+            llm_pool_size=_env_int("PYGEN_LLM_POOL_SIZE", defaults.llm_pool_size),
+            llm_connect_timeout=_env_float("PYGEN_LLM_CONNECT_TIMEOUT", defaults.llm_connect_timeout),
+            llm_read_timeout=_env_float("PYGEN_LLM_READ_TIMEOUT", defaults.llm_read_timeout),
+            llm_tcp_keepalive=_env_bool("PYGEN_LLM_TCP_KEEPALIVE", defaults.llm_tcp_keepalive),
+            llm_retry_mode=(os.getenv("PYGEN_LLM_RETRY_MODE") or defaults.llm_retry_mode).strip().lower(),
+            llm_max_attempts=_env_int("PYGEN_LLM_MAX_ATTEMPTS", defaults.llm_max_attempts) or defaults.llm_max_attempts,
+            llm_prewarm=_env_int("PYGEN_LLM_PREWARM", defaults.llm_prewarm) or 0,
+            llm_requests_per_minute=_env_int("PYGEN_LLM_REQUESTS_PER_MINUTE", defaults.llm_requests_per_minute) or 0,
+            llm_tokens_per_minute=_env_int("PYGEN_LLM_TOKENS_PER_MINUTE", defaults.llm_tokens_per_minute) or 0,
+            cache=_env_bool("PYGEN_CACHE", defaults.cache),
+            cache_dir=Path(os.environ["PYGEN_CACHE_DIR"]) if os.getenv("PYGEN_CACHE_DIR") else defaults.cache_dir,
+            cache_max_bytes=_env_int("PYGEN_CACHE_MAX_BYTES", defaults.cache_max_bytes) or defaults.cache_max_bytes,
+            cache_ttl=_env_int("PYGEN_CACHE_TTL", defaults.cache_ttl),
+            stream_flush_bytes=_env_int("PYGEN_STREAM_FLUSH_BYTES", defaults.stream_flush_bytes)
+            or defaults.stream_flush_bytes,
+            stream_flush_ms=_env_int("PYGEN_STREAM_FLUSH_MS", defaults.stream_flush_ms) or 0,
+            prompt_cache=_env_bool("PYGEN_PROMPT_CACHE", defaults.prompt_cache),
+            chunk_tokens=_env_int("PYGEN_CHUNK_TOKENS", defaults.chunk_tokens) or defaults.chunk_tokens,
+            metrics_file=Path(os.environ["PYGEN_METRICS_FILE"]) if os.getenv("PYGEN_METRICS_FILE") else None,
+            metrics_prometheus_file=(
+                Path(os.environ["PYGEN_METRICS_PROMETHEUS_FILE"])
+                if os.getenv("PYGEN_METRICS_PROMETHEUS_FILE")
+                else None
+            ),
+        )
+
+
+_SETTINGS: Optional[Settings] = None
+
+
+def get_settings() -> Settings:
+    """Get the process-wide settings, reading them from the environment on first use."""
+    global _SETTINGS
+    if _SETTINGS is None:
+        _SETTINGS = Settings.from_env()
+    return _SETTINGS
@@ -0,0 +1,601 @@
+"""
+Patch diffs of Git changes, filtered and ranked to fit a token budget.
+
+The changes between the merge base of two branches and the branch with the changes are listed first from the trees
+alone, which needs no file contents. Lockfiles, generated and vendored files are skipped by path, so their contents are
+never read, and the patches of the remaining files are streamed from ``git diff`` one file at a time. Binary files, and
+files whose first lines mark them as generated, are skipped as they are read.
+
+The hunks of the patches are ranked by how much each says about the change for its size, weighted by the kind of file,
+and the best that fit the token budget are kept in a bounded heap as the patch is streamed, so the memory used does not
+grow with the size of the diff. Every file keeps its header, and the kept hunks are written out in their original order.
+"""
+
+import heapq
+import re
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from pygen.utils.chunking import split_lines
+from pygen.utils.config import get_settings
+from pygen.utils.log import get_logger
+from pygen.utils.tokens import count_tokens
+from pygen.utils.walk import IgnoreSpec
+
+if TYPE_CHECKING:
+    import git
+
+logger = get_logger(__name__)
+
+# Files skipped by path, in .gitignore syntax, with the reason they are skipped
+SKIPPED_FILES: Dict[str, List[str]] = {
+    "lockfile": [
+        "*.lock",
+        "package-lock.json",
+        "npm-shrinkwrap.json",
+        "pnpm-lock.yaml",
+        "go.sum",
+    ],
+    "generated": [
+        "*_pb2.py",
+        "*_pb2.pyi",
+        "*_pb2_grpc.py",
+        "*.pb.go",
+        "*.min.js",
+        "*.min.css",
+        "*.map",
+        "*.snap",
+        "*.generated.*",
+        "__snapshots__/",
+    ],
+    "vendored": [
+        "vendor/",
+        "vendored/",
+        "third_party/",
+        "third-party/",
+        "node_modules/",
+        "site-packages/",
+    ],
+}
+
+# Markers in the first lines of a file that say it was generated by a tool
+GENERATED_PATTERN = re.compile(r"@generated|do not edit|auto-?generated|code generated by", re.IGNORECASE)
+
+# Number of lines at the start of a file searched for a generated marker
+GENERATED_MARKER_LINES = 10
+
+# Header of a hunk, with the first line of its new side
+HUNK_HEADER_PATTERN = re.compile(r"^@@ -\d+(?:,\d+)? \+(\d+)(?:,\d+)? @@")
+
+# Weights of hunks by path, in .gitignore syntax. The first matching pattern applies, and other files weigh 1.
+FILE_WEIGHTS: List[Tuple[str, float]] = [
+    ("test_*.py", 0.6),
+    ("*_test.py", 0.6),
+    ("tests/", 0.6),
+    ("docs/", 0.5),
+    ("*.md", 0.5),
+    ("*.rst", 0.5),
+    ("*.txt", 0.4),
+    ("*.json", 0.3),
+    ("*.yaml", 0.4),
+    ("*.yml", 0.4),
+    ("*.toml", 0.7),
+    ("*.cfg", 0.6),
+    ("*.ini", 0.6),
+    ("*.py", 1.5),
+]
+
+# Factor by which the first hunk of a file is preferred, so the budget covers as many files as possible
+FIRST_HUNK_WEIGHT = 2.0
+
+# Statuses of ``git diff --raw``, by their letter
+STATUSES = {"A": "added", "C": "copied", "D": "removed", "M": "modified", "R": "renamed", "T": "modified"}
+
+# Object name of a missing blob in ``git diff --raw``
+NULL_BLOB = "0" * 40
+
+# Number of tokens reserved for the note of the hunks omitted from a file
+OMITTED_NOTE_TOKENS = 16
+
+# Escapes of the characters Git quotes in the paths of a patch header
+C_ESCAPES = {
+    0x07: "\\a",
+    0x08: "\\b",
+    0x09: "\\t",
+    0x0A: "\\n",
+    0x0B: "\\v",
+    0x0C: "\\f",
+    0x0D: "\\r",
+    0x22: '\\"',
+    0x5C: "\\\\",
+}
+
+# Maximum number of characters of the paths passed to one ``git diff``, well within the limits of a command line
+MAX_PATHSPEC_CHARS = 64 * 1024
+
+
+@dataclass(frozen=True)
+class FileChange:
+    """
+    A file changed between two trees, as listed by ``git diff --raw``.
+
+    Attributes:
+        path: The path of the file after the change, or before it if it was removed.
+        old_path: The path of the file before the change, which differs from ``path`` if it was renamed or copied.
+        status: How the file changed: ``added``, ``modified``, ``removed``, ``renamed`` or ``copied``.
+        old_blob: The object name of the file before the change, or None if it was added.
+        new_blob: The object name of the file after the change, or None if it was removed or is only in the work tree.
+        skipped: Why the patch of the file is left out of the diff, e.g. ``lockfile``, or None if it is included.
+    """
+
+    path: str
+    old_path: str
+    status: str
+    old_blob: Optional[str]
+    new_blob: Optional[str]
+    skipped: Optional[str] = None
+
+    def with_skipped(self, reason: str) -> "FileChange":
+        """Return the change with the patch of the file skipped for a reason."""
+        return FileChange(self.path, self.old_path, self.status, self.old_blob, self.new_blob, reason)
+
+
+@dataclass
+class FileDiff:
+    """
+    The patch of one changed file.
+
+    Attributes:
+        change: The change to the file.
+        header: The lines of the patch before its first hunk, without the ``index`` line.
+        hunks: The hunks of the patch, each starting with its ``@@`` line.
+    """
+
+    change: FileChange
+    header: str = ""
+    hunks: List[str] = field(default_factory=list)
+
+    @property
+    def patch(self) -> str:
+        """The whole patch of the file."""
+        return self.header + "".join(self.hunks)
+
+
+@dataclass(frozen=True)
+class DiffOptions:
+    """
+    Options of the diff of a set of changes.
+
+    Attributes:
+        max_tokens: The token budget of the diff. Hunks that do not fit are left out. Zero disables the budget.
+        exclude: Further paths to skip, in .gitignore syntax.
+        context_lines: The number of lines of context around each change.
+    """
+
+    max_tokens: int = 0
+    exclude: Tuple[str, ...] = ()
+    context_lines: int = 3
+
+    @classmethod
+    def from_settings(cls) -> "DiffOptions":
+        """Create the options from the settings."""
+        settings = get_settings()
+        return cls(settings.diff_tokens, tuple(settings.diff_exclude), settings.diff_context_lines)
+
+
+def get_merge_base(repo: "git.Repo", base: str, head: str) -> str:
+    """
+    Return the merge base of two commits, which the changes of a branch are compared against.
+
+    Raises:
+        ValueError: If the commits have no history in common.
+    """
+    import git
+
+    try:
+        return str(repo.git.merge_base(base, head))
+    except git.exc.GitCommandError:
+        raise ValueError(f"'{base}' and '{head}' have no history in common") from None
+
+
+def get_skip_specs(exclude: Sequence[str] = ()) -> List[Tuple[str, IgnoreSpec]]:
+    """Return the specs of the files skipped by path, with the reason each skips files for."""
+    specs = [(reason, IgnoreSpec.from_lines(patterns)) for reason, patterns in SKIPPED_FILES.items()]
+    if exclude:
+        specs.append(("excluded", IgnoreSpec.from_lines(exclude)))
+    return specs
+
+
+def matches_path(spec: IgnoreSpec, path: str) -> bool:
+    """Whether a spec matches a file or one of the directories it is in."""
+    parts = path.split("/")
+    directories = ("/".join(parts[:depth]) for depth in range(1, len(parts)))
+    return bool(spec.match(path, False)) or any(spec.match(directory, True) for directory in directories)
+
+
+def get_path_skip_reason(specs: List[Tuple[str, IgnoreSpec]], path: str) -> Optional[str]:
+    """Return why a file is skipped by its path, or None if it is not."""
+    return next((reason for reason, spec in specs if matches_path(spec, path)), None)
+
+
+def parse_raw_diff(output: str) -> Iterator[FileChange]:
+    """
+    Parse the output of ``git diff --raw -z`` into the changed files.
+
+    Args:
+        output: The output, with NUL-terminated fields.
+
+    Yields:
+        The changed files, in the order of the diff.
+    """
+    fields = output.split("\0")
+    index = 0
+    while index < len(fields) - 1:
+        _, _, old_blob, new_blob, status = fields[index].lstrip(":").split(" ")
+        letter = status[0]
+        if letter in "RC":
+            old_path, path = fields[index + 1], fields[index + 2]
+            index += 3
+        else:
+            old_path = path = fields[index + 1]
+            index += 2
+        yield FileChange(
+            path=path,
+            old_path=old_path,
+            status=STATUSES.get(letter, "modified"),
+            old_blob=None if old_blob == NULL_BLOB else old_blob,
+            new_blob=None if new_blob == NULL_BLOB else new_blob,
+        )
+
+
+def list_changes(repo: "git.Repo", revisions: Sequence[str], exclude: Sequence[str] = ()) -> List[FileChange]:
+    """
+    List the files changed in a diff from the trees alone, marking those skipped by their path.
+
+    Args:
+        repo: The repository.
+        revisions: The arguments of ``git diff`` that select what is compared, e.g. two commits or ``--cached``.
+        exclude: Further paths to skip, in .gitignore syntax.
+
+    Returns:
+        The changed files, in path order.
+    """
+    output = repo.git.diff(*revisions, "--raw", "-z", "--no-abbrev", "-M", "--no-ext-diff", "--no-color")
+    specs = get_skip_specs(exclude)
+    changes = []
+    for change in parse_raw_diff(output):
+        reason = get_path_skip_reason(specs, change.path)
+        if reason is None and change.old_path != change.path:
+            reason = get_path_skip_reason(specs, change.old_path)
+        changes.append(change if reason is None else change.with_skipped(reason))
+    return changes
+
+
+def get_content_skip_reason(file_diff: FileDiff) -> Optional[str]:
+    """Return why a file is skipped by the content of its patch, or None if it is not."""
+    # Sections of a patch without hunks are kept after the hunks of the file's previous section
+    sections = [file_diff.header, *(hunk for hunk in file_diff.hunks if not hunk.startswith("@@ "))]
+    if any("\nBinary files " in section or "\nGIT binary patch" in section for section in sections):
+        return "binary"
+    if file_diff.hunks:
+        match = HUNK_HEADER_PATTERN.match(file_diff.hunks[0])
+        if match and match.group(1) in ("0", "1"):
+            lines = file_diff.hunks[0].splitlines()[1 : GENERATED_MARKER_LINES + 1]
+            if any(line.startswith("+") and GENERATED_PATTERN.search(line) for line in lines):
+                return "generated"
+    return None
+
+
+def batch_changes(changes: Sequence[FileChange], max_chars: int = MAX_PATHSPEC_CHARS) -> Iterator[List[FileChange]]:
+    """Split changes into consecutive batches whose paths fit on one command line."""
+    batch: List[FileChange] = []
+    chars = 0
+    for change in changes:
+        length = len(change.path) + len(change.old_path) + 2 * len(":(literal)")
+        if batch and chars + length > max_chars:
+            yield batch
+            batch, chars = [], 0
+        batch.append(change)
+        chars += length
+    if batch:
+        yield batch
+
+
+def quote_path(path: str) -> str:
+    """Quote a path as Git writes it in a patch header, in C style if it has characters outside printable ASCII."""
+    data = path.encode("utf-8", errors="surrogateescape")
+    if all(0x20 <= byte < 0x7F and byte not in C_ESCAPES for byte in data):
+        return path
+    escaped = (C_ESCAPES.get(byte) or (chr(byte) if 0x20 <= byte < 0x7F else f"\\{byte:03o}") for byte in data)
+    return '"' + "".join(escaped) + '"'
+
+
+def get_patch_header(change: FileChange) -> str:
+    """Return the ``diff --git`` line that starts the patch of a change, without its line ending."""
+    return f"diff --git {quote_path('a/' + change.old_path)} {quote_path('b/' + change.path)}"
+
+
+class PatchBuilder:
+    """
+    Collects the lines of ``git diff`` into the patch of one file.
+
+    The patch of a file whose type changed, e.g. from a regular file to a symlink, is written by Git as two sections,
+    one removing the old file and one adding the new. The header of the second section is kept with its first hunk.
+    """
+
+    def __init__(self, change: FileChange, line: str) -> None:
+        self.file_diff = FileDiff(change, line)
+        self.hunk: List[str] = []
+        self.section: List[str] = []
+
+    def start_section(self, line: str) -> None:
+        """Start another section of the patch of the same file."""
+        self.end_hunk()
+        self.section = [line]
+
+    def add_line(self, line: str) -> None:
+        """Add a line of the patch."""
+        if line.startswith("@@ "):
+            self.end_hunk()
+            self.hunk = [*self.section, line]
+            self.section = []
+        elif self.section:
+            if not line.startswith("index "):
+                self.section.append(line)
+        elif self.hunk:
+            self.hunk.append(line)
+        elif not line.startswith("index "):
+            self.file_diff.header += line
+
+    def end_hunk(self) -> None:
+        """Add the hunk being read, if any, to the patch."""
+        if self.hunk:
+            self.file_diff.hunks.append("".join(self.hunk))
+            self.hunk = []
+
+    def finish(self) -> FileDiff:
+        """Return the patch, with no hunks if the file is found to be binary or generated."""
+        self.end_hunk()
+        if self.section:
+            # A section without hunks, e.g. adding a binary file
+            self.file_diff.hunks.append("".join(self.section))
+            self.section = []
+        reason = get_content_skip_reason(self.file_diff)
+        if reason is not None:
+            self.file_diff.change = self.file_diff.change.with_skipped(reason)
+            self.file_diff.hunks = []
+        return self.file_diff
+
+
+def parse_patch(lines: Iterable[bytes], changes: Sequence[FileChange]) -> Iterator[FileDiff]:
+    """
+    Parse the output of ``git diff`` into the patches of the changed files.
+
+    Each patch is matched to its change by the paths in its ``diff --git`` line, so files Git writes more than one
+    section for, or none at all, do not shift the patches of the files after them.
+
+    Args:
+        lines: The lines of the output.
+        changes: The changed files the patches are of.
+
+    Yields:
+        The patch of each file, in the order of the output. Files found to be binary or generated from their patch have
+        no hunks and are marked as skipped.
+    """
+    by_header = {get_patch_header(change): change for change in changes}
+    builder: Optional[PatchBuilder] = None
+    for raw_line in lines:
+        line = raw_line.decode("utf-8", errors="replace")
+        if not line.startswith("diff --git "):
+            if builder is not None:
+                builder.add_line(line)
+            continue
+        change = by_header.get(line.rstrip("\r\n"))
+        if builder is not None and change is builder.file_diff.change:
+            builder.start_section(line)
+            continue
+        if builder is not None:
+            yield builder.finish()
+        if change is None:
+            logger.warning(f"Skipping a patch that matches no changed file: {line.strip()}")
+        builder = PatchBuilder(change, line) if change is not None else None
+    if builder is not None:
+        yield builder.finish()
+
+
+def iter_file_diffs(
+    repo: "git.Repo", revisions: Sequence[str], changes: Sequence[FileChange], context_lines: int = 3
+) -> Iterator[FileDiff]:
+    """
+    Stream the patches of the changed files that are not skipped, one file at a time.
+
+    Only the paths of those files are diffed, in batches that fit on a command line. Paths are always quoted in the
+    patch headers as ``parse_patch`` expects, whatever the repository's ``core.quotePath`` setting.
+
+    Args:
+        repo: The repository.
+        revisions: The arguments of ``git diff`` that select what is compared, as given to ``list_changes``.
+        changes: The changed files, as returned by ``list_changes``.
+        context_lines: The number of lines of context around each change.
+
+    Yields:
+        The patch of each file, in the order Git writes them. Files found to be binary or generated from their patch
+        have no hunks and are marked as skipped.
+
+    Raises:
+        git.exc.GitCommandError: If ``git diff`` fails.
+    """
+    options = [f"--unified={context_lines}", "-M", "--no-ext-diff", "--no-textconv", "--no-color"]
+    for batch in batch_changes([change for change in changes if change.skipped is None]):
+        paths = dict.fromkeys(path for change in batch for path in (change.old_path, change.path))
+        pathspecs = [f":(literal){path}" for path in paths]
+        process = repo.git(c="core.quotePath=true").diff(*revisions, *options, "--", *pathspecs, as_process=True)
+        yield from parse_patch(process.stdout, batch)
+        process.wait()
+
+
+def score_hunk(weight: float, hunk: str, tokens: int) -> float:
+    """Score a hunk by its number of changed lines per token, weighted by its file."""
+    changed = sum(1 for line in hunk.splitlines()[1:] if line[:1] in ("+", "-"))
+    return weight * max(1, changed) / max(1, tokens)
+
+
+def get_file_weight(weights: List[Tuple[IgnoreSpec, float]], path: str) -> float:
+    """Return the weight of the hunks of a file by its path."""
+    return next((weight for spec, weight in weights if matches_path(spec, path)), 1.0)
+
+
+def truncate_hunk(hunk: str, max_tokens: int) -> Tuple[str, int]:
+    """Cut a hunk too large for the budget on its own down to its first lines that fit."""
+    text = split_lines("hunk", hunk, max(1, max_tokens - 8))[0].text
+    text = text if text.endswith("\n") else text + "\n"
+    text += "[... rest of hunk omitted ...]\n"
+    return text, count_tokens(text)
+
+
+class DiffBudget:
+    """
+    The file headers and hunks of a diff kept within a token budget.
+
+    Hunks are held in a min-heap of their scores, and the lowest scored are evicted whenever the kept hunks and the
+    headers exceed the budget.
+    """
+
+    def __init__(self, max_tokens: int) -> None:
+        self.max_tokens = max_tokens
+        self.headers: List[str] = []
+        self.hunk_counts: List[int] = []
+        self.heap: List[Tuple[float, int, int, int]] = []
+        self.kept: Dict[Tuple[int, int], Tuple[str, int]] = {}
+        self.header_tokens = 0
+        self.hunk_tokens = 0
+        # Order of the hunks as they were added, breaking ties between equal scores
+        self.sequence = 0
+
+    def add_header(self, file_diff: FileDiff) -> bool:
+        """
+        Admit the header of a file, whose hunks are then added with ``add_hunk``.
+
+        Headers may use at most half the budget, so hunks are not crowded out by a long list of files. The budget of a
+        header includes the note of any hunks omitted from its file.
+
+        Returns:
+            Whether the header fits the budget.
+        """
+        tokens = count_tokens(file_diff.header) + OMITTED_NOTE_TOKENS
+        if self.max_tokens and self.header_tokens + tokens > self.max_tokens // 2:
+            return False
+        self.headers.append(file_diff.header)
+        self.hunk_counts.append(len(file_diff.hunks))
+        self.header_tokens += tokens
+        self.evict()
+        return True
+
+    def add_hunk(self, hunk_index: int, hunk: str, weight: float) -> None:
+        """Add a hunk of the file whose header was admitted last, evicting the lowest scored hunks over the budget."""
+        tokens = count_tokens(hunk)
+        if self.max_tokens and tokens > self.max_tokens // 2:
+            hunk, tokens = truncate_hunk(hunk, self.max_tokens // 2)
+        score = score_hunk(weight, hunk, tokens) * (FIRST_HUNK_WEIGHT if hunk_index == 0 else 1.0)
+        file_index = len(self.headers) - 1
+        self.kept[(file_index, hunk_index)] = (hunk, tokens)
+        self.hunk_tokens += tokens
+        heapq.heappush(self.heap, (score, self.sequence, file_index, hunk_index))
+        self.sequence += 1
+        self.evict()
+
+    def evict(self) -> None:
+        """Evict the lowest scored hunks until the diff fits the budget."""
+        while self.heap and self.max_tokens and self.header_tokens + self.hunk_tokens > self.max_tokens:
+            _, _, file_index, hunk_index = heapq.heappop(self.heap)
+            self.hunk_tokens -= self.kept.pop((file_index, hunk_index))[1]
+
+    def write(self) -> str:
+        """Write the kept headers and hunks in their original order, noting the hunks omitted from each file."""
+        parts: List[str] = []
+        for file_index, header in enumerate(self.headers):
+            count = self.hunk_counts[file_index]
+            selected = [self.kept[(file_index, index)][0] for index in range(count) if (file_index, index) in self.kept]
+            parts.append(header)
+            parts.extend(selected)
+            if len(selected) < count:
+                parts.append(f"[{count - len(selected)} of {count} hunks omitted to fit the token budget]\n")
+        return "".join(parts)
+
+
+def budget_diff(file_diffs: Iterable[FileDiff], skipped: Sequence[FileChange] = (), max_tokens: int = 0) -> str:
+    """
+    Write the patches of the changed files as one diff that fits a token budget, keeping the highest ranked hunks.
+
+    Hunks are scored by ``score_hunk`` and kept by a ``DiffBudget`` as the patches are read. Files left out of the
+    diff, including those skipped by ``list_changes``, are listed at its end with the reason.
+
+    Args:
+        file_diffs: The patches of the files, in order.
+        skipped: The changed files that were skipped before their patches were read.
+        max_tokens: The token budget of the diff. Zero keeps every hunk.
+
+    Returns:
+        The diff, or an empty string if nothing changed.
+    """
+    weights = [(IgnoreSpec.from_lines([pattern]), weight) for pattern, weight in FILE_WEIGHTS]
+    budget = DiffBudget(max_tokens)
+    not_shown: List[FileChange] = list(skipped)
+    for file_diff in file_diffs:
+        if file_diff.change.skipped is not None:
+            not_shown.append(file_diff.change)
+        elif not budget.add_header(file_diff):
+            not_shown.append(file_diff.change.with_skipped("over the token budget"))
+        else:
+            weight = get_file_weight(weights, file_diff.change.path)
+            for hunk_index, hunk in enumerate(file_diff.hunks):
+                budget.add_hunk(hunk_index, hunk, weight)
+
+    parts = [budget.write()]
+    if not_shown:
+        parts.append("\nChanged files not shown in the diff:\n")
+        parts.extend(f"- {change.path} ({change.status}, {change.skipped})\n" for change in not_shown)
+    total = sum(budget.hunk_counts)
+    if len(budget.kept) < total:
+        logger.info(f"Kept {len(budget.kept)} of {total} hunks within the budget of {max_tokens} tokens")
+    return "".join(parts)
+
+
+def get_diff(repo: "git.Repo", revisions: Sequence[str], options: Optional[DiffOptions] = None) -> str:
+    """
+    Get the filtered and budgeted patch diff selected by ``git diff`` arguments.
+
+    Args:
+        repo: The repository.
+        revisions: The arguments of ``git diff`` that select what is compared, e.g. two commits or ``--cached``.
+        options: The options of the diff. Defaults to the settings.
+
+    Returns:
+        The diff, or an empty string if nothing changed.
+    """
+    options = options or DiffOptions.from_settings()
+    changes = list_changes(repo, revisions, options.exclude)
+    skipped = [change for change in changes if change.skipped is not None]
+    if skipped:
+        logger.info(f"Skipping {len(skipped)} of {len(changes)} changed files: lockfiles, generated or vendored files")
+    file_diffs = iter_file_diffs(repo, revisions, changes, options.context_lines)
+    return budget_diff(file_diffs, skipped, options.max_tokens)
+
+
+def get_branch_diff(repo: "git.Repo", base: str, head: str, options: Optional[DiffOptions] = None) -> str:
+    """
+    Get the diff of the changes made on a branch since it diverged from the branch it merges into.
+
+    Args:
+        repo: The repository.
+        base: The commit of the branch to merge into.
+        head: The commit of the branch with the changes.
+        options: The options of the diff. Defaults to the settings.
+
+    Returns:
+        The diff, or an empty string if the branch has no changes.
+
+    Raises:
+        ValueError: If the branches have no history in common.
+    """
+    return get_diff(repo, [get_merge_base(repo, base, head), head], options)
@@ -0,0 +1,85 @@
+"""
+Advisory file locks shared between processes.
+
+Locks are taken with ``fcntl.flock`` on POSIX systems, and with ``msvcrt.locking`` on Windows, where every lock is
+exclusive. The lock file itself is never deleted, as a process could otherwise lock a file that another process has
+already replaced.
+"""
+
+import os
+from pathlib import Path
+from types import TracebackType
+from typing import Optional, Type
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows
+    fcntl = None  # type: ignore[assignment]
+    import msvcrt
+
+
+class FileLock:
+    """
+    An advisory lock on a file, held by at most one process exclusively or by any number of processes shared.
+
+    Used as a context manager, the lock is acquired exclusively and released on exit.
+    """
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self.locked = False
+        self._fd: Optional[int] = None
+
+    def acquire(self, shared: bool = False, blocking: bool = True) -> bool:
+        """
+        Acquire the lock, or change a held lock between shared and exclusive.
+
+        Args:
+            shared: Whether other processes may hold the lock shared at the same time.
+            blocking: Whether to wait for the lock if another process holds it.
+
+        Returns:
+            Whether the lock was acquired. Always True when blocking. If it was not, any lock held before is released.
+        """
+        if self._fd is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            if fcntl is not None:
+                operation = fcntl.LOCK_SH if shared else fcntl.LOCK_EX
+                fcntl.flock(self._fd, operation if blocking else operation | fcntl.LOCK_NB)
+            elif not self.locked:
+                msvcrt.locking(self._fd, msvcrt.LK_LOCK if blocking else msvcrt.LK_NBLCK, 1)
+        except OSError:
+            if blocking:
+                raise
+            self.release()
+            return False
+        self.locked = True
+        return True
+
+    def release(self) -> None:
+        """Release the lock if it is held."""
+        if self._fd is None:
+            return
+        try:
+            if fcntl is not None:
+                fcntl.flock(self._fd, fcntl.LOCK_UN)
+            elif self.locked:
+                msvcrt.locking(self._fd, msvcrt.LK_UNLCK, 1)
+        finally:
+            os.close(self._fd)
+            self._fd = None
+            self.locked = False
+
+    def __enter__(self) -> "FileLock":
+        self.acquire()
+        return self
+
+    def __exit__(
+        self,
+        exc_type: Optional[Type[BaseException]],
+        exc_value: Optional[BaseException],
+        traceback: Optional[TracebackType],
+    ) -> None:
+        self.release()
@@ -0,0 +1,410 @@
+"""
+Persistent, incremental symbol index for project scanning.
+
+The index records the modules, classes and functions of a project together with their line spans, and an estimate of
+the number of LLM tokens in each module once it has been used in a prompt. It is stored as JSON under
+``<project_root>/.pygen/`` and keyed by each file's mtime, size and content hash, so that only files which have changed
+since the last run are re-parsed.
+"""
+
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple, cast
+
+from pygen.utils.config import get_settings
+from pygen.utils.log import get_logger
+from pygen.utils.lookup import SymbolLookup
+from pygen.utils.parsing import ByteSpan, parse_module
+from pygen.utils.symbols import Symbol, SymbolTable
+from pygen.utils.tokens import count_tokens
+
+logger = get_logger(__name__)
+
+INDEX_DIR = ".pygen"
+INDEX_FILE = "index.json"
+INDEX_VERSION = 5
+
+# A symbol entry is stored as
+# [name, qualname, kind, start_lineno, lineno, end_lineno, col_offset, decorators, span, docstring_span]
+SymbolEntry = List[Any]
+
+
+def hash_bytes(data: bytes) -> str:
+    """Return the SHA-256 hex digest of the given bytes."""
+    return hashlib.sha256(data).hexdigest()
+
+
+def parse_symbols(source: bytes, file_path: Path) -> Tuple[List[SymbolEntry], Optional[ByteSpan]]:
+    """
+    Parse the classes and functions of a Python source file in a single pass.
+
+    The parsed module is kept in the parsed module cache so that later extraction in the same process does not parse
+    the file again.
+
+    Args:
+        source: The raw source of the file.
+        file_path: The path of the file, used for error reporting.
+
+    Returns:
+        The symbol entries of the file and the byte range of its module docstring.
+    """
+    try:
+        symbols = parse_module(file_path, source).symbols
+    except (SyntaxError, ValueError) as e:
+        logger.warning(f"Error parsing {file_path}: {e}")
+        return [], None
+
+    entries = [
+        [
+            s.name,
+            s.qualname,
+            s.kind,
+            s.start_lineno,
+            s.lineno,
+            s.end_lineno,
+            s.col_offset,
+            list(s.decorators),
+            list(s.span),
+            list(s.docstring_span) if s.docstring_span else None,
+        ]
+        for s in symbols.classes + symbols.functions
+    ]
+    return entries, symbols.docstring_span
+
+
+def scan_file(job: Tuple[Path, Optional[str]]) -> Optional[Dict[str, Any]]:
+    """
+    Stat, hash and parse a module file into an index entry.
+
+    Args:
+        job: The path of the file and the content hash it was last indexed with, if any.
+
+    Returns:
+        The index entry, with ``symbols`` set to None if the content hash is unchanged, or None if the file could not be
+        read.
+    """
+    file_path, known_digest = job
+    try:
+        stat = file_path.stat()
+        source = file_path.read_bytes()
+    except OSError as e:
+        logger.warning(f"Could not read {file_path}: {e}")
+        return None
+
+    digest = hash_bytes(source)
+    symbols, docstring_span = parse_symbols(source, file_path) if digest != known_digest else (None, None)
+    return {
+        "mtime_ns": stat.st_mtime_ns,
+        "size": stat.st_size,
+        "sha256": digest,
+        "symbols": symbols,
+        "docstring": docstring_span,
+        "tokens": None,
+    }
+
+
+def scan_files(
+    jobs: List[Tuple[Path, Optional[str]]], workers: Optional[int] = None, chunk_size: Optional[int] = None
+) -> Iterator[Tuple[Path, Optional[Dict[str, Any]]]]:
+    """
+    Scan module files into index entries, in parallel across a process pool when worthwhile.
+
+    Jobs are distributed to the pool in chunks to amortise inter-process overhead. Small scans, or scans limited to a
+    single worker, run in the current process so that parsed modules land in the parsed module cache.
+
+    Args:
+        jobs: The files to scan and the content hashes they were last indexed with.
+        workers: Number of worker processes. Defaults to the configured worker count, or the number of CPU cores.
+        chunk_size: Number of files handed to a worker at a time. Defaults to the configured chunk size.
+
+    Yields:
+        Each file path with its scanned index entry, in the order of the jobs.
+    """
+    settings = get_settings()
+    chunk_size = chunk_size or settings.scan_chunk_size
+    workers = workers or settings.workers or os.cpu_count() or 1
+    workers = min(workers, -(-len(jobs) // chunk_size))
+
+    if workers > 1:
+        import multiprocessing
+        from concurrent.futures import ProcessPoolExecutor
+        from concurrent.futures.process import BrokenProcessPool
+
+        # The LLM client may be pre-warming in a background thread, and a process forked while other threads hold locks
+        # can deadlock, so workers are forked from a clean fork server, or spawned where there is none
+        start_method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+        mp_context = multiprocessing.get_context(start_method)
+        try:
+            with ProcessPoolExecutor(max_workers=workers, mp_context=mp_context) as executor:
+                yield from zip((path for path, _ in jobs), executor.map(scan_file, jobs, chunksize=chunk_size))
+            return
+        except (OSError, BrokenProcessPool) as e:
+            logger.debug(f"Parallel scan unavailable, scanning serially: {e}")
+
+    for job in jobs:
+        yield job[0], scan_file(job)
+
+
+def entry_to_symbol(entry: SymbolEntry) -> Symbol:
+    """Convert a stored symbol entry into a symbol record."""
+    name, qualname, kind, start_lineno, _, end_lineno, _, _, span, docstring_span = entry
+    return Symbol(
+        -1,
+        name,
+        qualname,
+        kind,
+        start_lineno,
+        end_lineno,
+        (span[0], span[1]),
+        (docstring_span[0], docstring_span[1]) if docstring_span else None,
+    )
+
+
+class SymbolIndex:
+    """
+    On-disk index of the modules, classes and functions of a project.
+
+    Entries are keyed by the path of each module relative to the project root. Each entry records the mtime, size and
+    SHA-256 hash of the file at the time it was parsed, along with the symbols that were found in it and, once counted,
+    its number of LLM tokens.
+    """
+
+    def __init__(self, project_root: Path) -> None:
+        self.project_root = project_root
+        self.files: Dict[str, Dict[str, Any]] = {}
+        self.dirty = False
+        self._table: Optional[SymbolTable] = None
+        self._module_lookup: Optional[SymbolLookup[Path]] = None
+        self._class_lookup: Optional[SymbolLookup[Symbol]] = None
+        self._function_lookup: Optional[SymbolLookup[Symbol]] = None
+
+    @property
+    def path(self) -> Path:
+        """The path of the index file."""
+        return self.project_root / INDEX_DIR / INDEX_FILE
+
+    def load(self) -> None:
+        """Load the index from disk, discarding it if it is missing, unreadable or from another version."""
+        try:
+            with self.path.open("r", encoding="utf-8") as file:
+                data = json.load(file)
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError) as e:
+            logger.debug(f"Discarding unreadable symbol index {self.path}: {e}")
+            return
+
+        if data.get("version") != INDEX_VERSION:
+            logger.debug(f"Discarding symbol index {self.path} with version {data.get('version')}")
+            return
+
+        self.files = data.get("files", {})
+
+    def save(self) -> None:
+        """Atomically write the index to disk if it has changed since it was loaded."""
+        if not self.dirty:
+            return
+
+        index_dir = self.path.parent
+        try:
+            index_dir.mkdir(exist_ok=True)
+            gitignore = index_dir / ".gitignore"
+            if not gitignore.exists():
+                gitignore.write_text("*\n")
+
+            # json.dumps encodes in C in one go, where json.dump streams through the much slower pure Python encoder
+            data = json.dumps({"version": INDEX_VERSION, "files": self.files}, separators=(",", ":"))
+            tmp_path = self.path.with_suffix(f".{os.getpid()}.tmp")
+            tmp_path.write_text(data, encoding="utf-8")
+            os.replace(tmp_path, self.path)
+            self.dirty = False
+        except OSError as e:
+            logger.debug(f"Could not write symbol index {self.path}: {e}")
+
+    def refresh(self, file_paths: List[Path], workers: Optional[int] = None, chunk_size: Optional[int] = None) -> None:
+        """
+        Bring the index up to date with the given module files.
+
+        Files whose mtime and size are unchanged are skipped without being read. The remaining files are scanned,
+        across a process pool when there are enough of them. Files whose content hash is unchanged only have their stat
+        information updated, all other files are re-parsed, and entries for files that no longer exist are dropped.
+
+        Args:
+            file_paths: The module files currently in the project.
+            workers: Number of scan worker processes. Defaults to the configured worker count.
+            chunk_size: Number of files handed to a worker at a time. Defaults to the configured chunk size.
+        """
+        seen = set()
+        jobs: List[Tuple[Path, Optional[str]]] = []
+
+        for file_path in file_paths:
+            key = self.key(file_path)
+            seen.add(key)
+
+            try:
+                stat = file_path.stat()
+            except OSError:
+                continue
+
+            entry = self.files.get(key)
+            if entry and entry["mtime_ns"] == stat.st_mtime_ns and entry["size"] == stat.st_size:
+                continue
+
+            jobs.append((file_path, entry["sha256"] if entry else None))
+
+        parsed = 0
+        for file_path, scanned in scan_files(jobs, workers, chunk_size):
+            if scanned is None:
+                continue
+            key = self.key(file_path)
+            if scanned["symbols"] is None:
+                scanned["symbols"] = self.files[key]["symbols"]
+                scanned["docstring"] = self.files[key]["docstring"]
+                scanned["tokens"] = self.files[key]["tokens"]
+            else:
+                parsed += 1
+            self.files[key] = scanned
+            self.dirty = True
+
+        for key in set(self.files) - seen:
+            del self.files[key]
+            self.dirty = True
+
+        self._table = None
+        self._module_lookup = self._class_lookup = self._function_lookup = None
+
+        logger.debug(f"Symbol index refreshed: {len(self.files)} modules, {parsed} parsed")
+
+    def key(self, file_path: Path) -> str:
+        """Return the index key of a module file, its POSIX path relative to the project root."""
+        try:
+            return file_path.relative_to(self.project_root).as_posix()
+        except ValueError:
+            return file_path.as_posix()
+
+    def module_path(self, key: str) -> Path:
+        """Return the path of a module from its index key."""
+        return self.project_root / key
+
+    @staticmethod
+    def module_name(key: str) -> str:
+        """Return the dotted name of a module from its index key, e.g. ``pkg.mod`` for ``pkg/mod.py``."""
+        parts = key[: -len(".py")].split("/") if key.endswith(".py") else key.split("/")
+        if parts[-1] == "__init__":
+            parts.pop()
+        return ".".join(parts)
+
+    @property
+    def modules(self) -> List[Path]:
+        """All module paths in the index, in sorted order."""
+        return list(self.table.paths)
+
+    @property
+    def table(self) -> SymbolTable:
+        """The symbol records of all modules, built on first use after a refresh."""
+        if self._table is None:
+            self._table = SymbolTable.build(
+                (self.module_path(key), self.module_name(key), [entry_to_symbol(e) for e in entry["symbols"]])
+                for key, entry in self.files.items()
+            )
+        return self._table
+
+    def symbols_in(self, file_path: Path) -> List[Symbol]:
+        """Return the classes and functions of a module."""
+        return self.table.symbols_in(self.module_path(self.key(file_path)))
+
+    def current_entry(self, file_path: Path) -> Optional[Dict[str, Any]]:
+        """Return the entry of a module if the index holds one that matches the file on disk, otherwise None."""
+        entry = self.files.get(self.key(file_path))
+        if entry is None:
+            return None
+        try:
+            stat = file_path.stat()
+        except OSError:
+            return None
+        if entry["mtime_ns"] != stat.st_mtime_ns or entry["size"] != stat.st_size:
+            return None
+        return entry
+
+    def tokens_in(self, file_path: Path) -> Optional[int]:
+        """
+        Return the estimated number of LLM tokens in a module, if the index holds a current entry for it.
+
+        Modules are counted the first time they are asked for rather than when they are scanned, which would double the
+        time of a cold scan. The count is saved in the entry next to the content hash, so it is only made again once the
+        file changes.
+        """
+        entry = self.current_entry(file_path)
+        if entry is None:
+            return None
+        if entry["tokens"] is None:
+            try:
+                source = file_path.read_bytes()
+            except OSError:
+                return None
+            if hash_bytes(source) != entry["sha256"]:
+                return None
+            entry["tokens"] = count_tokens(source.decode("utf-8", errors="replace"))
+            self.dirty = True
+            self.save()
+        return cast(int, entry["tokens"])
+
+    def classes_in(self, file_path: Path) -> List[Symbol]:
+        """Return the classes of a module."""
+        return [s for s in self.symbols_in(file_path) if s.is_class]
+
+    def functions_in(self, file_path: Path) -> List[Symbol]:
+        """Return the functions, methods and nested functions of a module."""
+        return [s for s in self.symbols_in(file_path) if not s.is_class]
+
+    @property
+    def classes(self) -> List[Symbol]:
+        """All classes in the index, ordered by module path."""
+        return self.table.classes()
+
+    @property
+    def functions(self) -> List[Symbol]:
+        """All functions in the index, ordered by module path."""
+        return self.table.functions()
+
+    @property
+    def module_lookup(self) -> SymbolLookup[Path]:
+        """Lookup of module paths by file name."""
+        if self._module_lookup is None:
+            self._module_lookup = SymbolLookup((path.name, path) for path in self.table.paths)
+        return self._module_lookup
+
+    @property
+    def class_lookup(self) -> SymbolLookup[Symbol]:
+        """Lookup of classes by name."""
+        if self._class_lookup is None:
+            self._class_lookup = SymbolLookup((s.name, s) for s in self.classes)
+        return self._class_lookup
+
+    @property
+    def function_lookup(self) -> SymbolLookup[Symbol]:
+        """Lookup of functions by name."""
+        if self._function_lookup is None:
+            self._function_lookup = SymbolLookup((s.name, s) for s in self.functions)
+        return self._function_lookup
+
+
+def load_symbol_index(project_root: Path, file_paths: List[Path], workers: Optional[int] = None) -> SymbolIndex:
+    """
+    Load the symbol index of a project from disk and bring it up to date.
+
+    Args:
+        project_root: The root directory of the project.
+        file_paths: The module files currently in the project.
+        workers: Number of scan worker processes. Defaults to the configured worker count.
+
+    Returns:
+        The refreshed symbol index.
+    """
+    index = SymbolIndex(project_root)
+    index.load()
+    index.refresh(file_paths, workers)
+    index.save()
+    return index
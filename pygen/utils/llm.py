@@ -1,24 +1,205 @@
+import threading
+from concurrent.futures import Future
+from typing import TYPE_CHECKING, List, Optional, cast
+
 import typer
-from rich.console import Console
-from rich.progress import Progress, SpinnerColumn, TextColumn
+from rich import print  # noqa: A004
+
+from pygen.utils.log import get_logger
+from pygen.utils.rich import error_panel, prompt_panel
+
+if TYPE_CHECKING:
+    from pygen.llm.client import LLMClient
+    from pygen.llm.mapreduce import MapReduceJob
+    from pygen.prompts.prompt import PromptLike
+
+logger = get_logger(__name__)
+
+
+def get_llm_client(ctx: typer.Context) -> "LLMClient":
+    """
+    Get the LLM client of the CLI invocation, creating it on first use.
+
+    The client, and with it boto3, is only imported and constructed by commands that actually call the LLM, so help
+    output and selection flows start quickly. The metrics of the client's requests are exported when the CLI
+    invocation ends.
+    """
+    llm_client = cast(Optional["LLMClient"], ctx.meta.get("llm_client"))
+    if llm_client is not None:
+        return llm_client
+
+    # Take the client created in the background by pre-warming, if it was created successfully
+    future: Optional["Future[LLMClient]"] = ctx.meta.pop("llm_client_future", None)
+    if future is not None and future.exception() is None:
+        llm_client = future.result()
+    else:
+        try:
+            from pygen.llm.client import LLMClient
+
+            llm_client = LLMClient()
+        except EnvironmentError as e:
+            logger.error(e)
+            print(error_panel(str(e)))
+            raise typer.Exit()
+        except Exception as e:
+            logger.error(e)
+            print(error_panel(f"Could not Initialise the LLM client: {e}"))
+            raise typer.Exit()
+
+    from pygen.llm.metrics import export_metrics
+
+    ctx.meta["llm_client"] = llm_client
+    ctx.find_root().call_on_close(export_metrics)
+    return llm_client
+
+
+def prewarm_llm_client(ctx: typer.Context, connections: int, cache_id: Optional[str] = None) -> None:
+    """
+    Create the LLM client and open connections to the LLM service in the background.
+
+    Commands scan the project before their first request, so the client's imports, credentials and the TCP and TLS
+    handshakes are done while the scan runs. ``get_llm_client`` waits for the client to be created, but not for the
+    connections; requests made before they are open simply open their own.
+
+    Args:
+        ctx: The context of the CLI invocation.
+        connections: The number of connections to open.
+        cache_id: Identifies the prompt the command will send in the response cache, as passed to ``prompt_llm``. If
+            its response is cached, no connections are opened.
+    """
+    future: "Future[LLMClient]" = Future()
+    ctx.meta["llm_client_future"] = future
+    command = get_command_name(ctx)
 
-from pygen.llm.client import LLMClient
-from pygen.utils.rich import prompt_panel
+    def prewarm() -> None:
+        try:
+            from pygen.llm.client import LLMClient
 
+            llm_client = LLMClient()
+        except Exception as e:
+            # Reported by get_llm_client, which creates the client again if a command needs it
+            logger.debug(f"Could not pre-warm the LLM client: {e}")
+            future.set_exception(e)
+            return
+        future.set_result(llm_client)
+        if cache_id is not None and is_response_cached(llm_client, command, cache_id):
+            logger.debug("The response is cached, not opening connections to the LLM service")
+            return
+        try:
+            llm_client.prewarm(connections)
+        except Exception as e:
+            logger.debug(f"Could not pre-warm connections to the LLM service: {e}")
 
-def prompt_llm(ctx: typer.Context, prompt: str) -> None:
-    llm_client: LLMClient = ctx.meta["llm_client"]
+    threading.Thread(target=prewarm, name="pygen-prewarm", daemon=True).start()
+
+
+def is_response_cached(llm_client: "LLMClient", command: str, cache_id: str) -> bool:
+    """Return whether the response to a prompt of a command, identified by its cache identifier, is cached."""
+    from pygen.llm.budget import get_output_tokens
+    from pygen.llm.cache import get_response_cache
+
+    cache = get_response_cache()
+    if cache is None:
+        return False
+    return cache.get(llm_client.cache_key(cache_id, get_output_tokens(command))) is not None
+
+
+def get_command_name(ctx: typer.Context) -> str:
+    """Return the path of the invoked command below the root command, e.g. ``generate docstring module``."""
+    names: List[str] = []
+    # The parents are click contexts rather than typer ones, so they are walked with a variable of their own type
+    info_name, parent = ctx.info_name, ctx.parent
+    while parent is not None:
+        names.append(info_name or "")
+        info_name, parent = parent.info_name, parent.parent
+    return " ".join(reversed(names))
+
+
+def prompt_llm(
+    ctx: typer.Context,
+    prompt: "PromptLike",
+    map_reduce: Optional["MapReduceJob"] = None,
+    cache_id: Optional[str] = None,
+    source_tokens: Optional[int] = None,
+) -> None:
+    """
+    Send a prompt to the LLM and stream the response to the terminal.
+
+    Args:
+        ctx: The context of the CLI invocation.
+        prompt: The prompt.
+        map_reduce: How to answer the prompt in chunks if it is too large for the model's context window. Without it,
+            an oversized prompt is rejected.
+        cache_id: Identifies the prompt in the response cache instead of its text, e.g. the hashes of the content it
+            was built from.
+        source_tokens: The estimated number of tokens in the source code the prompt is built around, if known, e.g.
+            from ``get_module_tokens``, so that only the instructions are estimated.
+    """
+    from rich.console import Console
+    from rich.progress import Progress, SpinnerColumn, TextColumn
+
+    from pygen.llm.budget import PromptTooLargeError, get_output_tokens, plan_prompt
+    from pygen.llm.cache import get_response_cache
+    from pygen.llm.metrics import get_metrics
+    from pygen.llm.stream import CacheSink, Sink, TerminalSink, pipe, replay_events
+    from pygen.prompts.prompt import get_prompt_text
+
+    # Budget the prompt before anything is sent, so oversized prompts fail fast
+    command = get_command_name(ctx)
+    get_metrics().command = command
+    job: Optional["MapReduceJob"] = None
+    try:
+        budget = plan_prompt(prompt, command, source_tokens=source_tokens)
+        max_tokens = budget.max_tokens
+        logger.debug(
+            f"Token budget for '{command}': ~{budget.input_tokens} input and {budget.max_tokens} output tokens of "
+            f"{budget.context_window}"
+        )
+    except PromptTooLargeError as e:
+        if map_reduce is None:
+            logger.error(e)
+            print(error_panel(str(e)))
+            raise typer.Exit()
+        logger.info(f"The prompt for '{command}' is too large (~{e.input_tokens} tokens), answering it in chunks")
+        max_tokens = get_output_tokens(command)
+        job = map_reduce
+
+    llm_client = get_llm_client(ctx)
     console = Console()
 
     show = ctx.meta.get("show", False)
 
     if show:
-        console.print(prompt_panel(prompt))
+        console.print(prompt_panel(get_prompt_text(prompt)))
+
+    cache = get_response_cache()
+    key = llm_client.cache_key(cache_id or prompt, max_tokens)
+    if cache is not None:
+        cached = cache.get(key)
+        if cached is not None:
+            logger.debug(f"Response cache hit for {key[:12]}")
+            get_metrics().record_cache_hit(llm_client.backend.name, llm_client.model_id)
+            pipe(replay_events(cached), [TerminalSink()])
+            return
+
+    sinks: List[Sink] = [TerminalSink()]
+    if cache is not None:
+        sinks.append(CacheSink(cache, key))
 
     with Progress(SpinnerColumn(), TextColumn("[progress.description]{task.description}"), console=console) as progress:
         task = progress.add_task("Waiting for LLM response...")
-        # llm_client.invoke_model(prompt)
-        llm_client.invoke_model_with_response_stream(prompt)
+        if job is not None:
+            from pygen.llm.mapreduce import map_reduce as run_map_reduce
+
+            def on_result(completed: int, total: int) -> None:
+                description = (
+                    f"Processed {completed} of {total} parts..." if completed < total else "Combining parts..."
+                )
+                progress.update(task, description=description)
+
+            run_map_reduce(llm_client, job, sinks, max_tokens, on_result=on_result)
+        else:
+            llm_client.invoke_model_with_response_stream(prompt, sinks, max_tokens)
         progress.update(task, completed=True)
         progress.stop()
         # Remove the progress bar by moving the cursor up one line and clearing it
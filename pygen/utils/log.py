@@ -1,17 +1,43 @@
 import logging
 from enum import Enum
+from typing import TYPE_CHECKING, Optional
+
+if TYPE_CHECKING:
+    import rich.logging
+
+
+class RichConsoleHandler(logging.Handler):
+    """
+    Logging handler that writes to the console through a Rich handler.
+
+    The Rich handler, and with it most of Rich, is only imported and created when the first record is logged, so
+    commands that log nothing, such as ``--help``, start quickly.
+    """
+
+    def __init__(self, level: int = logging.NOTSET) -> None:
+        super().__init__(level)
+        self._handler: Optional["rich.logging.RichHandler"] = None
+
+    def get_handler(self) -> "rich.logging.RichHandler":
+        """Get the Rich handler that records are written to, creating it on first use."""
+        if self._handler is None:
+            import rich.logging
+
+            self._handler = rich.logging.RichHandler(
+                log_time_format="%Y-%m-%d %H:%M:%S,%f",
+                markup=True,
+                show_path=True,
+                rich_tracebacks=True,
+                tracebacks_show_locals=False,
+            )
+        return self._handler
+
+    def emit(self, record: logging.LogRecord) -> None:
+        self.get_handler().handle(record)
 
-import rich.logging
 
 # Global Rich (console) handler
-RICH_HANDLER = rich.logging.RichHandler(
-    level=logging.WARNING,
-    log_time_format="%Y-%m-%d %H:%M:%S,%f",
-    markup=True,
-    show_path=True,
-    rich_tracebacks=True,
-    tracebacks_show_locals=False,
-)
+RICH_HANDLER = RichConsoleHandler(level=logging.WARNING)
 
 
 def get_logger(name: str, level: int = logging.DEBUG) -> logging.Logger:
@@ -32,7 +58,7 @@ def get_logger(name: str, level: int = logging.DEBUG) -> logging.Logger:
     return logger
 
 
-def get_rich_handler() -> rich.logging.RichHandler:
+def get_rich_handler() -> RichConsoleHandler:
     """
     Get the global Rich handler.
 
@@ -0,0 +1,171 @@
+"""
+Exact, prefix and fuzzy lookup of symbols by name.
+"""
+
+from bisect import bisect_left
+from collections import Counter, defaultdict
+from difflib import SequenceMatcher
+from typing import Dict, Generic, Iterable, List, Optional, Set, Tuple, TypeVar
+
+T = TypeVar("T")
+
+# Minimum similarity for a fuzzy match to be suggested
+FUZZY_CUTOFF = 0.6
+
+# Number of names a fuzzy lookup reads from the trigram index, rarest trigrams first
+MAX_SCANNED_NAMES = 1000
+
+# Number of names sharing the most of a fuzzy query's rarest trigrams whose trigrams are compared with the query's
+MAX_SHORTLIST = 50
+
+# Fraction of the similarity cutoff below which the trigram similarity of a name rules it out without comparing it
+MIN_TRIGRAM_SIMILARITY = 0.7
+
+# Number of names most similar to a fuzzy query by their trigrams that are compared with it in full
+MAX_FUZZY_CANDIDATES = 10
+
+
+def get_trigrams(name: str) -> Set[str]:
+    """Return the set of lowercase character trigrams of a name, padded so that short names have trigrams too."""
+    padded = f"  {name.lower()} "
+    return {padded[i : i + 3] for i in range(len(padded) - 2)}
+
+
+class SymbolLookup(Generic[T]):
+    """
+    Lookup structure mapping symbol names to items.
+
+    Exact lookups go through a hash map, prefix lookups bisect a sorted list of names, and fuzzy lookups rank the
+    names that share trigrams with the query by their similarity to it.
+    """
+
+    def __init__(self, entries: Iterable[Tuple[str, T]]) -> None:
+        self._exact: Dict[str, List[T]] = defaultdict(list)
+        for name, item in entries:
+            self._exact[name].append(item)
+
+        self._folded: Dict[str, List[str]] = defaultdict(list)
+        for name in self._exact:
+            self._folded[name.lower()].append(name)
+
+        self._sorted_names = sorted(self._exact)
+        self._trigram_index: Optional[Dict[str, List[str]]] = None
+
+    def __len__(self) -> int:
+        return len(self._sorted_names)
+
+    @property
+    def _trigrams(self) -> Dict[str, List[str]]:
+        """
+        The trigram index of the names, built on first use since only fuzzy lookups need it.
+
+        Names are listed shortest first, so that of the names sharing as many of a query's trigrams, which are counted
+        in the order they are listed, the shorter names that share more of their own trigrams are preferred.
+        """
+        if self._trigram_index is None:
+            self._trigram_index = defaultdict(list)
+            for name in sorted(self._sorted_names, key=len):
+                for trigram in get_trigrams(name):
+                    self._trigram_index[trigram].append(name)
+        return self._trigram_index
+
+    def exact(self, name: str) -> List[T]:
+        """Return the items with exactly the given name."""
+        return list(self._exact.get(name, []))
+
+    def prefix(self, prefix: str, limit: int = 50) -> List[str]:
+        """Return up to ``limit`` names starting with the prefix, in sorted order."""
+        names: List[str] = []
+        for i in range(bisect_left(self._sorted_names, prefix), len(self._sorted_names)):
+            name = self._sorted_names[i]
+            if not name.startswith(prefix) or len(names) >= limit:
+                break
+            names.append(name)
+        return names
+
+    def fuzzy(self, query: str, limit: int = 10, cutoff: float = FUZZY_CUTOFF) -> List[str]:
+        """
+        Return up to ``limit`` names similar to the query, best match first.
+
+        Candidates are the names sharing the query's rarest trigrams, read from the index up to a fixed number of names,
+        so the cost does not grow with the number of names. The candidates whose trigrams are most like the query's are
+        ranked by a case-insensitive similarity ratio, with names containing the query as a substring ranked first.
+
+        Args:
+            query: The name to match.
+            limit: The maximum number of names to return.
+            cutoff: The minimum similarity for a name to be returned.
+
+        Returns:
+            The matching names.
+        """
+        query_trigrams = get_trigrams(query)
+        postings = sorted((self._trigrams.get(t, []) for t in query_trigrams), key=len)
+        counts: Counter[str] = Counter()
+        scanned = 0
+        for posting in postings:
+            if scanned + len(posting) > MAX_SCANNED_NAMES:
+                if not scanned:
+                    # Even the rarest trigram of the query is too common to read whole, so only its shortest names count
+                    counts.update(posting[:MAX_SCANNED_NAMES])
+                break
+            counts.update(posting)
+            scanned += len(posting)
+
+        # The names sharing the most of the rarest trigrams are ranked by the Dice coefficient of all their trigrams and
+        # the query's, and only the best are compared with it in full
+        def overlap(name: str) -> float:
+            padded = f"  {name.lower()} "
+            shared = sum(map(padded.__contains__, query_trigrams))
+            return 2 * shared / (len(padded) - 2 + len(query_trigrams))
+
+        shortlist = sorted(((overlap(name), name) for name, _ in counts.most_common(MAX_SHORTLIST)), reverse=True)
+
+        folded_query = query.lower()
+        matcher = SequenceMatcher(b=folded_query, autojunk=False)
+        scored: List[Tuple[float, str]] = []
+        for similarity, name in shortlist[: max(limit, MAX_FUZZY_CANDIDATES)]:
+            if similarity < cutoff * MIN_TRIGRAM_SIMILARITY:
+                break
+            folded = name.lower()
+            matcher.set_seq1(folded)
+            if folded_query in folded:
+                scored.append((2.0 + len(folded_query) / len(folded), name))
+            elif matcher.real_quick_ratio() >= cutoff and matcher.quick_ratio() >= cutoff:
+                ratio = matcher.ratio()
+                if ratio >= cutoff:
+                    scored.append((ratio, name))
+
+        scored.sort(key=lambda s: (-s[0], s[1]))
+        return [name for _, name in scored[:limit]]
+
+    def suggest(self, query: str, limit: int = 10) -> List[str]:
+        """Return the names most likely meant by a query that has no exact match: case-insensitive, prefix, fuzzy."""
+        folded = self._folded.get(query.lower())
+        if folded:
+            return sorted(folded)[:limit]
+
+        names = self.prefix(query, limit)
+        for name in self.fuzzy(query, limit):
+            if len(names) >= limit:
+                break
+            if name not in names:
+                names.append(name)
+        return names
+
+    def find(self, query: str, limit: int = 10) -> Tuple[List[T], bool]:
+        """
+        Find the items for a query.
+
+        Args:
+            query: The name to find.
+            limit: The maximum number of names to suggest if there is no exact match.
+
+        Returns:
+            The items with exactly the given name, or otherwise the items of the suggested names, and whether the match
+            was exact.
+        """
+        items = self.exact(query)
+        if items:
+            return items, True
+        return [item for name in self.suggest(query, limit) for item in self._exact[name]], False
@@ -1,63 +1,62 @@
-import ast
 from pathlib import Path
-from typing import Dict, List, Optional, Tuple
+from typing import TYPE_CHECKING, Callable, Dict, List, Optional, Sequence, Tuple, TypeVar
 
 import typer
-from rich.console import Console
-from rich.table import Table
 
+from pygen.utils.config import get_settings
 from pygen.utils.log import get_logger
+from pygen.utils.lookup import SymbolLookup
 from pygen.utils.rich import selection_panel
+from pygen.utils.source import extract_module_source, extract_source
+from pygen.utils.symbols import CLASS, FUNCTION, Symbol
+from pygen.utils.walk import walk_python_files
+
+if TYPE_CHECKING:
+    from pygen.utils.index import SymbolIndex
+    from pygen.utils.parsing import ByteSpan
 
 logger = get_logger(__name__)
 
+T = TypeVar("T")
+
 
 def extract_module_name(file_path: Path) -> str:
     """Extract the module name from the file path including .py extension."""
     return file_path.name
 
 
-def extract_classes(file_path: Path) -> List[str]:
-    """Extract classes from a Python file."""
-
-    with file_path.open("r") as file:
-        tree = ast.parse(file.read())
-
-    classes = [f"{file_path}:{node.name}()" for node in tree.body if isinstance(node, ast.ClassDef)]
-    return classes
-
-
-def extract_functions(file_path: Path) -> List[str]:
-    """Extract functions from a Python file, including functions within classes."""
+def extract_classes(file_path: Path) -> List[Symbol]:
+    """Extract classes from a Python file, including nested classes."""
+    from pygen.utils.parsing import parse_module
 
-    def get_functions(node: ast.AST) -> List[str]:
-        """Recursively get all function names from the node."""
-        functions: List[str] = []
-        if isinstance(node, ast.FunctionDef):
-            functions.append(node.name)
-        for child in ast.iter_child_nodes(node):
-            functions.extend(get_functions(child))
-        return functions
+    symbols = parse_module(file_path).symbols
+    return [Symbol.from_info(info) for info in symbols.classes]
 
-    with file_path.open("r") as file:
-        tree = ast.parse(file.read())
 
-    functions = [f"{file_path}:{node.name}()" for node in tree.body if isinstance(node, ast.FunctionDef)]
+def extract_functions(file_path: Path) -> List[Symbol]:
+    """Extract functions from a Python file, including methods and nested functions."""
+    from pygen.utils.parsing import parse_module
 
-    for node in tree.body:
-        if isinstance(node, ast.ClassDef):
-            class_functions = get_functions(node)
-            functions.extend([f"{file_path}:{func_name}()" for func_name in class_functions])
+    symbols = parse_module(file_path).symbols
+    return [Symbol.from_info(info) for info in symbols.functions]
 
-    return functions
 
-
-def select_from_list(options: List[Path] | List[str], title: str, prompt_message: str) -> str:
+def select_from_list(
+    options: Sequence[T],
+    title: str,
+    prompt_message: str,
+    sort: bool = True,
+    format_option: Callable[[T], str] = str,
+) -> T:
     """Prompt the user to select an option from the list using a Rich table for enhanced presentation."""
+    from rich.console import Console
+    from rich.table import Table
+
     console = Console()
 
-    # Sort options alphabetically by path
-    options.sort()
+    # Sort options alphabetically by their display text, unless they are already in order
+    if sort:
+        options = sorted(options, key=format_option)
 
     # Determine the width for alignment based on the number of options
     num_width = len(str(len(options)))
@@ -79,7 +78,7 @@ def select_from_list(options: List[Path] | List[str], title: str, prompt_message
             option_idx = row_idx + col_idx * num_rows
             if option_idx < len(options):
                 number = str(option_idx + 1).rjust(num_width)
-                row.append(f"{number}. {options[option_idx]}")
+                row.append(f"{number}. {format_option(options[option_idx])}")
             else:
                 row.append("")  # Fill with an empty string if no more options
         table.add_row(*row)
@@ -90,7 +89,7 @@ def select_from_list(options: List[Path] | List[str], title: str, prompt_message
     try:
         index = int(choice) - 1
         if 0 <= index < len(options):
-            return str(options[index])
+            return options[index]
     except (ValueError, IndexError):
         pass
 
@@ -99,20 +98,36 @@ def select_from_list(options: List[Path] | List[str], title: str, prompt_message
 
 
 def get_module_file_list(project_root: Path) -> List[Path]:
-    """Get a recursive list of file paths for all Python modules from the project root, excluding empty __init__.py
-    files."""
+    """Get a list of file paths for all Python modules from the project root, skipping ignored paths and empty
+    __init__.py files."""
     python_files = []
 
-    for p in project_root.rglob("*.py"):
+    for p in walk_python_files(project_root, use_git=get_settings().git_ls_files):
         if p.name == "__init__.py":
             # Check if __init__.py is empty
-            if p.stat().st_size == 0:
-                continue  # Skip empty __init__.py files
+            try:
+                if p.stat().st_size == 0:
+                    continue  # Skip empty __init__.py files
+            except OSError:
+                continue
         python_files.append(p)
 
     return python_files
 
 
+_SYMBOL_INDEXES: Dict[Path, "SymbolIndex"] = {}
+
+
+def get_symbol_index(project_root: Path) -> "SymbolIndex":
+    """Get the up-to-date symbol index for the project root, loading and refreshing it at most once per process."""
+    from pygen.utils.index import load_symbol_index
+
+    resolved_root = project_root.resolve()
+    if resolved_root not in _SYMBOL_INDEXES:
+        _SYMBOL_INDEXES[resolved_root] = load_symbol_index(project_root, get_module_file_list(project_root))
+    return _SYMBOL_INDEXES[resolved_root]
+
+
 def normalise_module_name(module_name: str) -> str:
     """Ensure the module name has a .py extension."""
     if not module_name.endswith(".py"):
@@ -146,10 +161,8 @@ def validate_class_name(paths: List[Path], class_name: str) -> Optional[Path]:
     """Check if the class name exists in the module file mapping and return its path if found."""
     class_name = normalise_class_name(class_name)
     for file_path in paths:
-        classes = extract_classes(file_path)
-        for class_entry in classes:
-            if class_name in class_entry:
-                return file_path
+        if any(symbol.name == class_name for symbol in extract_classes(file_path)):
+            return file_path
     return None
 
 
@@ -157,22 +170,54 @@ def validate_function_name(paths: List[Path], function_name: str) -> Optional[Pa
     """Check if the function name exists in the module file mapping and return its path if found."""
     function_name = normalise_function_name(function_name)
     for file_path in paths:
-        functions = extract_functions(file_path)
-        for function_entry in functions:
-            if function_name in function_entry:
-                return file_path
+        if any(symbol.name == function_name for symbol in extract_functions(file_path)):
+            return file_path
+    return None
+
+
+def get_file_symbols(file_path: Path) -> Tuple[List[Symbol], Optional["ByteSpan"]]:
+    """Get the symbols and module docstring span of a file from a current symbol index, or by parsing the file."""
+    from pygen.utils.parsing import parse_module
+
+    for symbol_index in _SYMBOL_INDEXES.values():
+        entry = symbol_index.current_entry(file_path)
+        if entry is not None:
+            span = entry["docstring"]
+            return symbol_index.symbols_in(file_path), (span[0], span[1]) if span else None
+
+    symbols = parse_module(file_path).symbols
+    return [Symbol.from_info(info) for info in symbols.classes + symbols.functions], symbols.docstring_span
+
+
+def get_module_tokens(file_path: Path) -> Optional[int]:
+    """Get the estimated number of LLM tokens in a module from a current symbol index, if one holds the module."""
+    for symbol_index in _SYMBOL_INDEXES.values():
+        tokens = symbol_index.tokens_in(file_path)
+        if tokens is not None:
+            return tokens
+    return None
+
+
+def find_symbol(file_path: Path, name: str, kind: str) -> Optional[Symbol]:
+    """
+    Find a class (kind ``class``) or function (kind ``function``) in a file.
+
+    The name is matched against qualified names such as ``Class.method`` first, then against bare names, in which case
+    the first symbol with the name is returned.
+    """
+    symbols = [s for s in get_file_symbols(file_path)[0] if s.is_class == (kind == CLASS)]
+    for symbol in symbols:
+        if symbol.qualname == name:
+            return symbol
+    for symbol in symbols:
+        if symbol.name == name:
+            return symbol
     return None
 
 
-def remove_module_docstring(tree: ast.Module) -> ast.Module:
-    """Remove the module-level docstring if it exists."""
-    if (
-        len(tree.body) > 0
-        and isinstance(tree.body[0], ast.Expr)
-        and isinstance(tree.body[0].value, (ast.Str, ast.Constant))
-    ):
-        tree.body.pop(0)
-    return tree
+def get_symbol_code(file_path: Path, symbol: Symbol, strip: bool) -> str:
+    """Get the source code of a symbol by slicing its span from the file, optionally stripping the docstring."""
+    return extract_source(file_path, symbol.span, symbol.docstring_span, strip)
 
 
 def get_module_content(file_path: Path, strip: bool = False) -> str:
@@ -180,46 +225,22 @@ def get_module_content(file_path: Path, strip: bool = False) -> str:
     if not file_path.exists():
         raise FileNotFoundError(f"File '{file_path}' not found.")
 
-    with file_path.open("r") as file:
-        content = file.read()
-
+    docstring_span = None
     if strip:
         try:
-            tree = ast.parse(content)
-            tree = remove_module_docstring(tree)
-            content = ast.unparse(tree)
+            _, docstring_span = get_file_symbols(file_path)
         except SyntaxError as e:
             print(f"Error parsing {file_path}: {e}")
             return ""
 
-    return content
-
-
-def remove_class_docstring(node: ast.ClassDef) -> ast.ClassDef:
-    """Remove the docstring from a class node if it exists."""
-    if (
-        len(node.body) > 0
-        and isinstance(node.body[0], ast.Expr)
-        and isinstance(node.body[0].value, (ast.Str, ast.Constant))
-    ):
-        node.body.pop(0)
-    return node
-
-
-def find_class_code(node: ast.ClassDef, content: str, strip: bool) -> str:
-    """Get the source code of the class node, optionally stripping the docstring."""
-    if strip:
-        node = remove_class_docstring(node)
-    return ast.unparse(node)
+    return extract_module_source(file_path, docstring_span, strip)
 
 
 def get_class_content(file_path: Path, class_name: str, strip: bool = False) -> str:
     """Extract the text of the specified class from the given file."""
     class_name = normalise_class_name(class_name)
     try:
-        with file_path.open("r") as file:
-            content = file.read()
-            tree = ast.parse(content)
+        symbol = find_symbol(file_path, class_name, "class")
     except FileNotFoundError:
         print(f"Error: File {file_path} not found.")
         return ""
@@ -227,48 +248,14 @@ def get_class_content(file_path: Path, class_name: str, strip: bool = False) ->
         print(f"Error parsing {file_path}: {e}")
         return ""
 
-    for node in tree.body:
-        if isinstance(node, ast.ClassDef) and node.name == class_name:
-            return find_class_code(node, content, strip)
-    return ""
-
-
-def remove_function_docstring(node: ast.FunctionDef) -> ast.FunctionDef:
-    """Remove the docstring from a function node if it exists."""
-    if (
-        len(node.body) > 0
-        and isinstance(node.body[0], ast.Expr)
-        and isinstance(node.body[0].value, (ast.Str, ast.Constant))
-    ):
-        node.body.pop(0)
-    return node
-
-
-def get_function_code(node: ast.FunctionDef, content: str, strip: bool) -> str:
-    """Get the source code of the function node, optionally stripping the docstring."""
-    if strip:
-        node = remove_function_docstring(node)
-    return ast.unparse(node)
-
-
-def find_function(node: ast.AST, name: str, content: str, strip: bool) -> Optional[str]:
-    """Recursively find a function by name in the AST and return its source code."""
-    if isinstance(node, ast.FunctionDef) and node.name == name:
-        return get_function_code(node, content, strip)
-    for child in ast.iter_child_nodes(node):
-        result = find_function(child, name, content, strip)
-        if result:
-            return result
-    return None
+    return get_symbol_code(file_path, symbol, strip) if symbol is not None else ""
 
 
 def get_function_content(file_path: Path, function_name: str, strip: bool = False) -> str:
     """Extract the text of the specified function from the given file."""
     function_name = normalise_function_name(function_name)
     try:
-        with file_path.open("r") as file:
-            content = file.read()
-            tree = ast.parse(content)
+        symbol = find_symbol(file_path, function_name, "function")
     except FileNotFoundError:
         print(f"Error: File {file_path} not found.")
         return ""
@@ -276,81 +263,123 @@ def get_function_content(file_path: Path, function_name: str, strip: bool = Fals
         print(f"Error parsing {file_path}: {e}")
         return ""
 
-    function_text = find_function(tree, function_name, content, strip)
-    return function_text if function_text is not None else ""
+    return get_symbol_code(file_path, symbol, strip) if symbol is not None else ""
+
+
+def resolve_from_lookup(
+    lookup: SymbolLookup[T],
+    name: str,
+    kind: str,
+    title: str,
+    prompt_message: str,
+    format_option: Callable[[T], str] = str,
+) -> T:
+    """
+    Resolve a name through a lookup, prompting for a selection only when the name is ambiguous or not found exactly.
+
+    Args:
+        lookup: The lookup to resolve the name in.
+        name: The name to resolve.
+        kind: The kind of symbol, used in log messages.
+        title: The title of the selection table.
+        prompt_message: The prompt shown with the selection table.
+        format_option: Formats an item for display.
+
+    Returns:
+        The resolved item.
+    """
+    matches, exact = lookup.find(name)
+    if exact and len(matches) == 1:
+        return matches[0]
+
+    if not matches:
+        logger.warning(f"{kind.capitalize()} '{name}' not found")
+        raise typer.Exit()
+
+    if exact:
+        logger.info(f"Multiple {kind}s found with the name '{name}': {[format_option(m) for m in matches]}")
+    else:
+        logger.info(f"{kind.capitalize()} '{name}' not found, showing the closest matches")
+    return select_from_list(matches, title, prompt_message, sort=False, format_option=format_option)
+
+
+def resolve_symbol(symbol_index: "SymbolIndex", name: str, kind: str, title: str, prompt_message: str) -> Symbol:
+    """
+    Resolve a class or function name, which may be a dotted qualified name such as ``module.Class.method``.
+
+    Dotted names are resolved through the symbol table's qualified names. Bare names, and dotted names that do not
+    resolve, fall back to a lookup of the final name component.
+
+    Args:
+        symbol_index: The symbol index of the project.
+        name: The bare or dotted name to resolve.
+        kind: The kind of symbol, ``class`` or ``function``.
+        title: The title of the selection table.
+        prompt_message: The prompt shown with the selection table.
+
+    Returns:
+        The resolved symbol.
+    """
+    table = symbol_index.table
+    if "." in name:
+        matches = [s for s in table.resolve(name) if s.is_class == (kind == CLASS)]
+        if len(matches) == 1:
+            return matches[0]
+        if matches:
+            logger.info(f"Multiple {kind}s found with the name '{name}': {[table.format_symbol(m) for m in matches]}")
+            return select_from_list(matches, title, prompt_message, sort=False, format_option=table.format_symbol)
+        name = name.rpartition(".")[2]
+
+    lookup = symbol_index.class_lookup if kind == CLASS else symbol_index.function_lookup
+    return resolve_from_lookup(lookup, name, kind, title, prompt_message, table.format_symbol)
 
 
 def get_module_path(project_root: Path, module_name: Optional[str]) -> Path:
     """Get the module name selection and validation."""
-    module_file_list = get_module_file_list(project_root)
+    symbol_index = get_symbol_index(project_root)
     if module_name:
         module_name = normalise_module_name(module_name)
-        module_paths = [p for p in module_file_list if module_name in p.name]
-        if len(module_paths) > 1:
-            logger.info(f"Multiple modules found with the name '{module_name}': {[str(p) for p in module_paths]}")
-            module_path = Path(select_from_list([str(p) for p in module_paths], "Modules", "Select a module by number"))
-        elif module_paths:
-            module_path = module_paths[0]
-        else:
-            logger.warning(f"Module '{module_name}' not found")
-            raise typer.Exit()
-    else:
-        module_path = Path(select_from_list([str(p) for p in module_file_list], "Modules", "Select a module by number"))
-    return module_path
+        if "/" in module_name:
+            # Match a trailing part of the module path, e.g. 'utils/log.py'
+            module_paths = [p for p in symbol_index.modules if f"/{p.as_posix()}".endswith(f"/{module_name}")]
+            if len(module_paths) == 1:
+                return module_paths[0]
+            module_name = module_name.rpartition("/")[2]
+        return resolve_from_lookup(
+            symbol_index.module_lookup, module_name, "module", "Modules", "Select a module by number"
+        )
+
+    return select_from_list(symbol_index.modules, "Modules", "Select a module by number", sort=False)
 
 
 def get_class_name_and_path(project_root: Path, class_name: Optional[str]) -> Tuple[Path, str]:
     """Get the class name selection and validation."""
-    module_file_list = get_module_file_list(project_root)
+    symbol_index = get_symbol_index(project_root)
+    table = symbol_index.table
     if class_name:
         class_name = normalise_class_name(class_name)
-        class_paths = [c for p in module_file_list for c in extract_classes(p) if class_name in c]
-        if len(class_paths) > 1:
-            logger.info(f"Multiple classes found with the name '{class_name}': {list(class_paths)}")
-            class_selection = select_from_list(list(class_paths), "Classes", "Select a class by number")
-            class_path_str, class_name = class_selection.split(":")
-            class_path = Path(class_path_str)
-        elif class_paths:
-            class_path_str, class_name = class_paths[0].split(":")
-            class_path = Path(class_path_str)
-        else:
-            logger.warning(f"Class '{class_name}()' not found in any module")
-            raise typer.Exit()
+        symbol = resolve_symbol(symbol_index, class_name, CLASS, "Classes", "Select a class by number")
     else:
-        class_paths_list: List[str] = []
-        for file_path in module_file_list:
-            classes = extract_classes(file_path)
-            class_paths_list.extend(cls for cls in classes)
-        class_selection = select_from_list(class_paths_list, "Classes", "Select a class by number")
-        class_path_str, class_name = class_selection.split(":")
-        class_path = Path(class_path_str)
-    return class_path, class_name
+        symbol = select_from_list(
+            symbol_index.classes, "Classes", "Select a class by number", sort=False, format_option=table.format_symbol
+        )
+    return table.path_of(symbol), symbol.qualname
 
 
 def get_function_name_and_path(project_root: Path, function_name: Optional[str]) -> Tuple[Path, str]:
     """Get the function name selection and validation."""
-    module_file_list = get_module_file_list(project_root)
+    symbol_index = get_symbol_index(project_root)
+    table = symbol_index.table
     if function_name:
         function_name = normalise_function_name(function_name)
-        function_paths = [f for p in module_file_list for f in extract_functions(p) if function_name in f]
-        if len(function_paths) > 1:
-            logger.info(f"Multiple functions found with the name '{function_name}': {list(function_paths)}")
-            function_selection = select_from_list(list(function_paths), "Functions", "Select a function by number")
-            function_path_str, function_name = function_selection.split(":")
-            function_path = Path(function_path_str)
-        elif function_paths:
-            function_path_str, function_name = function_paths[0].split(":")
-            function_path = Path(function_path_str)
-        else:
-            logger.warning(f"Function '{function_name}()' not found in any module")
-            raise typer.Exit()
+        symbol = resolve_symbol(symbol_index, function_name, FUNCTION, "Functions", "Select a function by number")
     else:
-        module_path = Path(select_from_list([str(p) for p in module_file_list], "Modules", "Select a module by number"))
-        functions = extract_functions(module_path)
+        module_path = select_from_list(symbol_index.modules, "Modules", "Select a module by number", sort=False)
+        functions = symbol_index.functions_in(module_path)
         if not functions:
             logger.warning(f"No functions found in module '{module_path.name}()'")
             raise typer.Exit()
-        function_selection = select_from_list(list(functions), "Functions", "Select a function by number")
-        function_path_str, function_name = function_selection.split(":")
-        function_path = Path(function_path_str)
-    return function_path, function_name
+        symbol = select_from_list(
+            functions, "Functions", "Select a function by number", sort=False, format_option=table.format_symbol
+        )
+    return table.path_of(symbol), symbol.qualname
@@ -0,0 +1,277 @@
+"""
+Single-pass symbol extraction and a memory-bounded cache of parsed modules.
+"""
+
+import ast
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from itertools import accumulate
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+# Approximate in-memory size of a parsed AST relative to the size of its source
+AST_SIZE_FACTOR = 32
+
+# Default memory budget of the parsed module cache, in bytes
+DEFAULT_CACHE_BYTES = 256 * 1024 * 1024
+
+FunctionNode = ast.FunctionDef | ast.AsyncFunctionDef
+
+# Fields that hold nested statements. Classes and functions can only be defined in statements, so the collector never
+# needs to descend into expressions.
+STATEMENT_FIELDS = ("body", "orelse", "finalbody", "handlers", "cases")
+
+
+# A half-open byte range within a source file
+ByteSpan = Tuple[int, int]
+
+
+@dataclass(frozen=True)
+class SymbolInfo:
+    """
+    A class or function found in a module, with its source span.
+
+    The byte span runs from the start of the first line of the symbol (including its decorators and indentation) to
+    the end of its last statement. The docstring span, if any, is the byte range to cut to strip the docstring.
+    """
+
+    name: str
+    qualname: str
+    kind: str
+    start_lineno: int
+    lineno: int
+    end_lineno: int
+    col_offset: int
+    decorators: Tuple[str, ...] = ()
+    span: ByteSpan = (0, 0)
+    docstring_span: Optional[ByteSpan] = None
+
+
+@dataclass
+class ModuleSymbols:
+    """All classes and functions found in a module, and the byte range of its docstring."""
+
+    classes: List[SymbolInfo] = field(default_factory=list)
+    functions: List[SymbolInfo] = field(default_factory=list)
+    docstring_span: Optional[ByteSpan] = None
+
+
+def get_line_offsets(source: bytes) -> List[int]:
+    """Return the byte offset of the start of each line in the source, plus the length of the source."""
+    return [0, *accumulate(len(line) for line in source.splitlines(keepends=True))]
+
+
+def get_docstring_node(node: ast.Module | ast.ClassDef | FunctionNode) -> Optional[ast.Expr]:
+    """Return the expression statement holding the docstring of a node, if it has one."""
+    if node.body and isinstance(node.body[0], ast.Expr):
+        value = node.body[0].value
+        if isinstance(value, ast.Constant) and isinstance(value.value, str):
+            return node.body[0]
+    return None
+
+
+class SymbolCollector(ast.NodeVisitor):
+    """
+    Collect classes, methods and nested functions from a module in a single pass over its AST.
+
+    Functions are classified as ``function`` at module level, ``method`` when defined directly in a class body and
+    ``nested`` when defined inside another function. Qualified names follow ``__qualname__`` conventions. Only
+    statements are traversed, which skips the bulk of the tree.
+    """
+
+    def __init__(self, source: bytes) -> None:
+        self.source = source
+        self.offsets = get_line_offsets(source)
+        self.symbols = ModuleSymbols()
+        self._scopes: List[Tuple[str, str]] = []
+
+    def collect(self, tree: ast.Module) -> ModuleSymbols:
+        """Visit the tree and return the symbols that were found."""
+        self.symbols.docstring_span = self._docstring_span(tree)
+        self.visit(tree)
+        return self.symbols
+
+    def _offset(self, lineno: int, col_offset: int) -> int:
+        return self.offsets[lineno - 1] + col_offset
+
+    def _docstring_span(self, node: ast.Module | ast.ClassDef | FunctionNode) -> Optional[ByteSpan]:
+        """
+        Return the byte range to cut to strip the docstring of a node.
+
+        A docstring on lines of its own is removed together with its lines, otherwise only the string itself is.
+        """
+        docstring = get_docstring_node(node)
+        if docstring is None or docstring.end_lineno is None or docstring.end_col_offset is None:
+            return None
+
+        start = self._offset(docstring.lineno, docstring.col_offset)
+        end = self._offset(docstring.end_lineno, docstring.end_col_offset)
+        line_start = self.offsets[docstring.lineno - 1]
+        line_end = self.offsets[docstring.end_lineno]
+        if not self.source[line_start:start].strip() and not self.source[end:line_end].strip():
+            return line_start, line_end
+
+        # Take a trailing statement separator with the docstring, e.g. 'def f(): "doc"; return 1'
+        rest = self.source[end:line_end]
+        if rest.lstrip(b" \t").startswith(b";"):
+            separator = rest.index(b";") + 1
+            end += separator + len(rest[separator:]) - len(rest[separator:].lstrip(b" \t"))
+        return start, end
+
+    def _qualname(self, name: str) -> str:
+        parts: List[str] = []
+        for scope_name, scope_kind in self._scopes:
+            parts.append(scope_name)
+            if scope_kind != "class":
+                parts.append("<locals>")
+        parts.append(name)
+        return ".".join(parts)
+
+    def _symbol(self, node: ast.ClassDef | FunctionNode, kind: str) -> SymbolInfo:
+        start_lineno = min([d.lineno for d in node.decorator_list] + [node.lineno])
+        end_lineno = node.end_lineno or node.lineno
+        return SymbolInfo(
+            name=node.name,
+            qualname=self._qualname(node.name),
+            kind=kind,
+            start_lineno=start_lineno,
+            lineno=node.lineno,
+            end_lineno=end_lineno,
+            col_offset=node.col_offset,
+            decorators=tuple(ast.unparse(d) for d in node.decorator_list),
+            span=(self.offsets[start_lineno - 1], self._offset(end_lineno, node.end_col_offset or 0)),
+            docstring_span=self._docstring_span(node),
+        )
+
+    def generic_visit(self, node: ast.AST) -> None:
+        """Visit the nested statements of a node."""
+        for field_name in STATEMENT_FIELDS:
+            for child in getattr(node, field_name, ()):
+                self.visit(child)
+
+    def visit_ClassDef(self, node: ast.ClassDef) -> None:  # noqa: N802
+        """Record a class and visit its body."""
+        self.symbols.classes.append(self._symbol(node, "class"))
+        self._scopes.append((node.name, "class"))
+        self.generic_visit(node)
+        self._scopes.pop()
+
+    def _visit_function(self, node: FunctionNode) -> None:
+        if not self._scopes:
+            kind = "function"
+        elif self._scopes[-1][1] == "class":
+            kind = "method"
+        else:
+            kind = "nested"
+        self.symbols.functions.append(self._symbol(node, kind))
+        self._scopes.append((node.name, kind))
+        self.generic_visit(node)
+        self._scopes.pop()
+
+    def visit_FunctionDef(self, node: ast.FunctionDef) -> None:  # noqa: N802
+        """Record a function and visit its body."""
+        self._visit_function(node)
+
+    def visit_AsyncFunctionDef(self, node: ast.AsyncFunctionDef) -> None:  # noqa: N802
+        """Record an async function and visit its body."""
+        self._visit_function(node)
+
+
+def collect_symbols(tree: ast.Module, source: bytes) -> ModuleSymbols:
+    """Collect all classes and functions from a parsed module."""
+    return SymbolCollector(source).collect(tree)
+
+
+@dataclass
+class ParsedModule:
+    """The raw source and AST of a parsed module."""
+
+    source: bytes
+    tree: ast.Module
+    _symbols: Optional[ModuleSymbols] = None
+
+    @property
+    def symbols(self) -> ModuleSymbols:
+        """The classes and functions of the module, collected on first access."""
+        if self._symbols is None:
+            self._symbols = collect_symbols(self.tree, self.source)
+        return self._symbols
+
+
+class ParsedModuleCache:
+    """
+    LRU cache of parsed modules bounded by their estimated memory footprint.
+
+    Entries are keyed by the resolved path of the module and invalidated when the file's mtime or size changes. The
+    footprint of an entry is estimated as ``AST_SIZE_FACTOR`` times the length of its source.
+    """
+
+    def __init__(self, max_bytes: int = DEFAULT_CACHE_BYTES) -> None:
+        self.max_bytes = max_bytes
+        self.current_bytes = 0
+        self._entries: "OrderedDict[Path, Tuple[Tuple[int, int], ParsedModule, int]]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, file_path: Path, source: Optional[bytes] = None) -> ParsedModule:
+        """
+        Get the parsed module for a file, parsing it if it is not cached or has changed.
+
+        Args:
+            file_path: The path of the module.
+            source: The raw source of the file, if it has already been read.
+
+        Returns:
+            The parsed module.
+
+        Raises:
+            FileNotFoundError: If the file does not exist.
+            SyntaxError: If the file cannot be parsed.
+        """
+        key = file_path.resolve()
+        stat = key.stat()
+        version = (stat.st_mtime_ns, stat.st_size)
+
+        cached = self._entries.get(key)
+        if cached is not None and cached[0] == version:
+            self._entries.move_to_end(key)
+            return cached[1]
+
+        if source is None:
+            source = key.read_bytes()
+        parsed = ParsedModule(source, ast.parse(source, filename=str(file_path)))
+        self._store(key, version, parsed)
+        return parsed
+
+    def _store(self, key: Path, version: Tuple[int, int], parsed: ParsedModule) -> None:
+        self.discard(key)
+
+        size = len(parsed.source) * AST_SIZE_FACTOR
+        if size > self.max_bytes:
+            return
+
+        self._entries[key] = (version, parsed, size)
+        self.current_bytes += size
+        while self.current_bytes > self.max_bytes:
+            _, (_, _, evicted_size) = self._entries.popitem(last=False)
+            self.current_bytes -= evicted_size
+
+    def discard(self, file_path: Path) -> None:
+        """Remove a module from the cache if it is present."""
+        cached = self._entries.pop(file_path.resolve(), None)
+        if cached is not None:
+            self.current_bytes -= cached[2]
+
+    def clear(self) -> None:
+        """Remove all modules from the cache."""
+        self._entries.clear()
+        self.current_bytes = 0
+
+
+PARSED_MODULES = ParsedModuleCache()
+
+
+def parse_module(file_path: Path, source: Optional[bytes] = None) -> ParsedModule:
+    """Parse a module through the process-wide parsed module cache."""
+    return PARSED_MODULES.get(file_path, source)
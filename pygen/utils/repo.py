@@ -0,0 +1,304 @@
+"""
+Access to the Git repositories compared by the ``pygen git`` commands.
+
+A repository given as a local path is used in place: nothing is cloned or checked out, and refs are read directly from
+its object database. A remote repository is fetched into a bare mirror with only the requested refs and no working
+tree. The fetch is blobless by default, so the commit graph needed to find the merge base is complete, but file contents
+are only downloaded for the files a diff actually reads. With ``PYGEN_GIT_DEPTH`` the fetch is shallow instead, and is
+deepened until the merge base of the refs has been fetched.
+
+Mirrors are kept in the user cache directory, keyed by URL, so later runs only fetch the new commits of the requested
+refs. Processes take turns to fetch into a mirror, while any number may read it, and mirrors that have not been used
+for a while, or the least recently used when the cache is too large, are evicted by processes that are not using them.
+
+GitPython is imported on first use, as it is slow to import.
+"""
+
+import hashlib
+import os
+import shutil
+import tempfile
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import TYPE_CHECKING, Iterator, List, Optional, Sequence, Tuple
+
+from pygen.utils.config import get_settings
+from pygen.utils.filelock import FileLock
+from pygen.utils.log import get_logger
+
+if TYPE_CHECKING:
+    import git
+
+logger = get_logger(__name__)
+
+# Name of the remote that refs are fetched from
+REMOTE = "origin"
+
+# Number of times a shallow fetch is deepened, doubling its depth each time, before the full history is fetched
+MAX_DEEPEN_STEPS = 6
+
+
+def is_local_repository(location: str) -> bool:
+    """Whether a repository location is a path to a local directory rather than a remote URL."""
+    return Path(location).expanduser().is_dir()
+
+
+def get_repository_name(location: str) -> str:
+    """Return the name of a repository from its path or URL, e.g. ``pygen`` for ``git@github.com:org/pygen.git``."""
+    name = location.rstrip("/").rpartition("/")[2].rpartition(":")[2]
+    return name.removesuffix(".git") or "repository"
+
+
+def get_remote_ref(ref: str) -> str:
+    """Return the remote-tracking ref that a fetched ref is stored under."""
+    return f"refs/remotes/{REMOTE}/{ref}"
+
+
+def resolve_ref(repo: "git.Repo", ref: str) -> str:
+    """
+    Resolve a branch, tag or commit to a commit hash, falling back to the remote-tracking branch of the same name.
+
+    Args:
+        repo: The repository.
+        ref: The branch, tag or commit.
+
+    Returns:
+        The commit hash.
+
+    Raises:
+        ValueError: If the ref is not in the repository.
+    """
+    import git
+
+    for candidate in (ref, get_remote_ref(ref)):
+        try:
+            return str(repo.git.rev_parse("--verify", "--quiet", "--end-of-options", f"{candidate}^{{commit}}"))
+        except git.exc.GitCommandError:
+            continue
+    raise ValueError(f"'{ref}' is not a branch, tag or commit of {repo.git_dir}")
+
+
+def has_merge_base(repo: "git.Repo", revisions: Sequence[str]) -> bool:
+    """Whether the merge base of the revisions is in the repository."""
+    import git
+
+    try:
+        repo.git.merge_base(*revisions)
+    except git.exc.GitCommandError:
+        return False
+    return True
+
+
+def init_bare_repository(path: Path, url: str) -> "git.Repo":
+    """
+    Create a bare repository that fetches from a remote URL, configured for partial clones if a filter is set.
+
+    Args:
+        path: The directory of the repository.
+        url: The URL of the remote repository.
+
+    Returns:
+        The repository.
+    """
+    import git
+
+    repo = git.Repo.init(str(path), bare=True)
+    repo.git.remote("add", REMOTE, url)
+    clone_filter = get_settings().git_filter
+    if clone_filter and not get_settings().git_depth:
+        # Fetches use the filter, and objects left out by it are fetched from the remote when they are first read
+        with repo.config_writer() as config:
+            config.set_value("core", "repositoryformatversion", "1")
+            config.set_value("extensions", "partialClone", REMOTE)
+            config.set_value(f'remote "{REMOTE}"', "promisor", "true")
+            config.set_value(f'remote "{REMOTE}"', "partialclonefilter", clone_filter)
+    return repo
+
+
+def fetch_refs(repo: "git.Repo", refs: Sequence[str], depth: Optional[int] = None) -> None:
+    """
+    Fetch refs from the remote into their remote-tracking refs, together with enough history to find their merge base.
+
+    Only the objects that the repository does not have yet are downloaded.
+
+    Args:
+        repo: The repository, with the remote configured.
+        refs: The branches or tags to fetch.
+        depth: The number of commits of history to fetch, or None to fetch the full history.
+    """
+    refspecs = [f"+{ref}:{get_remote_ref(ref)}" for ref in refs]
+    options = ["--no-tags"]
+    if depth:
+        options.append(f"--depth={depth}")
+
+    logger.info(f"Fetching {', '.join(refs)} from {repo.remotes[REMOTE].url}")
+    repo.git.fetch(REMOTE, *options, *refspecs)
+    if not depth:
+        return
+
+    # A shallow fetch may stop short of the merge base, so deepen it until the refs share history
+    revisions = [get_remote_ref(ref) for ref in refs]
+    for _ in range(MAX_DEEPEN_STEPS):
+        if has_merge_base(repo, revisions):
+            return
+        logger.debug(f"No merge base within {depth} commits, deepening the fetch")
+        repo.git.fetch(REMOTE, "--no-tags", f"--deepen={depth}", *refspecs)
+        depth *= 2
+    if not has_merge_base(repo, revisions):
+        repo.git.fetch(REMOTE, "--no-tags", "--unshallow", *refspecs)
+
+
+def is_shallow(repo: "git.Repo") -> bool:
+    """Whether a repository has a shallow history."""
+    return (Path(repo.git_dir) / "shallow").exists()
+
+
+def get_git_cache_dir() -> Path:
+    """Return the directory of the mirror cache."""
+    from pygen.llm.cache import get_default_cache_dir
+
+    return get_settings().git_cache_dir or get_default_cache_dir() / "repos"
+
+
+def get_mirror_path(cache_dir: Path, url: str) -> Path:
+    """Return the directory of the mirror of a remote repository, named after the repository and a hash of its URL."""
+    digest = hashlib.sha256(url.rstrip("/").encode("utf-8")).hexdigest()[:16]
+    return cache_dir / f"{get_repository_name(url)}-{digest}.git"
+
+
+def get_directory_size(path: Path) -> int:
+    """Return the total size in bytes of the files below a directory."""
+    total = 0
+    for directory, _, file_names in os.walk(path):
+        for file_name in file_names:
+            try:
+                total += os.stat(os.path.join(directory, file_name)).st_size
+            except OSError:
+                continue
+    return total
+
+
+def evict_mirrors(cache_dir: Path, keep: Optional[Path] = None) -> None:
+    """
+    Evict the mirrors that have not been used within the maximum age, then the least recently used mirrors until the
+    cache fits its maximum size. Mirrors in use by any process are skipped.
+
+    Args:
+        cache_dir: The directory of the mirror cache.
+        keep: A mirror that is never evicted, e.g. the one just used.
+    """
+    settings = get_settings()
+    mirrors = []
+    for path in cache_dir.glob("*.git"):
+        lock_path = path.with_suffix(".lock")
+        try:
+            last_used = (lock_path if lock_path.exists() else path).stat().st_mtime
+        except OSError:
+            continue
+        mirrors.append((last_used, path))
+
+    sizes = {path: get_directory_size(path) for _, path in mirrors}
+    total = sum(sizes.values())
+    now = time.time()
+    for last_used, path in sorted(mirrors):
+        expired = settings.git_cache_max_age is not None and now - last_used > settings.git_cache_max_age
+        if path == keep or not (expired or total > settings.git_cache_max_bytes):
+            continue
+        lock = FileLock(path.with_suffix(".lock"))
+        if not lock.acquire(blocking=False):
+            continue
+        try:
+            shutil.rmtree(path, ignore_errors=True)
+        finally:
+            lock.release()
+        total -= sizes[path]
+        logger.info(f"Evicted the mirror {path.name} ({sizes[path] / 2**20:.1f} MiB) from the Git cache")
+
+
+@contextmanager
+def open_mirror(url: str, refs: Sequence[str]) -> Iterator["git.Repo"]:
+    """
+    Open the cached mirror of a remote repository, creating it if needed, and fetch refs into it.
+
+    The mirror is locked shared while it is open, so it is not evicted, and only one process fetches into it at a time.
+
+    Args:
+        url: The URL of the remote repository.
+        refs: The branches or tags to fetch.
+
+    Yields:
+        The mirror.
+    """
+    import git
+
+    cache_dir = get_git_cache_dir()
+    path = get_mirror_path(cache_dir, url)
+    use_lock = FileLock(path.with_suffix(".lock"))
+    use_lock.acquire(shared=True)
+    repo: Optional[git.Repo] = None
+    try:
+        with FileLock(path.with_suffix(".fetch.lock")):
+            if (path / "HEAD").exists():
+                repo = git.Repo(str(path))
+                if REMOTE not in [remote.name for remote in repo.remotes]:
+                    repo.git.remote("add", REMOTE, url)
+                # A mirror with full history stays complete, while a shallow one is fetched shallow again
+                depth = get_settings().git_depth if is_shallow(repo) else None
+            else:
+                repo = init_bare_repository(path, url)
+                depth = get_settings().git_depth
+            fetch_refs(repo, refs, depth)
+        # The lock file's modification time records when the mirror was last used
+        os.utime(use_lock.path)
+        yield repo
+    finally:
+        if repo is not None:
+            repo.close()
+        use_lock.release()
+    evict_mirrors(cache_dir, keep=path)
+
+
+@contextmanager
+def open_repository(location: str, refs: Sequence[str]) -> Iterator[Tuple["git.Repo", List[str]]]:
+    """
+    Open a local repository in place, or fetch refs from a remote repository into its cached mirror, or into a temporary
+    bare repository if the cache is disabled.
+
+    Args:
+        location: The path of a local repository, or the URL of a remote one.
+        refs: The branches, tags or commits to resolve.
+
+    Yields:
+        The repository and the commit hash of each ref.
+
+    Raises:
+        git.exc.GitError: If Git fails, e.g. the remote or one of its refs does not exist.
+        ValueError: If a ref is not in the repository.
+    """
+    import git
+
+    repo: Optional[git.Repo] = None
+    if is_local_repository(location):
+        try:
+            repo = git.Repo(str(Path(location).expanduser()), search_parent_directories=True)
+            yield repo, [resolve_ref(repo, ref) for ref in refs]
+        finally:
+            if repo is not None:
+                repo.close()
+        return
+
+    if get_settings().git_cache:
+        with open_mirror(location, list(dict.fromkeys(refs))) as repo:
+            yield repo, [resolve_ref(repo, ref) for ref in refs]
+        return
+
+    with tempfile.TemporaryDirectory(prefix="pygen-") as tmp_dir_name:
+        try:
+            repo = init_bare_repository(Path(tmp_dir_name) / f"{get_repository_name(location)}.git", location)
+            fetch_refs(repo, list(dict.fromkeys(refs)), get_settings().git_depth)
+            yield repo, [resolve_ref(repo, ref) for ref in refs]
+        finally:
+            # Stop GitPython's persistent git processes before the directory is removed
+            if repo is not None:
+                repo.close()
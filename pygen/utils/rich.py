@@ -2,16 +2,17 @@
 Rich console output utilities.
 """
 
-from typing import Tuple
+from typing import TYPE_CHECKING, Tuple
 
-from rich.panel import Panel
-from rich.progress import BarColumn, ProgressColumn, TaskProgressColumn, TextColumn, TimeRemainingColumn
-from rich.table import Table
+if TYPE_CHECKING:
+    from rich.panel import Panel
+    from rich.progress import ProgressColumn
+    from rich.table import Table
 
 PYDEV = "[bold][aquamarine3]PyDev[/aquamarine3][/bold]"
 
 
-def success_panel(message: str, title: str = "Success") -> Panel:
+def success_panel(message: str, title: str = "Success") -> "Panel":
     """
     Create a success panel.
 
@@ -22,10 +23,12 @@ def success_panel(message: str, title: str = "Success") -> Panel:
     Returns:
         A success panel.
     """
+    from rich.panel import Panel
+
     return Panel(message, title=title, title_align="left", border_style="green3")
 
 
-def warning_panel(message: str, title: str = "Warning") -> Panel:
+def warning_panel(message: str, title: str = "Warning") -> "Panel":
     """
     Create a warning panel.
 
@@ -36,10 +39,12 @@ def warning_panel(message: str, title: str = "Warning") -> Panel:
     Returns:
         A warning panel.
     """
+    from rich.panel import Panel
+
     return Panel(message, title=title, title_align="left", border_style="dark_orange")
 
 
-def error_panel(message: str, title: str = "Error") -> Panel:
+def error_panel(message: str, title: str = "Error") -> "Panel":
     """
     Create an error panel.
 
@@ -50,10 +55,12 @@ def error_panel(message: str, title: str = "Error") -> Panel:
     Returns:
         An error panel.
     """
+    from rich.panel import Panel
+
     return Panel(message, title=title, title_align="left", border_style="red")
 
 
-def prompt_panel(message: str, title: str = "Prompt") -> Panel:
+def prompt_panel(message: str, title: str = "Prompt") -> "Panel":
     """Create a prompt panel with a customisable message and title.
 
     This function generates a Panel object with the provided message and title. The panel is styled with a cyan border
@@ -67,12 +74,14 @@ def prompt_panel(message: str, title: str = "Prompt") -> Panel:
     Returns:
         A Panel object configured with the specified message and title.
     """
+    from rich.panel import Panel
+
     longest_line_length = max(len(line) for line in message.split("\n"))
     panel_width = min(longest_line_length + 4, 124)
     return Panel(message, title="Prompt", title_align="left", border_style="cyan", width=panel_width)
 
 
-def selection_panel(table: Table, title: str = "Select from list") -> Panel:
+def selection_panel(table: "Table", title: str = "Select from list") -> "Panel":
     """Create a Panel containing a Table with a customisable title.
 
     This function wraps the provided Table within a Panel, allowing for a visually appealing presentation of tabular
@@ -85,6 +94,8 @@ def selection_panel(table: Table, title: str = "Select from list") -> Panel:
     Returns:
         A Panel object containing the provided Table, with the specified title and styling.
     """
+    from rich.panel import Panel
+
     return Panel(table, title=title, title_align="left", border_style="bright_magenta")
 
 
@@ -114,13 +125,15 @@ def format_entity(entity_name: str) -> str:
     return f"[light_pink3]{entity_name}[/light_pink3]"
 
 
-def get_default_columns() -> Tuple[ProgressColumn, ...]:
+def get_default_columns() -> Tuple["ProgressColumn", ...]:
     """
     Get the default progress columns.
 
     Returns:
         The default progress columns.
     """
+    from rich.progress import BarColumn, TaskProgressColumn, TextColumn, TimeRemainingColumn
+
     return (
         TextColumn("[bold]{task.description}", justify="left"),
         BarColumn(bar_width=None),
@@ -0,0 +1,73 @@
+"""
+Span-based source extraction.
+
+Symbols are extracted by slicing their byte span out of a memory-mapped source file rather than by re-serialising the
+AST, so comments and formatting are preserved and the cost is proportional to the size of the symbol, not the file.
+"""
+
+import mmap
+import textwrap
+from pathlib import Path
+from typing import Optional
+
+from pygen.utils.parsing import ByteSpan
+
+
+def read_span(file_path: Path, span: ByteSpan, exclude: Optional[ByteSpan] = None) -> bytes:
+    """
+    Read a byte range from a file through a read-only memory map, optionally cutting out a nested range.
+
+    Args:
+        file_path: The path of the file.
+        span: The byte range to read.
+        exclude: A byte range within the span to cut out, such as a docstring.
+
+    Returns:
+        The bytes of the span.
+    """
+    start, end = span
+    if end <= start:
+        return b""
+
+    with file_path.open("rb") as file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+        if exclude is None:
+            return mapped[start:end]
+        return mapped[start : exclude[0]] + mapped[exclude[1] : end]
+
+
+def extract_source(
+    file_path: Path, span: ByteSpan, docstring_span: Optional[ByteSpan] = None, strip: bool = False
+) -> str:
+    """
+    Extract the dedented source of a symbol from its byte span, optionally stripping its docstring.
+
+    Args:
+        file_path: The path of the module containing the symbol.
+        span: The byte span of the symbol.
+        docstring_span: The byte range of the symbol's docstring, if it has one.
+        strip: Whether to strip the docstring.
+
+    Returns:
+        The source of the symbol.
+    """
+    exclude = docstring_span if strip else None
+    source = read_span(file_path, span, exclude).decode("utf-8")
+    return textwrap.dedent(source)
+
+
+def extract_module_source(file_path: Path, docstring_span: Optional[ByteSpan] = None, strip: bool = False) -> str:
+    """
+    Read the source of a module, optionally stripping its docstring by cutting out its byte range.
+
+    Args:
+        file_path: The path of the module.
+        docstring_span: The byte range of the module docstring, if it has one.
+        strip: Whether to strip the docstring.
+
+    Returns:
+        The source of the module.
+    """
+    source = file_path.read_bytes()
+    if strip and docstring_span is not None:
+        source = source[: docstring_span[0]] + source[docstring_span[1] :]
+    return source.decode("utf-8")
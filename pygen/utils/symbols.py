@@ -0,0 +1,210 @@
+"""
+Compact symbol records and the table that holds them.
+"""
+
+from collections import defaultdict
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from pygen.utils.parsing import ByteSpan, SymbolInfo
+
+# Symbol kinds. Interned so that records share a single string per kind.
+CLASS = "class"
+FUNCTION = "function"
+METHOD = "method"
+NESTED = "nested"
+KINDS = {kind: kind for kind in (CLASS, FUNCTION, METHOD, NESTED)}
+
+
+class Symbol:
+    """
+    A compact record of a class or function.
+
+    The module path is stored as an id into the owning symbol table's interned path list. Spans are stored as plain
+    integers, with -1 marking a missing docstring.
+    """
+
+    __slots__ = (
+        "path_id",
+        "name",
+        "qualname",
+        "kind",
+        "start_lineno",
+        "end_lineno",
+        "span_start",
+        "span_end",
+        "docstring_start",
+        "docstring_end",
+    )
+
+    def __init__(
+        self,
+        path_id: int,
+        name: str,
+        qualname: str,
+        kind: str,
+        start_lineno: int,
+        end_lineno: int,
+        span: ByteSpan,
+        docstring_span: Optional[ByteSpan] = None,
+    ) -> None:
+        self.path_id = path_id
+        self.name = name
+        self.qualname = qualname
+        self.kind = KINDS.get(kind, kind)
+        self.start_lineno = start_lineno
+        self.end_lineno = end_lineno
+        self.span_start, self.span_end = span
+        self.docstring_start, self.docstring_end = docstring_span if docstring_span else (-1, -1)
+
+    def __repr__(self) -> str:
+        return f"Symbol({self.qualname!r}, kind={self.kind!r}, lines={self.start_lineno}-{self.end_lineno})"
+
+    @classmethod
+    def from_info(cls, info: SymbolInfo, path_id: int = -1) -> "Symbol":
+        """Create a record from a parsed symbol."""
+        return cls(
+            path_id,
+            info.name,
+            info.qualname,
+            info.kind,
+            info.start_lineno,
+            info.end_lineno,
+            info.span,
+            info.docstring_span,
+        )
+
+    @property
+    def is_class(self) -> bool:
+        """Whether the symbol is a class."""
+        return self.kind == CLASS
+
+    @property
+    def span(self) -> ByteSpan:
+        """The byte span of the symbol."""
+        return self.span_start, self.span_end
+
+    @property
+    def docstring_span(self) -> Optional[ByteSpan]:
+        """The byte range of the symbol's docstring, if it has one."""
+        return (self.docstring_start, self.docstring_end) if self.docstring_start >= 0 else None
+
+    @property
+    def sort_key(self) -> Tuple[int, int]:
+        """Sort key ordering symbols by module path, then by position in the module."""
+        return self.path_id, self.start_lineno
+
+
+class SymbolTable:
+    """
+    A table of symbol records with interned module paths.
+
+    Path ids are assigned in sorted path order, so sorting records by ``sort_key`` orders them by path without
+    comparing strings. The records of each module are stored contiguously, in source order.
+
+    Symbols are also indexed by their qualified name, both on its own (``Class.method``, ``outer.<locals>.inner``) and
+    prefixed with the dotted name of their module (``package.module.Class.method``), so dotted names resolve with hash
+    lookups rather than a search of every module.
+    """
+
+    def __init__(self) -> None:
+        self.paths: List[Path] = []
+        self.module_names: List[str] = []
+        self.symbols: List[Symbol] = []
+        self._path_ids: Dict[Path, int] = {}
+        self._ranges: List[Tuple[int, int]] = []
+        self._qualified: Dict[str, List[Symbol]] = defaultdict(list)
+        self._qualnames: Dict[str, List[Symbol]] = defaultdict(list)
+
+    def __len__(self) -> int:
+        return len(self.symbols)
+
+    @classmethod
+    def build(cls, modules: Iterable[Tuple[Path, str, Iterable[Symbol]]]) -> "SymbolTable":
+        """
+        Build a table from the symbols of each module, adding the modules in sorted path order.
+
+        Args:
+            modules: The path, dotted module name and symbols of each module.
+
+        Returns:
+            The symbol table.
+        """
+        table = cls()
+        for path, module_name, symbols in sorted(modules, key=lambda m: m[0].as_posix()):
+            table.add_module(path, module_name, symbols)
+        return table
+
+    def add_module(self, path: Path, module_name: str, symbols: Iterable[Symbol]) -> None:
+        """Add a module and its symbols to the table, assigning them the module's path id and ordering them by span."""
+        path_id = len(self.paths)
+        self.paths.append(path)
+        self.module_names.append(module_name)
+        self._path_ids[path] = path_id
+        start = len(self.symbols)
+        for symbol in sorted(symbols, key=lambda s: s.span_start):
+            symbol.path_id = path_id
+            self.symbols.append(symbol)
+            self._qualnames[symbol.qualname].append(symbol)
+            self._qualified[self.full_name(symbol)].append(symbol)
+        self._ranges.append((start, len(self.symbols)))
+
+    def path_of(self, symbol: Symbol) -> Path:
+        """Return the module path of a symbol."""
+        return self.paths[symbol.path_id]
+
+    def full_name(self, symbol: Symbol) -> str:
+        """Return the qualified name of a symbol prefixed with its module's dotted name."""
+        module_name = self.module_names[symbol.path_id]
+        return f"{module_name}.{symbol.qualname}" if module_name else symbol.qualname
+
+    def resolve(self, dotted_name: str) -> List[Symbol]:
+        """
+        Resolve a dotted name to the symbols it refers to.
+
+        The name is first looked up as a fully qualified name, which several symbols can share, such as the getter and
+        setter of a property. Failing that, each split of the name into a module
+        suffix and a qualified name is tried in turn, longest qualified name first, so ``Class.method``,
+        ``module.Class.method`` and ``package.module.Class.method`` all resolve. Each attempt is a hash lookup.
+
+        Args:
+            dotted_name: The dotted name to resolve.
+
+        Returns:
+            Every matching symbol, in table order, or an empty list if there are none.
+        """
+        symbols = self._qualified.get(dotted_name)
+        if symbols:
+            return list(symbols)
+
+        parts = dotted_name.split(".")
+        for i in range(len(parts)):
+            module_suffix, qualname = ".".join(parts[:i]), ".".join(parts[i:])
+            matches = [
+                s
+                for s in self._qualnames.get(qualname, [])
+                if not module_suffix or f".{self.module_names[s.path_id]}".endswith(f".{module_suffix}")
+            ]
+            if matches:
+                return matches
+        return []
+
+    def symbols_in(self, path: Path) -> List[Symbol]:
+        """Return the symbols of a module, in source order."""
+        path_id = self._path_ids.get(path)
+        if path_id is None:
+            return []
+        start, end = self._ranges[path_id]
+        return self.symbols[start:end]
+
+    def classes(self) -> List[Symbol]:
+        """Return all classes, ordered by module path."""
+        return [s for s in self.symbols if s.is_class]
+
+    def functions(self) -> List[Symbol]:
+        """Return all functions, methods and nested functions, ordered by module path."""
+        return [s for s in self.symbols if not s.is_class]
+
+    def format_symbol(self, symbol: Symbol) -> str:
+        """Format a symbol for display as ``path:qualname()``."""
+        return f"{self.path_of(symbol)}:{symbol.qualname}()"
@@ -0,0 +1,54 @@
+"""
+Offline estimation of LLM token counts.
+
+The estimate splits text into runs of letters, digits, whitespace and punctuation and charges each run by its length,
+approximating the byte-pair tokenisers used by the models. It errs on the high side for source code, so that prompts
+which are budgeted to fit do fit.
+"""
+
+import re
+from functools import lru_cache
+
+# Runs of letters (with underscores and a leading space, which tokenisers merge into words), digits, whitespace, and
+# other characters
+TOKEN_PATTERN = re.compile(r" ?[^\W\d]+| ?\d+|\s+|[^\w\s]+")
+
+# Approximate number of characters per token for each kind of run
+LETTERS_PER_TOKEN = 4
+DIGITS_PER_TOKEN = 3
+SPACES_PER_TOKEN = 8
+SYMBOLS_PER_TOKEN = 2
+
+
+def count_tokens(text: str) -> int:
+    """
+    Estimate the number of tokens in a text.
+
+    Args:
+        text: The text.
+
+    Returns:
+        The estimated number of tokens.
+    """
+    tokens = 0
+    for match in TOKEN_PATTERN.finditer(text):
+        run = match.group()
+        last = run[-1]
+        if last.isspace():
+            tokens += -(-len(run) // SPACES_PER_TOKEN)
+            continue
+        run = run.lstrip(" ")
+        if last.isdigit():
+            per_token = DIGITS_PER_TOKEN
+        elif last.isalpha() or last == "_":
+            per_token = LETTERS_PER_TOKEN
+        else:
+            per_token = SYMBOLS_PER_TOKEN
+        tokens += -(-len(run) // per_token)
+    return tokens
+
+
+@lru_cache(maxsize=256)
+def estimate_tokens(text: str) -> int:
+    """Estimate the number of tokens in a text, remembering recent estimates so repeated prompts are not re-counted."""
+    return count_tokens(text)
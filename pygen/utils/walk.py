@@ -0,0 +1,364 @@
+"""
+Ignore-aware discovery of Python modules.
+
+Modules are listed with ``git ls-files`` when the project is inside a Git work tree, or otherwise by an ``os.scandir``
+walker that honours ``.gitignore`` files, ``.git/info/exclude`` and PyGen's own exclude list, pruning ignored
+directories before descending into them.
+"""
+
+import os
+import re
+import shutil
+import subprocess  # nosec B404
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional, Pattern, Tuple
+
+from pygen.utils.log import get_logger
+
+logger = get_logger(__name__)
+
+# Paths that are never project modules, in .gitignore syntax
+DEFAULT_EXCLUDES = [
+    ".git/",
+    ".hg/",
+    ".svn/",
+    ".pygen/",
+    ".venv/",
+    "venv/",
+    ".env/",
+    ".tox/",
+    ".nox/",
+    "__pycache__/",
+    ".mypy_cache/",
+    ".pytest_cache/",
+    ".ruff_cache/",
+    "node_modules/",
+    "site-packages/",
+    "build/",
+    "dist/",
+    "*.egg-info/",
+]
+
+# Project-specific excludes, in .gitignore syntax, read from the project root
+PYGEN_IGNORE_FILE = ".pygenignore"
+
+
+class IgnoreRule(NamedTuple):
+    """A single compiled .gitignore pattern."""
+
+    regex: Pattern[str]
+    negated: bool
+    dir_only: bool
+
+
+def translate_pattern(pattern: str) -> str:
+    """Translate the body of a .gitignore glob pattern into a regular expression."""
+    result = []
+    i = 0
+    while i < len(pattern):
+        char = pattern[i]
+        if pattern.startswith("**/", i):
+            result.append("(?:.*/)?")
+            i += 3
+            continue
+        if pattern.startswith("**", i):
+            result.append(".*")
+            i += 2
+            continue
+        if char == "*":
+            result.append("[^/]*")
+        elif char == "?":
+            result.append("[^/]")
+        elif char == "[":
+            end = pattern.find("]", i + 2)
+            if end == -1:
+                result.append(re.escape(char))
+            else:
+                body = pattern[i + 1 : end]
+                if body.startswith("!"):
+                    body = "^" + body[1:]
+                result.append(f"[{body}]")
+                i = end
+        elif char == "\\" and i + 1 < len(pattern):
+            i += 1
+            result.append(re.escape(pattern[i]))
+        else:
+            result.append(re.escape(char))
+        i += 1
+    return "".join(result)
+
+
+def compile_rule(line: str) -> Optional[IgnoreRule]:
+    """
+    Compile a line of a .gitignore file into a rule.
+
+    Args:
+        line: The line, without its trailing newline.
+
+    Returns:
+        The rule, or None if the line is blank or a comment.
+    """
+    line = line.rstrip()
+    if not line or line.startswith("#"):
+        return None
+
+    negated = line.startswith("!")
+    if negated:
+        line = line[1:]
+    elif line.startswith("\\"):
+        line = line[1:]
+
+    dir_only = line.endswith("/")
+    line = line.rstrip("/")
+    if not line:
+        return None
+
+    # Patterns containing a separator are anchored to the directory of the ignore file, others match at any depth
+    anchored = "/" in line
+    body = translate_pattern(line.lstrip("/"))
+    regex = body if anchored else f"(?:.*/)?{body}"
+    return IgnoreRule(re.compile(regex), negated, dir_only)
+
+
+class IgnoreSpec:
+    """
+    The rules of one ignore file.
+
+    Paths are matched relative to the walk root. A spec from a directory below the walk root has that directory as its
+    ``base`` and only applies to paths beneath it. A spec from a directory above the walk root has the walk root's path
+    from that directory as its ``prefix``.
+    """
+
+    def __init__(self, rules: List[IgnoreRule], base: str = "", prefix: str = "") -> None:
+        self.rules = rules
+        self.base = base
+        self.prefix = prefix
+
+    @classmethod
+    def from_lines(cls, lines: Iterable[str], base: str = "", prefix: str = "") -> "IgnoreSpec":
+        """Create a spec from .gitignore lines."""
+        rules = [rule for rule in (compile_rule(line) for line in lines) if rule is not None]
+        return cls(rules, base, prefix)
+
+    @classmethod
+    def from_file(cls, file_path: Path, base: str = "", prefix: str = "") -> Optional["IgnoreSpec"]:
+        """Create a spec from an ignore file, or return None if it does not exist or has no rules."""
+        try:
+            lines = file_path.read_text(encoding="utf-8", errors="replace").splitlines()
+        except OSError:
+            return None
+        spec = cls.from_lines(lines, base, prefix)
+        return spec if spec.rules else None
+
+    def match(self, rel_path: str, is_dir: bool) -> Optional[bool]:
+        """
+        Match a path against the rules.
+
+        Args:
+            rel_path: The POSIX path relative to the walk root.
+            is_dir: Whether the path is a directory.
+
+        Returns:
+            True if the path is ignored, False if it is explicitly re-included, or None if no rule matches.
+        """
+        if self.base:
+            if not rel_path.startswith(self.base + "/"):
+                return None
+            rel_path = rel_path[len(self.base) + 1 :]
+        elif self.prefix:
+            rel_path = f"{self.prefix}/{rel_path}"
+
+        result = None
+        for rule in self.rules:
+            if rule.dir_only and not is_dir:
+                continue
+            if rule.regex.fullmatch(rel_path):
+                result = not rule.negated
+        return result
+
+
+def is_ignored(specs: List[IgnoreSpec], rel_path: str, is_dir: bool) -> bool:
+    """Check a path against a stack of specs, where later (deeper) specs take precedence."""
+    ignored = False
+    for spec in specs:
+        result = spec.match(rel_path, is_dir)
+        if result is not None:
+            ignored = result
+    return ignored
+
+
+def find_git_root(path: Path) -> Optional[Path]:
+    """Return the root of the Git work tree containing the path, if any."""
+    path = path.resolve()
+    for candidate in (path, *path.parents):
+        if (candidate / ".git").exists():
+            return candidate
+    return None
+
+
+def get_exclude_specs(project_root: Path) -> List[IgnoreSpec]:
+    """Get PyGen's exclude specs: the default excludes and the project's .pygenignore file."""
+    specs = [IgnoreSpec.from_lines(DEFAULT_EXCLUDES)]
+    project_spec = IgnoreSpec.from_file(project_root / PYGEN_IGNORE_FILE)
+    if project_spec is not None:
+        specs.append(project_spec)
+    return specs
+
+
+def get_git_specs(project_root: Path, git_root: Path) -> List[IgnoreSpec]:
+    """
+    Get the Git ignore specs that apply at the project root.
+
+    These are ``.git/info/exclude`` and the .gitignore files of the Git root and of every directory down to, but not
+    including, the project root. The .gitignore files of the project root and the directories below it are picked up
+    during the walk.
+    """
+    resolved_root = project_root.resolve()
+    directories = [p for p in reversed(resolved_root.parents) if p == git_root or git_root in p.parents]
+    ignore_files = [(git_root / ".git" / "info" / "exclude", git_root)]
+    ignore_files += [(d / ".gitignore", d) for d in directories]
+
+    specs = []
+    for ignore_file, directory in ignore_files:
+        prefix = resolved_root.relative_to(directory).as_posix()
+        spec = IgnoreSpec.from_file(ignore_file, prefix="" if prefix == "." else prefix)
+        if spec is not None:
+            specs.append(spec)
+    return specs
+
+
+def scan_directory(directory: Path, rel_dir: str, specs: List[IgnoreSpec]) -> Tuple[List[Path], List[Tuple[Path, str]]]:
+    """
+    List the Python files and the subdirectories of a directory that are not ignored, so ignored subdirectories are
+    pruned before they are entered.
+
+    Args:
+        directory: The directory.
+        rel_dir: The POSIX path of the directory relative to the walk root.
+        specs: The ignore specs that apply to the directory.
+
+    Returns:
+        The paths of the Python files, and the paths of the subdirectories with their POSIX paths relative to the walk
+        root. Both are empty if the directory cannot be read.
+    """
+    python_files: List[Path] = []
+    subdirectories: List[Tuple[Path, str]] = []
+    try:
+        entries = list(os.scandir(directory))
+    except OSError as e:
+        logger.debug(f"Could not scan {directory}: {e}")
+        return python_files, subdirectories
+
+    for entry in entries:
+        rel_path = f"{rel_dir}/{entry.name}" if rel_dir else entry.name
+        try:
+            is_dir = entry.is_dir(follow_symlinks=False)
+        except OSError:
+            continue
+
+        if is_ignored(specs, rel_path, is_dir):
+            continue
+
+        if is_dir:
+            subdirectories.append((directory / entry.name, rel_path))
+        elif entry.name.endswith(".py"):
+            python_files.append(directory / entry.name)
+    return python_files, subdirectories
+
+
+def scan_python_files(project_root: Path, specs: List[IgnoreSpec]) -> Iterator[Path]:
+    """
+    Walk a directory tree with ``os.scandir``, yielding Python files that are not ignored.
+
+    Ignored directories are pruned before they are entered. Each directory's .gitignore file applies to its subtree.
+    Symbolic links to directories are not followed.
+
+    Args:
+        project_root: The root directory of the walk.
+        specs: The ignore specs that apply to the whole walk.
+
+    Yields:
+        The paths of the Python files, below the project root.
+    """
+    stack: List[Tuple[Path, str, List[IgnoreSpec]]] = [(project_root, "", specs)]
+
+    while stack:
+        directory, rel_dir, dir_specs = stack.pop()
+
+        spec = IgnoreSpec.from_file(directory / ".gitignore", base=rel_dir)
+        if spec is not None:
+            dir_specs = [*dir_specs, spec]
+
+        python_files, subdirectories = scan_directory(directory, rel_dir, dir_specs)
+        yield from python_files
+        stack.extend((path, rel_path, dir_specs) for path, rel_path in reversed(subdirectories))
+
+
+def git_ls_python_files(project_root: Path) -> Optional[List[str]]:
+    """
+    List the tracked and untracked, non-ignored Python files below the project root with ``git ls-files``.
+
+    Returns:
+        The POSIX paths of the files relative to the project root, or None if Git is unavailable or fails.
+    """
+    git = shutil.which("git")
+    if git is None:
+        return None
+
+    try:
+        result = subprocess.run(  # nosec B603
+            [git, "ls-files", "--cached", "--others", "--exclude-standard", "-z", "--", "*.py"],
+            cwd=project_root,
+            capture_output=True,
+            check=True,
+        )
+    except (OSError, subprocess.CalledProcessError) as e:
+        logger.debug(f"git ls-files failed in {project_root}: {e}")
+        return None
+
+    paths = result.stdout.decode("utf-8", errors="surrogateescape").split("\0")
+    return list(dict.fromkeys(p for p in paths if p))
+
+
+def filter_excluded(rel_paths: Iterable[str], specs: List[IgnoreSpec]) -> Iterator[str]:
+    """Filter out paths that are excluded themselves or that lie in an excluded directory."""
+    excluded_dirs: Dict[str, bool] = {"": False}
+
+    def dir_excluded(rel_dir: str) -> bool:
+        if rel_dir not in excluded_dirs:
+            parent = rel_dir.rpartition("/")[0]
+            excluded_dirs[rel_dir] = dir_excluded(parent) or is_ignored(specs, rel_dir, True)
+        return excluded_dirs[rel_dir]
+
+    for rel_path in rel_paths:
+        if not dir_excluded(rel_path.rpartition("/")[0]) and not is_ignored(specs, rel_path, False):
+            yield rel_path
+
+
+def walk_python_files(project_root: Path, use_git: bool = True) -> Iterator[Path]:
+    """
+    Yield the Python files of a project, skipping ignored and excluded paths.
+
+    Inside a Git work tree the file list is taken from ``git ls-files`` when ``use_git`` is set. Otherwise, or if Git
+    fails, the tree is walked with ``os.scandir``, honouring .gitignore files and ``.git/info/exclude``. PyGen's
+    default excludes and the project's .pygenignore file are applied in both cases.
+
+    Args:
+        project_root: The root directory of the project.
+        use_git: Whether to take the file list from Git when possible.
+
+    Yields:
+        The paths of the Python files, below the project root.
+    """
+    exclude_specs = get_exclude_specs(project_root)
+    git_root = find_git_root(project_root)
+
+    if git_root is not None and use_git:
+        rel_paths = git_ls_python_files(project_root)
+        if rel_paths is not None:
+            for rel_path in filter_excluded(rel_paths, exclude_specs):
+                yield project_root / rel_path
+            return
+
+    git_specs = get_git_specs(project_root, git_root) if git_root is not None else []
+    yield from scan_python_files(project_root, git_specs + exclude_specs)
@@ -0,0 +1,76 @@
+from pathlib import Path
+from typing import Iterator, List
+
+import git
+import pytest
+
+from pygen.llm import cache, limits, metrics
+from pygen.llm.backends.base import LLMRequest, LLMResponse
+from pygen.llm.client import LLMClient
+from pygen.llm.stream import StopReason, StreamEvent, TextDelta
+from pygen.utils import config
+
+
+@pytest.fixture(autouse=True)
+def settings(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> Iterator[config.Settings]:
+    """Isolate each test's settings and process-wide state, with the fake LLM backend and a fresh response cache."""
+    monkeypatch.setenv("PYGEN_LLM_BACKEND", "fake")
+    monkeypatch.setenv("PYGEN_CACHE_DIR", str(tmp_path / "cache"))
+    monkeypatch.setenv("PYGEN_GIT_CACHE_DIR", str(tmp_path / "git-cache"))
+    monkeypatch.setenv("PYGEN_LLM_REQUESTS_PER_MINUTE", "0")
+    monkeypatch.setenv("PYGEN_LLM_TOKENS_PER_MINUTE", "0")
+    monkeypatch.setenv("PYGEN_LLM_PREWARM", "false")
+    monkeypatch.setattr(config, "_SETTINGS", None)
+    monkeypatch.setattr(limits, "_RATE_LIMITER", None)
+    monkeypatch.setattr(metrics, "_METRICS", None)
+    monkeypatch.setattr(cache, "_RESPONSE_CACHE", None)
+    yield config.get_settings()
+    if cache._RESPONSE_CACHE is not None:
+        cache._RESPONSE_CACHE.close()
+
+
+@pytest.fixture
+def repo(tmp_path: Path) -> git.Repo:
+    """A repository with one commit of three text files."""
+    repo = git.Repo.init(tmp_path / "repo")
+    with repo.config_writer() as writer:
+        writer.set_value("user", "name", "Test")
+        writer.set_value("user", "email", "test@example.com")
+    root = Path(repo.working_dir)
+    (root / "a.txt").write_text("alpha\n")
+    (root / "b.txt").write_text("beta\n")
+    (root / "c.txt").write_text("gamma\n")
+    repo.index.add(["a.txt", "b.txt", "c.txt"])
+    repo.index.commit("Initial commit")
+    return repo
+
+
+class EchoBackend:
+    """A backend that answers each prompt with the first line of its content, recording the requests."""
+
+    name = "echo"
+    model_id = "echo-model"
+    api_version = "1"
+
+    def __init__(self) -> None:
+        self.requests: List[LLMRequest] = []
+
+    def respond(self, request: LLMRequest) -> str:
+        self.requests.append(request)
+        return request.prompt.splitlines()[0]
+
+    def invoke(self, request: LLMRequest) -> LLMResponse:
+        return LLMResponse(self.respond(request))
+
+    def stream(self, request: LLMRequest) -> Iterator[StreamEvent]:
+        yield TextDelta(self.respond(request))
+        yield StopReason("end_turn")
+
+    def prewarm(self, connections: int) -> None:
+        pass
+
+
+@pytest.fixture
+def echo_client() -> LLMClient:
+    """An LLM client whose backend echoes the first line of each prompt's content."""
+    return LLMClient(EchoBackend())
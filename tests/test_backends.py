@@ -0,0 +1,100 @@
+import http.client
+import json
+import pickle
+from typing import Dict, Iterator
+
+import pytest
+
+from pygen.llm.backends.base import BackendError, LLMRequest
+from pygen.llm.backends.fake import FakeServer
+from pygen.llm.backends.openai import OpenAIBackend
+from pygen.llm.stream import StopReason, TextDelta, Usage
+from pygen.prompts.prompt import Prompt
+
+
+@pytest.fixture
+def server() -> Iterator[FakeServer]:
+    server = FakeServer(responses=["One two three four five six."])
+    server.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def post(server: FakeServer, body: bytes, headers: Dict[str, str]) -> http.client.HTTPResponse:
+    """Send a raw chat completion request to a fake server."""
+    host, port = server.server_address[:2]
+    connection = http.client.HTTPConnection(str(host), port)
+    connection.putrequest("POST", "/v1/chat/completions")
+    for name, value in headers.items():
+        connection.putheader(name, value)
+    connection.endheaders(body)
+    return connection.getresponse()
+
+
+@pytest.mark.parametrize(
+    "body, headers",
+    [
+        (b'{"messages": []}', {"Content-Length": "16"}),
+        (b'{"model": "fake"}', {"Content-Length": "17"}),
+        (b'{"messages": ["hello"]}', {"Content-Length": "23"}),
+        (b"not json", {"Content-Length": "8"}),
+        (b"{}", {"Content-Length": "many"}),
+        (b"{}", {"Content-Length": "-1"}),
+    ],
+)
+def test_fake_server_rejects_invalid_requests(server: FakeServer, body: bytes, headers: Dict[str, str]) -> None:
+    response = post(server, body, headers)
+
+    assert response.status == 400
+    assert "error" in json.loads(response.read())
+
+
+def test_openai_backend_invokes_and_streams(server: FakeServer) -> None:
+    backend = OpenAIBackend(server.base_url, "fake")
+    request = LLMRequest.from_prompt(Prompt("Instructions", "Content"), max_tokens=3)
+
+    response = backend.invoke(request)
+    events = list(backend.stream(request))
+
+    assert response.text == "One two three "
+    assert response.stop == StopReason("length")
+    assert [event.text for event in events if isinstance(event, TextDelta)] == ["One ", "two ", "three "]
+    assert StopReason("length") in events
+    assert any(isinstance(event, Usage) and event.output_tokens == 3 for event in events)
+
+
+def test_openai_backend_reports_injected_throttling(server: FakeServer) -> None:
+    server.throttle_rate = 1.0
+    backend = OpenAIBackend(server.base_url, "fake")
+
+    with pytest.raises(BackendError) as error:
+        backend.invoke(LLMRequest("Hello", max_tokens=10))
+
+    assert error.value.throttled
+    assert "HTTP 429" in str(error.value)
+
+
+def test_openai_backend_reports_dropped_streams(server: FakeServer) -> None:
+    server.drop_rate = 1.0
+    backend = OpenAIBackend(server.base_url, "fake")
+
+    with pytest.raises(BackendError, match="ended before the response was complete"):
+        list(backend.stream(LLMRequest("Hello", max_tokens=10)))
+
+
+def test_backend_error_keeps_its_arguments() -> None:
+    error = pickle.loads(pickle.dumps(BackendError("Throttled", throttled=True)))
+
+    assert str(error) == "Throttled"
+    assert error.throttled
+
+
+def test_requests_keep_the_instructions_of_prompts_apart() -> None:
+    prompt = Prompt("Instructions", "Content")
+
+    assert LLMRequest.from_prompt(prompt, 10) == LLMRequest("Content", 10, instructions="Instructions")
+    assert LLMRequest.from_prompt("Text", 10) == LLMRequest("Text", 10)
+    assert str(prompt) == prompt.text == "Instructions\nContent"
+    with pytest.raises(AttributeError):
+        prompt.strip()  # type: ignore[attr-defined]
@@ -0,0 +1,61 @@
+import pickle
+
+import pytest
+
+from pygen.llm.budget import (
+    FRAMING_TOKENS,
+    MAX_OUTPUT_TOKENS,
+    MIN_OUTPUT_TOKENS,
+    PromptTooLargeError,
+    get_output_tokens,
+    plan_prompt,
+)
+from pygen.prompts.prompt import Prompt
+from pygen.utils.tokens import estimate_tokens
+
+
+@pytest.mark.parametrize(
+    "command, tokens",
+    [
+        ("", MAX_OUTPUT_TOKENS),
+        ("git commit", 512),
+        ("generate docstring module", 1024),
+        ("generate module", MAX_OUTPUT_TOKENS),
+        ("explain function", 2048),
+        ("unknown", MAX_OUTPUT_TOKENS),
+    ],
+)
+def test_output_tokens_of_the_longest_matching_command(command: str, tokens: int) -> None:
+    assert get_output_tokens(command) == tokens
+
+
+def test_plan_prompt_shrinks_the_output_to_fit() -> None:
+    prompt = "Review this function. " * 50
+    input_tokens = estimate_tokens(prompt)
+
+    assert plan_prompt(prompt, "git commit").max_tokens == 512
+    budget = plan_prompt(prompt, "review", context_window=input_tokens + 1000)
+
+    assert budget.input_tokens == input_tokens
+    assert budget.max_tokens == 1000
+    assert budget.total_tokens == input_tokens + 1000
+
+
+def test_plan_prompt_rejects_prompts_too_large() -> None:
+    prompt = "Review this function. " * 50
+    context_window = estimate_tokens(prompt) + MIN_OUTPUT_TOKENS - 1
+
+    with pytest.raises(PromptTooLargeError) as error:
+        plan_prompt(prompt, "review function", context_window=context_window)
+
+    assert "'review function' is too large" in str(error.value)
+    assert str(pickle.loads(pickle.dumps(error.value))) == str(error.value)
+
+
+def test_plan_prompt_uses_known_source_token_counts() -> None:
+    prompt = Prompt("Review this module.", "Module Code:\n\n" + "x = 1\n" * 1000)
+
+    budget = plan_prompt(prompt, "review module", source_tokens=10)
+
+    assert budget.input_tokens == estimate_tokens(prompt.instructions) + 10 + FRAMING_TOKENS
+    assert plan_prompt(prompt, "review module").input_tokens == estimate_tokens(prompt.text)
@@ -0,0 +1,76 @@
+import time
+from pathlib import Path
+
+import pytest
+
+from pygen.llm.cache import ResponseCache, get_response_cache, response_key
+from pygen.utils.config import Settings
+
+
+def test_response_key_covers_every_field() -> None:
+    key = response_key("model", "1", 100, "prompt")
+
+    assert len(key) == 64
+    assert key == response_key("model", "1", 100, "prompt")
+    assert key not in {
+        response_key("other", "1", 100, "prompt"),
+        response_key("model", "2", 100, "prompt"),
+        response_key("model", "1", 200, "prompt"),
+        response_key("model", "1", 100, "other"),
+    }
+
+
+def test_cache_stores_and_persists_responses(tmp_path: Path) -> None:
+    cache = ResponseCache(tmp_path / "responses.sqlite", max_bytes=1000)
+    cache.put("key", "Response")
+    cache.close()
+
+    reopened = ResponseCache(tmp_path / "responses.sqlite", max_bytes=1000)
+
+    assert reopened.get("key") == "Response"
+    assert reopened.get("missing") is None
+    reopened.clear()
+    assert reopened.get("key") is None
+    reopened.close()
+
+
+def test_cache_evicts_least_recently_used_responses(tmp_path: Path) -> None:
+    cache = ResponseCache(tmp_path / "responses.sqlite", max_bytes=10)
+    cache.put("a", "aaaa")
+    time.sleep(0.01)
+    cache.put("b", "bbbb")
+    time.sleep(0.01)
+    assert cache.get("a") == "aaaa"
+    time.sleep(0.01)
+
+    cache.put("c", "cccc")
+    cache.put("large", "x" * 11)
+
+    assert [cache.get(key) for key in ("a", "b", "c", "large")] == ["aaaa", None, "cccc", None]
+    cache.close()
+
+
+def test_cache_expires_responses(tmp_path: Path) -> None:
+    cache = ResponseCache(tmp_path / "responses.sqlite", max_bytes=1000, ttl=-1)
+    cache.put("key", "Response")
+
+    assert cache.get("key") is None
+    cache.close()
+
+
+def test_cache_can_be_disabled(settings: Settings, monkeypatch: pytest.MonkeyPatch) -> None:
+    assert get_response_cache() is get_response_cache()
+
+    monkeypatch.setattr(settings, "cache", False)
+
+    assert get_response_cache() is None
+
+
+def test_cache_is_disabled_when_its_directory_cannot_be_created(tmp_path: Path) -> None:
+    (tmp_path / "file").write_text("")
+    cache = ResponseCache(tmp_path / "file" / "responses.sqlite", max_bytes=1000)
+
+    cache.put("key", "Response")
+
+    assert cache.disabled
+    assert cache.get("key") is None
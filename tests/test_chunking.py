@@ -0,0 +1,68 @@
+from pygen.utils.chunking import chunk_diff, chunk_module, join_labels, split_lines
+from pygen.utils.tokens import estimate_tokens
+
+
+def make_diff(path: str, hunks: int, lines: int) -> str:
+    """Make the Git patch of a file with a number of hunks, each adding a number of lines."""
+    text = f"diff --git a/{path} b/{path}\n--- a/{path}\n+++ b/{path}\n"
+    for hunk in range(hunks):
+        text += f"@@ -{hunk * 100},0 +{hunk * 100},{lines} @@\n"
+        text += "".join(f"+value_{hunk}_{line} = compute_value({hunk}, {line})\n" for line in range(lines))
+    return text
+
+
+def test_small_files_share_a_chunk() -> None:
+    diff = make_diff("a.py", 1, 2) + make_diff("b.py", 1, 2)
+
+    chunks = chunk_diff(diff, max_tokens=1000)
+
+    assert [chunk.label for chunk in chunks] == ["a.py to b.py"]
+    assert chunks[0].text == diff
+
+
+def test_large_files_are_split_by_hunk_with_their_header() -> None:
+    diff = make_diff("big.py", 4, 20) + make_diff("small.py", 1, 1)
+    hunk_tokens = estimate_tokens(make_diff("big.py", 1, 20))
+
+    chunks = chunk_diff(diff, max_tokens=hunk_tokens + 10)
+
+    assert [chunk.label for chunk in chunks] == [f"big.py hunk {n}" for n in range(1, 5)] + ["small.py"]
+    assert all(chunk.text.startswith("diff --git a/big.py b/big.py\n") for chunk in chunks[:-1])
+    assert all(chunk.tokens <= hunk_tokens + 10 for chunk in chunks)
+
+
+def test_split_lines_cuts_lines_too_long_for_a_chunk() -> None:
+    chunks = split_lines("data.json", "short\n" + "x" * 100 + "\nend\n", max_tokens=10)
+
+    assert [chunk.label for chunk in chunks] == ["data.json lines 1-1"] + ["data.json line 2"] * 6 + [
+        "data.json lines 3-3"
+    ]
+    assert "".join(chunk.text for chunk in chunks) == "short\n" + "x" * 100 + "\nend\n"
+
+
+def test_join_labels_merges_line_ranges() -> None:
+    assert join_labels("mod.py lines 1-10", "mod.py lines 11-20") == "mod.py lines 1-20"
+    assert join_labels("mod.py line 5", "mod.py lines 6-9") == "mod.py lines 5-9"
+    assert join_labels("a.py", "b.py") == "a.py to b.py"
+
+
+def test_modules_are_split_along_statements() -> None:
+    methods = "".join(f"    def method_{n}(self):\n        return {n}\n\n" for n in range(20))
+    source = f"import os\n\n\n@decorator\nclass Large:\n{methods}\n# A comment\ndef last():\n    pass\n"
+    lines = source.splitlines(keepends=True)
+
+    chunks = chunk_module(source, max_tokens=100, label="mod.py")
+
+    assert len(chunks) > 2
+    assert all(chunk.tokens <= 100 for chunk in chunks)
+    assert chunks[0].label.startswith("mod.py lines 1-")
+    assert all(chunk.text.startswith("@decorator\nclass Large:\n") for chunk in chunks[1:-1])
+    assert chunks[-1].text.endswith("# A comment\ndef last():\n    pass\n")
+    assert len(lines) == int(chunks[-1].label.split("-")[-1])
+
+
+def test_unparseable_modules_are_split_by_lines() -> None:
+    chunks = chunk_module("def broken(:\n" * 50, max_tokens=50, label="broken.py")
+
+    assert len(chunks) > 1
+    assert all(chunk.label.startswith("broken.py lines ") for chunk in chunks)
@@ -0,0 +1,43 @@
+from typing import Iterator, List
+
+from pygen.llm.backends.base import BackendError, LLMRequest, LLMResponse
+from pygen.llm.client import LLMClient
+from pygen.llm.stream import StopReason, StreamEvent, TextDelta, Usage
+
+
+class FlakyBackend:
+    """A backend whose first stream fails part way through, after sending text that ends in whitespace."""
+
+    name = "flaky"
+    model_id = "flaky-model"
+    api_version = "1"
+
+    def __init__(self) -> None:
+        self.requests: List[LLMRequest] = []
+
+    def invoke(self, request: LLMRequest) -> LLMResponse:
+        raise NotImplementedError
+
+    def stream(self, request: LLMRequest) -> Iterator[StreamEvent]:
+        self.requests.append(request)
+        if len(self.requests) == 1:
+            yield TextDelta("Hello ")
+            yield Usage(10, 1)
+            raise BackendError("Connection reset")
+        yield TextDelta(" world")
+        yield Usage(12, 1)
+        yield StopReason("end_turn")
+
+    def prewarm(self, connections: int) -> None:
+        pass
+
+
+def test_stream_resumes_from_the_received_text() -> None:
+    backend = FlakyBackend()
+    client = LLMClient(backend)
+
+    events = list(client.stream_events("Greet me", base_delay=0))
+
+    assert "".join(event.text for event in events if isinstance(event, TextDelta)) == "Hello world"
+    assert [request.prefill for request in backend.requests] == ["", "Hello"]
+    assert events[-1] == StopReason("end_turn")
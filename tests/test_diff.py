@@ -0,0 +1,105 @@
+import os
+from pathlib import Path
+
+import git
+
+from pygen.utils.diff import (
+    DiffOptions,
+    FileChange,
+    FileDiff,
+    budget_diff,
+    get_diff,
+    get_patch_header,
+    iter_file_diffs,
+    list_changes,
+    parse_patch,
+    quote_path,
+)
+from pygen.utils.tokens import count_tokens
+
+
+def test_type_change_does_not_shift_later_patches(repo: git.Repo) -> None:
+    root = Path(repo.working_dir)
+    (root / "a.txt").unlink()
+    os.symlink("b.txt", root / "a.txt")
+    (root / "c.txt").write_text("gamma\ndelta\n")
+    repo.git.add("a.txt", "c.txt")
+
+    changes = list_changes(repo, ["--cached"])
+    file_diffs = list(iter_file_diffs(repo, ["--cached"], changes))
+
+    assert [file_diff.change.path for file_diff in file_diffs] == ["a.txt", "c.txt"]
+    assert "-alpha" in file_diffs[0].patch and "+b.txt" in file_diffs[0].patch
+    assert "+delta" in file_diffs[1].patch and "b.txt" not in file_diffs[1].patch
+    diff = get_diff(repo, ["--cached"])
+    assert diff.index("diff --git a/c.txt b/c.txt") < diff.index("+delta")
+
+
+def test_skipped_files_are_not_diffed(repo: git.Repo) -> None:
+    root = Path(repo.working_dir)
+    (root / "poetry.lock").write_text("lock\n")
+    (root / "b.txt").write_text("beta\nbeta\n")
+    repo.git.add("poetry.lock", "b.txt")
+
+    diff = get_diff(repo, ["--cached"], DiffOptions(exclude=("*.md",)))
+
+    assert "+beta" in diff
+    assert "- poetry.lock (added, lockfile)" in diff
+    assert "diff --git a/poetry.lock" not in diff
+
+
+def test_unusual_paths_are_matched_to_their_patches(repo: git.Repo) -> None:
+    root = Path(repo.working_dir)
+    for name in ("with space.txt", 'quote".txt', "café.txt"):
+        (root / name).write_text(f"{name}\n")
+    repo.git.add(".")
+
+    changes = list_changes(repo, ["--cached"])
+    file_diffs = list(iter_file_diffs(repo, ["--cached"], changes))
+
+    assert sorted(file_diff.change.path for file_diff in file_diffs) == sorted(change.path for change in changes)
+    for file_diff in file_diffs:
+        assert f"+{file_diff.change.path}" in file_diff.patch
+
+
+def test_quote_path() -> None:
+    assert quote_path("a/b c.txt") == "a/b c.txt"
+    assert quote_path('a/"x"\t.txt') == '"a/\\"x\\"\\t.txt"'
+    assert quote_path("a/café") == '"a/caf\\303\\251"'
+
+
+def test_parse_patch_ignores_unmatched_sections() -> None:
+    change = FileChange("b.py", "b.py", "modified", "1" * 40, "2" * 40)
+    lines = [
+        b"diff --git a/unknown.py b/unknown.py\n",
+        b"@@ -1 +1 @@\n",
+        b"-x\n",
+        b"+y\n",
+        f"{get_patch_header(change)}\n".encode(),
+        b"index 1111111..2222222 100644\n",
+        b"--- a/b.py\n",
+        b"+++ b/b.py\n",
+        b"@@ -1 +1 @@\n",
+        b"-old\n",
+        b"+new\n",
+    ]
+
+    file_diffs = list(parse_patch(lines, [change]))
+
+    assert len(file_diffs) == 1
+    assert file_diffs[0].header == "diff --git a/b.py b/b.py\n--- a/b.py\n+++ b/b.py\n"
+    assert file_diffs[0].hunks == ["@@ -1 +1 @@\n-old\n+new\n"]
+
+
+def test_budget_diff_keeps_within_budget() -> None:
+    file_diffs = []
+    for index in range(20):
+        change = FileChange(f"m{index}.py", f"m{index}.py", "modified", "1" * 40, "2" * 40)
+        hunks = [f"@@ -{line},1 +{line},1 @@\n-" + "old " * 40 + "\n+" + "new " * 40 + "\n" for line in range(1, 6)]
+        file_diffs.append(FileDiff(change, f"diff --git a/m{index}.py b/m{index}.py\n", hunks))
+
+    diff = budget_diff(file_diffs, max_tokens=2000)
+
+    assert count_tokens(diff) <= 2000
+    assert "hunks omitted to fit the token budget" in diff
+    assert budget_diff(file_diffs) == "".join(file_diff.patch for file_diff in file_diffs)
@@ -0,0 +1,31 @@
+from pathlib import Path
+
+from pygen.utils.filelock import FileLock
+
+
+def test_exclusive_lock_excludes_other_holders(tmp_path: Path) -> None:
+    path = tmp_path / "locks" / "repo.lock"
+    other = FileLock(path)
+
+    with FileLock(path) as lock:
+        assert lock.locked
+        assert not other.acquire(blocking=False)
+        assert not other.locked
+
+    assert other.acquire(blocking=False)
+    other.release()
+    assert path.exists()
+
+
+def test_shared_locks_coexist_until_one_is_upgraded(tmp_path: Path) -> None:
+    path = tmp_path / "repo.lock"
+    first, second = FileLock(path), FileLock(path)
+
+    assert first.acquire(shared=True)
+    assert second.acquire(shared=True, blocking=False)
+    assert not first.acquire(blocking=False)
+    assert not first.locked
+
+    second.release()
+    assert first.acquire(blocking=False)
+    first.release()
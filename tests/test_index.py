@@ -0,0 +1,91 @@
+import os
+from pathlib import Path
+from typing import List
+
+from pygen.utils.index import SymbolIndex, load_symbol_index
+from pygen.utils.tokens import count_tokens
+
+
+def make_project(root: Path) -> List[Path]:
+    """Make a package with a module of functions and a module of a class."""
+    (root / "pkg").mkdir()
+    paths = [root / "pkg" / "__init__.py", root / "pkg" / "funcs.py", root / "pkg" / "models.py"]
+    paths[0].write_text('"""The package."""\n')
+    paths[1].write_text("def first():\n    pass\n\n\ndef second():\n    pass\n")
+    paths[2].write_text("class Model:\n    def save(self):\n        pass\n")
+    return paths
+
+
+def qualnames(index: SymbolIndex, path: Path) -> List[str]:
+    return [symbol.qualname for symbol in index.symbols_in(path)]
+
+
+def test_index_records_symbols(tmp_path: Path) -> None:
+    paths = make_project(tmp_path)
+
+    index = load_symbol_index(tmp_path, paths, workers=1)
+
+    assert index.modules == sorted(paths)
+    assert qualnames(index, paths[1]) == ["first", "second"]
+    assert [symbol.qualname for symbol in index.classes_in(paths[2])] == ["Model"]
+    assert [symbol.qualname for symbol in index.functions_in(paths[2])] == ["Model.save"]
+    assert SymbolIndex.module_name("pkg/__init__.py") == "pkg"
+    assert [index.table.format_symbol(s) for s in index.function_lookup.exact("second")] == [f"{paths[1]}:second()"]
+
+
+def test_index_is_saved_and_refreshed_incrementally(tmp_path: Path) -> None:
+    paths = make_project(tmp_path)
+    load_symbol_index(tmp_path, paths, workers=1)
+
+    index = SymbolIndex(tmp_path)
+    index.load()
+    index.refresh(paths, workers=1)
+    assert not index.dirty
+
+    paths[1].write_text("def renamed():\n    pass\n")
+    stat = paths[1].stat()
+    os.utime(paths[1], ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    index.refresh(paths[1:], workers=1)
+
+    assert index.dirty
+    assert qualnames(index, paths[1]) == ["renamed"]
+    assert index.modules == paths[1:]
+
+
+def test_index_discards_other_versions(tmp_path: Path) -> None:
+    paths = make_project(tmp_path)
+    index = load_symbol_index(tmp_path, paths, workers=1)
+    index.path.write_text('{"version": 0, "files": {}}')
+
+    stale = SymbolIndex(tmp_path)
+    stale.load()
+
+    assert stale.files == {}
+    assert (index.path.parent / ".gitignore").read_text() == "*\n"
+
+
+def test_parallel_scan_matches_serial_scan(tmp_path: Path) -> None:
+    paths = make_project(tmp_path)
+
+    serial = load_symbol_index(tmp_path, paths, workers=1)
+    parallel = SymbolIndex(tmp_path)
+    parallel.refresh(paths, workers=2, chunk_size=1)
+
+    assert parallel.files == serial.files
+
+
+def test_index_saves_token_counts_until_a_module_changes(tmp_path: Path) -> None:
+    paths = make_project(tmp_path)
+    index = load_symbol_index(tmp_path, paths, workers=1)
+    tokens = count_tokens(paths[1].read_text())
+
+    assert index.files["pkg/funcs.py"]["tokens"] is None
+    assert index.tokens_in(paths[1]) == tokens
+    assert load_symbol_index(tmp_path, paths, workers=1).files["pkg/funcs.py"]["tokens"] == tokens
+
+    paths[1].write_text("def renamed():\n    pass\n")
+    stat = paths[1].stat()
+    os.utime(paths[1], ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+    assert index.tokens_in(paths[1]) is None
+    assert load_symbol_index(tmp_path, paths, workers=1).files["pkg/funcs.py"]["tokens"] is None
@@ -0,0 +1,67 @@
+import random
+import time
+from typing import List
+
+import pytest
+
+from pygen.llm import limits
+from pygen.llm.backends.base import BackendError
+from pygen.llm.limits import AdaptiveRateLimiter, TokenBucket, backoff_delay, get_rate_limiter, is_throttling_error
+
+
+def test_backoff_delay_is_capped_full_jitter() -> None:
+    random.seed(0)
+    delays = [backoff_delay(attempt, 1.0, max_delay=5.0) for attempt in range(10) for _ in range(20)]
+
+    assert all(0 <= delay <= 5.0 for delay in delays)
+    assert max(delays[:20]) <= 1.0
+    assert max(delays[-20:]) > 1.0
+
+
+def test_throttling_errors() -> None:
+    assert is_throttling_error(BackendError("Too many requests", throttled=True))
+    assert not is_throttling_error(BackendError("Bad request"))
+    assert not is_throttling_error(ValueError("Throttled"))
+
+
+def test_token_bucket_overdraws_and_waits_for_the_deficit() -> None:
+    bucket = TokenBucket(rate_per_minute=60, burst_seconds=2)
+
+    assert bucket.reserve(2) == 0
+    assert bucket.reserve(3) == pytest.approx(3, abs=0.05)
+    bucket.scale(0.5)
+    assert bucket.reserve(1) == pytest.approx(8, abs=0.1)
+
+
+def test_limiter_halves_and_restores_its_rates() -> None:
+    limiter = AdaptiveRateLimiter(requests_per_minute=60, tokens_per_minute=6000)
+
+    for _ in range(5):
+        limiter.on_throttle()
+    assert limiter.scale == limits.MIN_RATE_SCALE
+    assert limiter.tokens is not None and limiter.tokens.rate == pytest.approx(10)
+
+    for _ in range(30):
+        limiter.on_success()
+    assert limiter.scale == 1.0
+    assert limiter.requests is not None and limiter.requests.rate == pytest.approx(1)
+
+
+def test_limiter_charges_output_tokens(monkeypatch: pytest.MonkeyPatch) -> None:
+    waits: List[float] = []
+    monkeypatch.setattr(time, "sleep", waits.append)
+    limiter = AdaptiveRateLimiter(requests_per_minute=0, tokens_per_minute=600)
+
+    limiter.acquire(100)
+    limiter.record(100)
+    limiter.acquire(100)
+
+    assert limiter.requests is None
+    assert len(waits) == 1 and waits[0] == pytest.approx(20, abs=0.1)
+
+
+def test_rate_limiter_is_shared() -> None:
+    limiter = get_rate_limiter()
+
+    assert limiter is get_rate_limiter()
+    assert limiter.requests is None and limiter.tokens is None
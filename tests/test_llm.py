@@ -0,0 +1,59 @@
+import threading
+from typing import List
+
+import pytest
+import typer
+
+from pygen.cli.git import git_app
+from pygen.llm import client as client_module
+from pygen.llm.budget import get_output_tokens
+from pygen.llm.cache import get_response_cache
+from pygen.llm.client import LLMClient
+from pygen.utils.llm import get_llm_client, prewarm_llm_client
+from tests.conftest import EchoBackend
+
+
+class PrewarmBackend(EchoBackend):
+    """An echo backend that records the connections it is asked to open."""
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.connections: List[int] = []
+
+    def prewarm(self, connections: int) -> None:
+        self.connections.append(connections)
+
+
+@pytest.fixture
+def backend(monkeypatch: pytest.MonkeyPatch) -> PrewarmBackend:
+    backend = PrewarmBackend()
+    monkeypatch.setattr(client_module, "LLMClient", lambda: LLMClient(backend))
+    return backend
+
+
+def prewarm(cache_id: str) -> typer.Context:
+    """Pre-warm the client of a new CLI context and wait for the pre-warming to finish."""
+    ctx = typer.Context(typer.main.get_command(git_app))
+    prewarm_llm_client(ctx, 2, cache_id)
+    for thread in threading.enumerate():
+        if thread.name == "pygen-prewarm":
+            thread.join()
+    return ctx
+
+
+def test_prewarm_opens_connections_for_uncached_responses(backend: PrewarmBackend) -> None:
+    ctx = prewarm("staged tree")
+
+    assert get_llm_client(ctx).backend is backend
+    assert backend.connections == [2]
+
+
+def test_prewarm_skips_connections_for_cached_responses(backend: PrewarmBackend) -> None:
+    cache = get_response_cache()
+    assert cache is not None
+    cache.put(LLMClient(backend).cache_key("staged tree", get_output_tokens("")), "Cached message")
+
+    ctx = prewarm("staged tree")
+
+    assert get_llm_client(ctx).backend is backend
+    assert backend.connections == []
@@ -0,0 +1,78 @@
+import random
+import string
+import time
+from typing import List, Set
+
+from pygen.utils.lookup import SymbolLookup
+
+WORDS = (
+    "get set parse load save user name config file path module symbol index token cache stream read write build make "
+    "run check update delete create find list item value data request response client server handle process"
+).split()
+
+
+def make_names(count: int, seed: int = 0) -> List[str]:
+    """Make distinct snake_case names from common words and random ones, like the functions of a large project."""
+    rng = random.Random(seed)
+    vocabulary = WORDS + ["".join(rng.choices(string.ascii_lowercase, k=rng.randint(3, 8))) for _ in range(3000)]
+    names: Set[str] = set()
+    while len(names) < count:
+        names.add("_".join(rng.choice(vocabulary) for _ in range(rng.randint(1, 4))))
+    return sorted(names)
+
+
+def make_typo(name: str, rng: random.Random) -> str:
+    """Drop, swap or insert a character of a name."""
+    index = rng.randrange(len(name) - 1)
+    kind = rng.randrange(3)
+    if kind == 0:
+        return name[:index] + name[index + 1 :]
+    if kind == 1:
+        return name[:index] + name[index + 1] + name[index] + name[index + 2 :]
+    return name[:index] + rng.choice("aeiou") + name[index:]
+
+
+def test_exact_and_prefix() -> None:
+    lookup = SymbolLookup([("load_config", 1), ("load_config", 2), ("load_cache", 3), ("save", 4)])
+
+    assert lookup.exact("load_config") == [1, 2]
+    assert lookup.exact("missing") == []
+    assert lookup.prefix("load_") == ["load_cache", "load_config"]
+    assert lookup.prefix("load_", limit=1) == ["load_cache"]
+    assert len(lookup) == 3
+
+
+def test_suggest_and_find() -> None:
+    lookup = SymbolLookup([("LoadConfig", 1), ("load_cache", 2), ("parse_module", 3), ("parse_modules", 4)])
+
+    assert lookup.find("parse_module") == ([3], True)
+    assert lookup.suggest("loadconfig") == ["LoadConfig"]
+    assert lookup.suggest("parse_mod")[:2] == ["parse_module", "parse_modules"]
+    assert lookup.find("prase_module") == ([3, 4], False)
+    assert lookup.fuzzy("xyzzy") == []
+
+
+def test_fuzzy_ranks_substrings_then_similarity() -> None:
+    lookup = SymbolLookup((name, name) for name in ["get_user_name", "get_username", "user_name", "set_user_mode"])
+
+    assert lookup.fuzzy("user_name")[:2] == ["user_name", "get_user_name"]
+    assert lookup.fuzzy("get_usr_name")[0] in ("get_user_name", "get_username")
+
+
+def test_fuzzy_is_fast_and_accurate_on_100k_symbols() -> None:
+    names = make_names(100_000)
+    lookup = SymbolLookup((name, name) for name in names)
+    rng = random.Random(1)
+    targets = rng.sample([name for name in names if len(name) > 3], 200)
+    queries = [make_typo(target, rng) for target in targets]
+    lookup.fuzzy(queries[0])  # Builds the trigram index
+
+    best = float("inf")
+    for _ in range(3):
+        start = time.perf_counter()
+        results = [lookup.fuzzy(query) for query in queries]
+        best = min(best, (time.perf_counter() - start) / len(queries))
+
+    assert best < 0.001, f"fuzzy lookup took {best * 1000:.2f} ms on 100k symbols"
+    found = sum(target in result[:3] for target, result in zip(targets, results))
+    assert found >= 0.95 * len(targets)
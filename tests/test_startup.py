@@ -0,0 +1,8 @@
+from benchmarks.import_time import HEAVY_MODULES, IMPORT_CODE, get_import_times
+
+
+def test_heavy_dependencies_are_not_imported_at_startup() -> None:
+    imported = {name for name, _ in get_import_times(IMPORT_CODE)}
+
+    assert "pygen.pygen" in imported
+    assert not imported.intersection(HEAVY_MODULES)
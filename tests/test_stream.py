@@ -0,0 +1,95 @@
+import io
+from pathlib import Path
+from typing import Iterator
+
+import pytest
+
+from pygen.llm.cache import ResponseCache
+from pygen.llm.stream import (
+    BufferedTextSink,
+    CacheSink,
+    CodeExtractorSink,
+    FileSink,
+    StopReason,
+    StreamEvent,
+    TextDelta,
+    TextSink,
+    Usage,
+    pipe,
+    replay_events,
+)
+
+
+class CountingStream(io.StringIO):
+    """A text stream that counts its writes."""
+
+    writes = 0
+
+    def write(self, text: str) -> int:
+        self.writes += 1
+        return super().write(text)
+
+
+def test_usage_merges_reported_counts() -> None:
+    usage = Usage.from_response({"input_tokens": 10, "output_tokens": 1, "other": 5})
+
+    assert usage.merge(Usage(output_tokens=7)) == Usage(input_tokens=10, output_tokens=7)
+
+
+def test_buffered_sink_flushes_by_size_and_at_the_end() -> None:
+    stream = CountingStream()
+    sink = BufferedTextSink(stream, flush_bytes=10, flush_interval=60)
+
+    pipe([TextDelta("Hello "), TextDelta("world, "), TextDelta("again"), StopReason("end_turn")], [sink])
+
+    assert stream.getvalue() == "Hello world, again"
+    assert stream.writes == 2
+
+
+def test_file_sink_writes_and_closes_the_file(tmp_path: Path) -> None:
+    sink = FileSink(tmp_path / "out" / "response.md", flush_bytes=1000, flush_interval=60)
+
+    pipe(replay_events("x" * 600, chunk_size=256), [sink])
+
+    assert sink.stream.closed
+    assert (tmp_path / "out" / "response.md").read_text() == "x" * 600
+
+
+def test_text_sink_records_the_response() -> None:
+    sink = TextSink()
+
+    pipe([TextDelta("Hi"), Usage(5, 1), Usage(output_tokens=2), StopReason("end_turn")], [sink])
+
+    assert sink.text == "Hi"
+    assert sink.complete
+    assert sink.usage == Usage(5, 2)
+
+
+def test_cache_sink_stores_only_finished_responses(tmp_path: Path) -> None:
+    cache = ResponseCache(tmp_path / "responses.sqlite", max_bytes=1000)
+
+    def failing() -> Iterator[StreamEvent]:
+        yield TextDelta("Partial")
+        raise ConnectionError
+
+    with pytest.raises(ConnectionError):
+        pipe(failing(), [CacheSink(cache, "partial")])
+    pipe([TextDelta("Truncated"), StopReason("max_tokens")], [CacheSink(cache, "truncated")])
+    pipe([TextDelta("Complete"), StopReason("end_turn")], [CacheSink(cache, "complete")])
+    pipe([TextDelta("Stopped"), StopReason("stop")], [CacheSink(cache, "stopped")])
+
+    assert cache.get("partial") is None
+    assert cache.get("truncated") is None
+    assert cache.get("complete") == "Complete"
+    assert cache.get("stopped") == "Stopped"
+    cache.close()
+
+
+def test_code_extractor_keeps_one_language() -> None:
+    sink = CodeExtractorSink()
+    text = "Intro\n```python\nx = 1\n```\n```bash\nls\n```\n```\ny = 2\n```\n```python\nz = "
+
+    pipe(replay_events(text, chunk_size=5), [sink])
+
+    assert sink.blocks == ["x = 1\n", "y = 2\n", "z = "]
+    assert sink.code == "x = 1\n\ny = 2\n\nz = \n"
@@ -0,0 +1,93 @@
+import os
+from pathlib import Path
+from typing import List, Tuple
+
+import git
+
+from pygen.llm.client import LLMClient
+from pygen.llm.summaries import format_file_sections, get_summaries_content, get_summaries_id, summarise_files
+from pygen.prompts.git import get_file_summary_prompt
+from pygen.utils.diff import DiffOptions, list_changes
+
+
+def stage_changes(repo: git.Repo) -> None:
+    """Replace a.txt with a symlink, modify c.txt, remove b.txt and add a binary and a lockfile."""
+    root = Path(repo.working_dir)
+    (root / "a.txt").unlink()
+    os.symlink("c.txt", root / "a.txt")
+    (root / "c.txt").write_text("gamma\ndelta\n")
+    (root / "b.txt").unlink()
+    (root / "d.bin").write_bytes(b"\0\1\2binary")
+    (root / "poetry.lock").write_text("lock\n")
+    repo.git.add("-A")
+
+
+def test_summaries_match_their_files(repo: git.Repo, echo_client: LLMClient) -> None:
+    stage_changes(repo)
+    changes = list_changes(repo, ["--cached"])
+    progress: List[Tuple[int, int]] = []
+
+    summaries = summarise_files(
+        echo_client,
+        repo,
+        ["--cached"],
+        changes,
+        get_file_summary_prompt,
+        DiffOptions(),
+        lambda completed, total: progress.append((completed, total)),
+    )
+
+    texts = {summary.change.path: summary.text for summary in summaries}
+    assert texts["a.txt"] == "Git Diff of file 'a.txt' (modified):"
+    assert texts["c.txt"] == "Git Diff of file 'c.txt' (modified):"
+    assert texts["b.txt"] == "The file was removed."
+    assert texts["d.bin"] == "Not summarised (binary)."
+    assert "poetry.lock" not in texts
+    assert [summary.change.path for summary in summaries] == [c.path for c in changes if c.path != "poetry.lock"]
+    assert progress[-1] == (2, 2)
+
+    sections = format_file_sections(changes, summaries)
+    assert "- poetry.lock: Not summarised (lockfile)." in sections
+    assert "- b.txt\n" in sections
+    assert "File 'c.txt' (modified):" in get_summaries_content(summaries)
+
+
+def test_summaries_are_cached_by_blob(repo: git.Repo, echo_client: LLMClient) -> None:
+    stage_changes(repo)
+    changes = list_changes(repo, ["--cached"])
+    first = summarise_files(echo_client, repo, ["--cached"], changes, get_file_summary_prompt, DiffOptions())
+    requests = len(echo_client.backend.requests)  # type: ignore[attr-defined]
+
+    second = summarise_files(echo_client, repo, ["--cached"], changes, get_file_summary_prompt, DiffOptions())
+
+    assert requests == 2
+    assert len(echo_client.backend.requests) == requests  # type: ignore[attr-defined]
+    assert [summary.text for summary in second] == [summary.text for summary in first]
+    assert all(summary.cached for summary in second if summary.change.path in ("a.txt", "c.txt"))
+    assert get_summaries_id(second) == get_summaries_id(first) != get_summaries_id(first, headlines_only=True)
+
+
+def test_summary_progress_counts_the_files_to_send(repo: git.Repo, echo_client: LLMClient) -> None:
+    root = Path(repo.working_dir)
+    for i in range(6):
+        if i % 2:
+            (root / f"{i}.bin").write_bytes(b"\0binary")
+        else:
+            (root / f"{i}.txt").write_text(f"{i}\n")
+    repo.git.add("-A")
+    changes = list_changes(repo, ["--cached"])
+    progress: List[Tuple[int, int]] = []
+
+    summarise_files(
+        echo_client,
+        repo,
+        ["--cached"],
+        changes,
+        get_file_summary_prompt,
+        DiffOptions(),
+        lambda completed, total: progress.append((completed, total)),
+    )
+
+    assert [completed for completed, _ in progress] == [1, 2, 3]
+    assert all(completed <= total <= len(changes) for completed, total in progress)
+    assert progress[-1] == (3, 3)
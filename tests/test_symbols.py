@@ -0,0 +1,72 @@
+import ast
+from pathlib import Path
+from typing import List
+
+from pygen.utils.parsing import collect_symbols
+from pygen.utils.symbols import Symbol, SymbolTable
+
+SOURCE = b"""
+def first():
+    pass
+
+
+class Model:
+    def save(self):
+        pass
+
+
+def last():
+    def inner():
+        pass
+"""
+
+
+def get_symbols(source: bytes) -> List[Symbol]:
+    """Parse the classes and functions of a module's source, classes first as the parser collects them."""
+    symbols = collect_symbols(ast.parse(source), source)
+    return [Symbol.from_info(info) for info in symbols.classes + symbols.functions]
+
+
+def make_table() -> SymbolTable:
+    return SymbolTable.build(
+        [
+            (Path("pkg/models.py"), "pkg.models", get_symbols(SOURCE)),
+            (Path("app.py"), "app", get_symbols(b"class Model:\n    pass\n")),
+        ]
+    )
+
+
+def test_symbols_in_source_order() -> None:
+    table = make_table()
+
+    qualnames = [symbol.qualname for symbol in table.symbols_in(Path("pkg/models.py"))]
+
+    assert qualnames == ["first", "Model", "Model.save", "last", "last.<locals>.inner"]
+    assert [table.path_of(symbol) for symbol in table.classes()] == [Path("app.py"), Path("pkg/models.py")]
+    assert table.symbols_in(Path("missing.py")) == []
+
+
+def test_resolve_and_format_symbol() -> None:
+    table = make_table()
+
+    assert [table.format_symbol(s) for s in table.resolve("pkg.models.Model.save")] == ["pkg/models.py:Model.save()"]
+    assert [table.format_symbol(s) for s in table.resolve("models.Model")] == ["pkg/models.py:Model()"]
+    assert len(table.resolve("Model")) == 2
+    assert table.resolve("Missing") == []
+
+
+def test_resolve_returns_every_symbol_of_a_qualified_name() -> None:
+    source = b"""
+class Model:
+    @property
+    def value(self):
+        return 1
+
+    @value.setter
+    def value(self, value):
+        pass
+"""
+    table = SymbolTable.build([(Path("pkg/models.py"), "pkg.models", get_symbols(source))])
+
+    for name in ("pkg.models.Model.value", "models.Model.value", "Model.value"):
+        assert [symbol.start_lineno for symbol in table.resolve(name)] == [3, 7]
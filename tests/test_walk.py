@@ -0,0 +1,32 @@
+from pathlib import Path
+
+import git
+
+from pygen.utils.walk import walk_python_files
+
+
+def make_project(root: Path) -> None:
+    """Make a project with ignored directories and files at several levels."""
+    for path in ("a.py", "pkg/b.py", "pkg/gen/c.py", "pkg/keep.py", "build/d.py", ".venv/e.py", "notes.txt"):
+        (root / path).parent.mkdir(parents=True, exist_ok=True)
+        (root / path).write_text("x = 1\n")
+    (root / ".gitignore").write_text("build/\n")
+    (root / "pkg" / ".gitignore").write_text("gen/\n*.py\n!keep.py\n")
+
+
+def test_walk_prunes_ignored_directories(tmp_path: Path) -> None:
+    make_project(tmp_path)
+
+    paths = sorted(path.relative_to(tmp_path).as_posix() for path in walk_python_files(tmp_path))
+
+    assert paths == ["a.py", "pkg/keep.py"]
+
+
+def test_walk_matches_git(tmp_path: Path) -> None:
+    make_project(tmp_path)
+    git.Repo.init(tmp_path)
+
+    scanned = sorted(walk_python_files(tmp_path, use_git=False))
+
+    assert scanned == sorted(walk_python_files(tmp_path))
+    assert [path.relative_to(tmp_path).as_posix() for path in scanned] == ["a.py", "pkg/keep.py"]